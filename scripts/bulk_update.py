@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Bulk `copier update` of many projects generated from this template.
+
+Projects are found by their answers file (`.copier-answers.yml`) under the given
+directories and updated concurrently, one `copier update` process per project.
+Each template repository is mirrored once into a local cache, and git is pointed
+at the mirror (`url.<mirror>.insteadOf`), so every update clones the template
+revisions locally instead of over the network. The `_src_path` recorded in the
+answers stays unchanged.
+
+Projects whose answers already record the target revision (and any `--data`
+values) are skipped without running Copier. Projects with uncommitted changes
+are skipped as well, because Copier refuses to update them. The summary lists
+updated projects with their conflicted files; the exit status is non-zero when
+any project has conflicts or failed.
+
+Usage:
+    python scripts/bulk_update.py ~/projects --workers 16 --vcs-ref v1.2.0
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import yaml
+
+SKIP_DIRS = {".git", ".venv", "venv", "node_modules", "__pycache__", ".tox", ".nox"}
+CONFLICT_MARKER = "<<<<<<< before updating"
+
+
+@dataclass
+class Result:
+    project: str
+    status: str  # updated, conflicts, up-to-date, dirty, failed, would-update
+    revision: str = ""
+    conflicts: list[str] = field(default_factory=list)
+    message: str = ""
+
+
+#
+#  HELPER FUNCTIONS
+#
+def git(*args, cwd=None, env=None):
+    """Run git and return its stripped output."""
+    completed = subprocess.run(
+        ["git", *args], cwd=cwd, env=env, capture_output=True, text=True, check=True
+    )
+    return completed.stdout.strip()
+
+
+def find_projects(roots, answers_file):
+    """Directories under `roots` holding an answers file, without descending into them."""
+    projects = []
+    for root in roots:
+        for directory, subdirs, files in os.walk(root):
+            if answers_file in files:
+                projects.append(Path(directory))
+                subdirs.clear()
+            else:
+                subdirs[:] = sorted(d for d in subdirs if d not in SKIP_DIRS)
+    return sorted(projects)
+
+
+def read_answers(project, answers_file):
+    return yaml.safe_load((project / answers_file).read_text()) or {}
+
+
+def normalize_url(src):
+    """Expand Copier's `gh:` / `gl:` shortcuts into clone URLs."""
+    for prefix, host in (("gh:", "https://github.com/"), ("gl:", "https://gitlab.com/")):
+        if src.startswith(prefix):
+            url = host + src.removeprefix(prefix)
+            return url if url.endswith(".git") else url + ".git"
+    return src
+
+
+def is_local(src):
+    return Path(src).expanduser().exists()
+
+
+def mirror(url, cache_dir):
+    """Create or refresh a bare mirror of a template repository and return its path."""
+    path = cache_dir / (hashlib.sha1(url.encode()).hexdigest()[:16] + ".git")
+    if path.exists():
+        git("fetch", "--prune", "--tags", "origin", cwd=path)
+    else:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        git("clone", "--mirror", "--quiet", url, str(path))
+    return path
+
+
+def target_revision(repo, vcs_ref):
+    """The reference to update to and its `git describe` (what Copier records as `_commit`).
+
+    Without `vcs_ref` this is the newest version tag, or HEAD when there are no tags,
+    like Copier's default.
+    """
+    if vcs_ref is None:
+        tags = git("tag", "--sort=-v:refname", cwd=repo).splitlines()
+        vcs_ref = tags[0] if tags else "HEAD"
+    return vcs_ref, git("describe", "--tags", "--always", vcs_ref, cwd=repo)
+
+
+def mirror_env(url, path):
+    """Environment that makes git clone `url` from the local mirror at `path`."""
+    env = dict(os.environ)
+    index = int(env.get("GIT_CONFIG_COUNT", "0"))
+    env["GIT_CONFIG_COUNT"] = str(index + 1)
+    env[f"GIT_CONFIG_KEY_{index}"] = f"url.{path}.insteadOf"
+    env[f"GIT_CONFIG_VALUE_{index}"] = url
+    return env
+
+
+def conflicted_files(project):
+    """Files left with `.rej` rejects, unmerged entries or inline conflict markers."""
+    rejects = git("ls-files", "--others", "--", "*.rej", cwd=project).splitlines()
+    unmerged = git("diff", "--name-only", "--diff-filter=U", cwd=project).splitlines()
+    changed = git("diff", "--name-only", cwd=project).splitlines()
+    inline = []
+    for name in changed:
+        path = project / name
+        if path.is_file() and CONFLICT_MARKER in path.read_text(errors="ignore"):
+            inline.append(name)
+    return sorted({*rejects, *unmerged, *inline})
+
+
+def update_project(project, args, ref, revision, env):
+    """Update one project unless it is already at `revision`; never raises."""
+    name = str(project)
+    try:
+        answers = read_answers(project, args.answers_file)
+        data = dict(item.split("=", 1) for item in args.data)
+        if answers.get("_commit") == revision and all(
+            str(answers.get(key)) == value for key, value in data.items()
+        ):
+            conflicts = conflicted_files(project)  # left unresolved by an earlier run
+            return Result(name, "conflicts" if conflicts else "up-to-date", revision, conflicts)
+        if git("status", "--porcelain", cwd=project):
+            return Result(name, "dirty", revision, message="uncommitted changes")
+        if args.dry_run:
+            return Result(name, "would-update", revision, message=str(answers.get("_commit")))
+        command = [sys.executable, "-m", "copier", "update", "--trust"]
+        command += ["--defaults", "--skip-answered"]
+        command += ["--vcs-ref", ref, "--conflict", args.conflict]
+        command += ["--answers-file", args.answers_file]
+        for item in args.data:
+            command += ["--data", item]
+        if "project_name" not in answers and "project_name" not in data:
+            # older projects did not record it; it defaults to the directory name
+            command += ["--data", f"project_name={project.resolve().name}"]
+        completed = subprocess.run(
+            command, cwd=project, env=env, capture_output=True, text=True, check=False
+        )
+        if completed.returncode != 0:
+            lines = (completed.stderr or completed.stdout).strip().splitlines()
+            return Result(name, "failed", revision, message=lines[-1] if lines else "")
+        conflicts = conflicted_files(project)
+        return Result(name, "conflicts" if conflicts else "updated", revision, conflicts)
+    except (OSError, ValueError, yaml.YAMLError, subprocess.CalledProcessError) as e:
+        return Result(name, "failed", revision, message=str(e))
+
+
+def print_summary(results):
+    order = ["conflicts", "failed", "dirty", "updated", "would-update", "up-to-date"]
+    for status in order:
+        group = [r for r in results if r.status == status]
+        if not group:
+            continue
+        print(f"\n{status} ({len(group)}):")
+        for result in group:
+            detail = f" - {result.message}" if result.message else ""
+            print(f"  {result.project} -> {result.revision}{detail}")
+            for conflict in result.conflicts:
+                print(f"      {conflict}")
+    counts = ", ".join(
+        f"{sum(r.status == s for r in results)} {s}"
+        for s in order
+        if any(r.status == s for r in results)
+    )
+    print(f"\n{len(results)} projects: {counts}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run copier update on many projects at once")
+    parser.add_argument("roots", nargs="+", type=Path, help="Directories to search for projects")
+    parser.add_argument("--answers-file", default=".copier-answers.yml")
+    parser.add_argument("--vcs-ref", default=None, help="Template revision (default: latest tag)")
+    parser.add_argument("--src", default=None, help="Only update projects from this template")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--conflict", choices=["inline", "rej"], default="inline")
+    parser.add_argument(
+        "--data", action="append", default=[], metavar="KEY=VALUE", help="Answer override"
+    )
+    parser.add_argument(
+        "--cache-dir", type=Path, default=Path.home() / ".cache" / "copier-bulk-update"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only list projects to update")
+    parser.add_argument("--report", type=Path, default=None, help="Also write results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    projects = find_projects(args.roots, args.answers_file)
+    by_source = {}
+    for project in projects:
+        src = read_answers(project, args.answers_file).get("_src_path")
+        if src and (args.src is None or normalize_url(src) == normalize_url(args.src)):
+            by_source.setdefault(src, []).append(project)
+    print(f"Found {len(projects)} projects from {len(by_source)} template sources")
+
+    # one mirror and one target revision per template source, shared by its projects
+    jobs = []
+    for src, group in by_source.items():
+        url = normalize_url(src)
+        if is_local(src):
+            repo, env = Path(src).expanduser(), None
+        else:
+            repo = mirror(url, args.cache_dir)
+            env = mirror_env(url, repo)
+        ref, revision = target_revision(repo, args.vcs_ref)
+        print(f"{src}: {len(group)} projects, target {revision}")
+        jobs.extend((project, ref, revision, env) for project in group)
+
+    results = []
+    with ThreadPoolExecutor(args.workers) as pool:
+        futures = [pool.submit(update_project, p, args, *job) for p, *job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"[{len(results)}/{len(futures)}] {result.status}: {result.project}")
+
+    results.sort(key=lambda r: r.project)
+    print_summary(results)
+    if args.report:
+        args.report.write_text(json.dumps([asdict(r) for r in results], indent=2))
+    raise SystemExit(1 if any(r.status in ("conflicts", "failed") for r in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
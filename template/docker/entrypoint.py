@@ -6,7 +6,7 @@ import sys
 from importlib.metadata import version
 
 import {{ module_name }}
-from {{ module_name }}.modeling import predict, train
+from {{ module_name }}.modeling import predict, stream, train
 
 __version__ = version("{{ module_name }}")
 
@@ -25,9 +25,14 @@ def main():
         "command",
         nargs="?",
         default="run",
-        choices=["run", "train", "predict"],
+        choices=["run", "train", "predict", "stream"],
         help="Command to execute (default: run)",
     )
+    parser.add_argument(
+        "args",
+        nargs=argparse.REMAINDER,
+        help="Options passed to the command, e.g. predict --route-column model",
+    )
     args = parser.parse_args()
 
     if args.command == "run":
@@ -42,9 +47,11 @@ def main():
         print()
         # Add your main execution logic here
     elif args.command == "train":
-        train.main()
+        train.app(args.args, prog_name="train")
     elif args.command == "predict":
-        predict.main()
+        predict.app(args.args, prog_name="predict")
+    elif args.command == "stream":
+        stream.app(args.args, prog_name="stream")
 
     return 0
 
@@ -1 +1,2 @@
 from {{ module_name }} import config  # noqa: F401
+from {{ module_name }}.sql import query  # noqa: F401
@@ -0,0 +1,255 @@
+"""Micro-benchmarks for the performance options of this package, on synthetic data.
+
+Each command logs a comparison table and writes its results as JSON to
+`reports/benchmarks/<name>.json`. Benchmarks other than `feature-store` and
+`compression` require numpy.
+"""
+
+from collections.abc import Callable, Sequence
+from functools import partial
+import json
+from pathlib import Path
+import random
+import tempfile
+import time
+from typing import Annotated, Any
+
+from loguru import logger
+import typer
+
+from {{ module_name }}.compression import (
+    FRAME_BYTES,
+    SUFFIXES,
+    SeekableWriter,
+    locate,
+    open_file,
+)
+from {{ module_name }}.config import CPU_COUNT, REPORTS_DIR
+from {{ module_name }}.feature_store import FeatureStore
+from {{ module_name }}.features import session_numbers
+from {{ module_name }}.jit import is_compiled, map_partitions
+from {{ module_name }}.precision import stable_matmul, stable_sum
+
+BENCHMARKS_DIR = REPORTS_DIR / "benchmarks"
+
+app = typer.Typer()
+
+
+@app.callback()
+def main():
+    """Run a micro-benchmark on synthetic data (one command per benchmark)."""
+
+
+def best_time(func: Callable[[], Any], repeat: int = 3) -> float:
+    """Best wall-clock time of `repeat` calls, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def save_results(name: str, results: dict[str, Any]) -> None:
+    BENCHMARKS_DIR.mkdir(parents=True, exist_ok=True)
+    path = BENCHMARKS_DIR / f"{name}.json"
+    path.write_text(json.dumps(results, indent=2))
+    for label, metrics in results["results"].items():
+        logger.info(f"{label:>10}: " + ", ".join(f"{k}={v:.4g}" for k, v in metrics.items()))
+    logger.success(f"Benchmark results written to {path}")
+
+
+def _numpy() -> Any:
+    try:
+        import numpy as np
+    except ModuleNotFoundError as e:
+        raise ModuleNotFoundError("Benchmarks require numpy: pip install numpy") from e
+    return np
+
+
+def latency_percentiles(samples_ns: Sequence[int]) -> dict[str, float]:
+    """p50/p99/p99.9 of latency samples, in microseconds."""
+    ordered = sorted(samples_ns)
+    return {
+        f"p{q}_us": ordered[min(int(len(ordered) * q / 100), len(ordered) - 1)] / 1000
+        for q in (50, 99, 99.9)
+    }
+
+
+def _rel_error(approx: Any, exact: Any) -> float:
+    return float(abs(approx - exact).max() / abs(exact).max())
+
+
+@app.command()
+def precision(rows: int = 1_000_000, columns: int = 32, repeat: int = 3):
+    """Compare float64 and float32 feature arrays: memory, throughput and accuracy."""
+    np = _numpy()
+    reference = np.random.default_rng(0).normal(1.0, 1.0, size=(rows, columns))
+    exact_sum = stable_sum(reference)
+    exact_gram = reference.T @ reference
+    results = {}
+    for dtype in ("float64", "float32"):
+        X = reference.astype(dtype)
+        elapsed = best_time(lambda X=X: (X - X.mean(axis=0)) / X.std(axis=0), repeat)
+        gram_elapsed = best_time(lambda X=X: X.T @ X, repeat)
+        results[dtype] = {
+            "memory_mib": X.nbytes / 2**20,
+            "standardize_rows_per_s": rows / elapsed,
+            "gram_rows_per_s": rows / gram_elapsed,
+            "naive_sum_rel_error": abs(float(X.sum(dtype=dtype)) - exact_sum) / abs(exact_sum),
+            "stable_sum_rel_error": abs(float(stable_sum(X)) - exact_sum) / abs(exact_sum),
+            "naive_gram_rel_error": _rel_error(X.T @ X, exact_gram),
+            "stable_gram_rel_error": _rel_error(stable_matmul(X.T, X), exact_gram),
+        }
+    save_results("precision", {"rows": rows, "columns": columns, "results": results})
+
+
+@app.command()
+def jit(rows: int = 1_000_000, keys: int = 10_000, workers: int = 0, repeat: int = 3):
+    """Compare the pure Python and compiled `features.session_numbers` kernel."""
+    np = _numpy()
+    rng = np.random.default_rng(0)
+    user_ids = np.sort(rng.integers(0, keys, rows))
+    timestamps = np.cumsum(rng.exponential(60.0, rows))
+    out = np.empty(rows, dtype=np.int64)
+    inputs = (user_ids, timestamps)
+    python_kernel = getattr(session_numbers, "py_func", session_numbers)
+    runs = {"python": lambda: python_kernel(*inputs, out, 1800.0)}
+    if is_compiled(session_numbers):
+        session_numbers(*inputs, out, 1800.0)  # compile outside the timings
+        runs["compiled"] = lambda: session_numbers(*inputs, out, 1800.0)
+        runs["parallel"] = lambda: map_partitions(
+            session_numbers, inputs, out, 1800.0, keys=user_ids, workers=workers or None
+        )
+    else:
+        logger.warning("numba is not installed, only the pure Python kernel is timed")
+    results = {name: {"rows_per_s": rows / best_time(func, repeat)} for name, func in runs.items()}
+    for metrics in results.values():
+        metrics["speedup"] = metrics["rows_per_s"] / results["python"]["rows_per_s"]
+    save_results("jit", {"rows": rows, "keys": keys, "results": results})
+
+
+@app.command()
+def feature_store(
+    entities: int = 10_000_000,
+    versions: int = 1,
+    lookups: int = 100_000,
+    batch_size: int = 64,
+    directory: Path | None = None,
+):
+    """Build a synthetic feature store, then time single, batched and point-in-time lookups."""
+    rng = random.Random(0)
+    rows = (
+        {"entity": e, "ts": v * 86_400, "f1": e % 97, "f2": e / 7}
+        for v in range(versions)
+        for e in range(entities)
+    )
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        start = time.perf_counter()
+        store = FeatureStore.build(Path(tmp) / "store", rows, "entity", "ts")
+        build_s = time.perf_counter() - start
+        keys = [rng.randrange(entities) for _ in range(lookups)]
+        runs = {
+            "get": lambda key: store.get(key),
+            "as_of": lambda key: store.get(key, as_of=rng.randrange(versions) * 86_400),
+        }
+        results = {}
+        for name, lookup in runs.items():
+            samples = []
+            for key in keys:
+                start = time.perf_counter_ns()
+                lookup(key)
+                samples.append(time.perf_counter_ns() - start)
+            results[name] = {
+                **latency_percentiles(samples),
+                "keys_per_s": 1e9 * len(samples) / sum(samples),
+            }
+        samples = []
+        for first in range(0, lookups - batch_size + 1, batch_size):
+            stop = first + batch_size
+            batch = keys[first:stop]
+            start = time.perf_counter_ns()
+            store.get_many(batch)
+            samples.append(time.perf_counter_ns() - start)
+        results[f"get_many_{batch_size}"] = {
+            **latency_percentiles(samples),
+            "keys_per_s": 1e9 * batch_size * len(samples) / sum(samples),
+        }
+        store.close()
+    save_results(
+        "feature_store",
+        {"entities": entities, "versions": versions, "build_s": build_s, "results": results},
+    )
+
+
+def _synthetic_table(rows: int) -> bytes:
+    rng = random.Random(0)
+    countries = ["DE", "FR", "PL", "US", "GB", "NL", "SE", "ES"]
+    lines = ["id,timestamp,user,country,amount,score,comment"]
+    for i in range(rows):
+        lines.append(
+            f"{i},{1_700_000_000 + i * 7},user{rng.randrange(100_000)},{rng.choice(countries)},"
+            f"{rng.lognormvariate(3, 1):.2f},{rng.random():.6f},"
+            f"{'ok' if rng.random() < 0.9 else 'refund requested'}"
+        )
+    return "\n".join(lines).encode()
+
+
+def _read_all(path: Path) -> bytes:
+    with open_file(path, "rb") as f:
+        return f.read()
+
+
+def _write_compressed(data: bytes, path: Path, codec: str, level: int, threads: int) -> None:
+    with SeekableWriter(path, codec, level, threads) as f:
+        f.write(data)
+
+
+@app.command()
+def compression(
+    input_path: Annotated[
+        Path | None, typer.Option(help="Table to benchmark on [default: synthetic]")
+    ] = None,
+    rows: int = 1_000_000,
+    threads: int = CPU_COUNT,
+    range_reads: int = 100,
+    repeat: int = 3,
+    directory: Path | None = None,
+):
+    """Compare zstd and lz4 levels: ratio, compression and decompression speed, range reads."""
+    data = _read_all(locate(input_path)) if input_path else _synthetic_table(rows)
+    rng = random.Random(0)
+    offsets = [rng.randrange(max(1, len(data) - FRAME_BYTES)) for _ in range(range_reads)]
+    megabytes = len(data) / 2**20
+    results = {}
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        for codec, level in (("lz4", 0), ("lz4", 9), ("zstd", 1), ("zstd", 3), ("zstd", 9)):
+            path = Path(tmp) / f"table.csv{SUFFIXES[codec]}"
+            write = partial(_write_compressed, data, path, codec, level, threads)
+            try:
+                compress_s = best_time(write, repeat)
+            except ModuleNotFoundError as e:
+                logger.warning(f"Skipping {codec}: {e}")
+                continue
+            read_s = best_time(partial(_read_all, path), repeat)
+            samples = []
+            with open_file(path, "rb") as f:
+                for offset in offsets:  # 64 KiB at a random position, e.g. a worker's range
+                    start = time.perf_counter_ns()
+                    f.seek(offset)
+                    f.read(64 * 1024)
+                    samples.append(time.perf_counter_ns() - start)
+            results[f"{codec}-{level}"] = {
+                "ratio": len(data) / path.stat().st_size,
+                "compress_mb_s": megabytes / compress_s,
+                "decompress_mb_s": megabytes / read_s,
+                "range_read_ms": sum(samples) / len(samples) / 1e6,
+            }
+    save_results(
+        "compression",
+        {"megabytes": megabytes, "threads": threads, "results": results},
+    )
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,251 @@
+"""Host-wide content-addressed store for raw and external data, shared by projects.
+
+When `DATA_CACHE_DIR` is set in `.env`, every file under `data/raw` and
+`data/external` can be replaced by a link to `<cache>/objects/<sha256>`. A
+file's content is then stored once per host, however many projects use it.
+Links are hard links by default. With `DATA_CACHE_LINK=reflink` they are
+copy-on-write clones, which need btrfs or XFS. Either way the cache must be on
+the same filesystem as the projects. Hard-linked objects are made read-only,
+because writing through any link would change the file for every project.
+
+`refs.sqlite` in the cache records which paths link to which object, which is
+each object's reference count. It also records the remote version (ETag) of
+every object pulled from dataset storage, so `pull` downloads each version only
+once per host. `gc` drops references to files that were deleted or replaced,
+then deletes objects that no path links to any more.
+"""
+
+from collections.abc import Iterable
+import errno
+import hashlib
+import os
+from pathlib import Path
+import shutil
+import sqlite3
+import time
+
+from loguru import logger
+import typer
+
+from {{ module_name }}.config import (
+    DATA_CACHE_DIR,
+    DATA_CACHE_LINK,
+    EXTERNAL_DATA_DIR,
+    PROJ_ROOT,
+    RAW_DATA_DIR,
+)
+from {{ module_name }}.manifest import file_sha256
+from {{ module_name }}.storage import list_locations, object_version, read_chunks, remote_uri
+
+CACHED_DIRS = (RAW_DATA_DIR, EXTERNAL_DATA_DIR)
+_FICLONE = 0x40049409  # Linux ioctl that shares a file's extents with another file
+
+app = typer.Typer()
+
+
+def _reflink(source: Path, target: Path) -> None:
+    import fcntl  # POSIX only
+
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+
+
+def _download(uri: str, path: Path) -> str:
+    """Stream a remote object to `path`, hashing it on the way; returns its SHA-256."""
+    sha = hashlib.sha256()
+    tmp = path.with_name(f".{path.name}.download")
+    with open(tmp, "wb") as f:
+        for chunk in read_chunks(uri):
+            sha.update(chunk)
+            f.write(chunk)
+    os.replace(tmp, path)
+    return sha.hexdigest()
+
+
+class DataCache:
+    """Content-addressed object store with per-path references."""
+
+    def __init__(self, root: Path | None = DATA_CACHE_DIR, link: str = DATA_CACHE_LINK):
+        if root is None:
+            raise ValueError("No data cache configured: set DATA_CACHE_DIR in .env")
+        self.root = Path(root)
+        self.link = link
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.root / "refs.sqlite", timeout=60)
+        self.db.executescript(
+            "CREATE TABLE IF NOT EXISTS refs "
+            "(path TEXT PRIMARY KEY, digest TEXT, inode INTEGER, size INTEGER, mtime_ns INTEGER);"
+            "CREATE INDEX IF NOT EXISTS refs_digest ON refs (digest);"
+            "CREATE TABLE IF NOT EXISTS remotes "
+            "(uri TEXT, version TEXT, digest TEXT, PRIMARY KEY (uri, version));"
+        )
+
+    def object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / digest
+
+    def _clone(self, source: Path, target: Path) -> None:
+        """Link `target` to the content of `source`, falling back to a copy across devices."""
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        try:
+            if self.link == "reflink":
+                _reflink(source, tmp)
+            else:
+                os.link(source, tmp)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EOPNOTSUPP, errno.EINVAL, errno.ENOTTY):
+                raise
+            logger.warning(f"Cannot {self.link} {source} to {target} ({e.strerror}), copying")
+            tmp.unlink(missing_ok=True)
+            shutil.copyfile(source, tmp)
+        os.replace(tmp, target)
+
+    def _store(self, path: Path, digest: str) -> None:
+        """Make `path` share the cached object with its content, caching it if new."""
+        obj = self.object_path(digest)
+        if not obj.exists():
+            obj.parent.mkdir(exist_ok=True)
+            self._clone(path, obj)
+            if self.link == "hardlink":
+                obj.chmod(0o444)
+        elif not os.path.samefile(obj, path):
+            self._clone(obj, path)  # the content was already cached, drop this copy
+
+    def _reference(self, path: Path, digest: str) -> None:
+        stat = path.stat()
+        self.db.execute(
+            "INSERT OR REPLACE INTO refs VALUES (?, ?, ?, ?, ?)",
+            (str(path.resolve()), digest, stat.st_ino, stat.st_size, stat.st_mtime_ns),
+        )
+        self.db.commit()
+
+    def _is_current(self, path: Path, digest: str | None = None) -> bool:
+        """Whether `path` is unchanged since it was linked (to `digest`, if given)."""
+        row = self.db.execute(
+            "SELECT digest, inode, size, mtime_ns FROM refs WHERE path = ?", (str(path.resolve()),)
+        ).fetchone()
+        if row is None or digest not in (None, row[0]):
+            return False
+        stat = path.stat()
+        return row[1:] == (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def add(self, path: Path) -> bool:
+        """Move a file's content into the cache and link it back; False if already linked."""
+        if self._is_current(path):
+            return False
+        digest = file_sha256(path)
+        self._store(path, digest)
+        self._reference(path, digest)
+        return True
+
+    def checkout(self, uri: str, path: Path) -> bool:
+        """Materialize a remote object at `path`; False if it came from the cache."""
+        version = object_version(uri)
+        row = self.db.execute(
+            "SELECT digest FROM remotes WHERE uri = ? AND version = ?", (uri, version)
+        ).fetchone()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if row is not None and self.object_path(row[0]).exists():
+            digest, downloaded = row[0], False
+            if path.exists() and self._is_current(path, digest):
+                return False
+            self._clone(self.object_path(digest), path)
+        else:
+            digest, downloaded = _download(uri, path), True
+            self._store(path, digest)
+            self.db.execute(
+                "INSERT OR REPLACE INTO remotes VALUES (?, ?, ?)", (uri, version, digest)
+            )
+        self._reference(path, digest)
+        return downloaded
+
+    def gc(self, grace_s: float = 3600.0) -> dict[str, int]:
+        """Drop stale references, then delete unreferenced objects older than `grace_s`.
+
+        The grace period protects objects that another project is linking right now.
+        """
+        stale = []
+        for path, inode, size, mtime_ns in self.db.execute(
+            "SELECT path, inode, size, mtime_ns FROM refs"
+        ):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stale.append(path)
+                continue
+            if (stat.st_ino, stat.st_size, stat.st_mtime_ns) != (inode, size, mtime_ns):
+                stale.append(path)
+        self.db.executemany("DELETE FROM refs WHERE path = ?", [(path,) for path in stale])
+        live = {digest for (digest,) in self.db.execute("SELECT DISTINCT digest FROM refs")}
+        stats = {"stale_refs": len(stale), "objects": 0, "deleted": 0, "freed_bytes": 0}
+        now = time.time()
+        for obj in (self.root / "objects").glob("*/*"):
+            stats["objects"] += 1
+            stat = obj.stat()
+            if obj.name in live or now - stat.st_ctime < grace_s:
+                continue
+            obj.unlink()
+            stats["deleted"] += 1
+            stats["freed_bytes"] += stat.st_size
+        self.db.execute(
+            "DELETE FROM remotes WHERE digest NOT IN (SELECT DISTINCT digest FROM refs)"
+        )
+        self.db.commit()
+        return stats
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def _files(directories: Iterable[Path]) -> list[Path]:
+    return sorted(
+        path
+        for directory in directories
+        for path in directory.rglob("*")
+        if path.is_file() and not path.name.startswith(".")
+    )
+
+
+@app.command()
+def link():
+    """Replace files under data/raw and data/external by links into the host-wide cache."""
+    if DATA_CACHE_DIR is None:
+        logger.info("DATA_CACHE_DIR is not set, keeping data files as they are")
+        return
+    with DataCache() as cache:
+        files = _files(CACHED_DIRS)
+        added = sum(cache.add(path) for path in files)
+    logger.success(f"Linked {added} new or changed files ({len(files)} total) into the cache")
+
+
+@app.command()
+def pull():
+    """Fetch data/raw and data/external from dataset storage, downloading only uncached objects."""
+    downloads = 0
+    with DataCache() as cache:
+        for directory in CACHED_DIRS:
+            prefix = remote_uri(directory)
+            for uri in list_locations(prefix + "/"):
+                relative = str(uri).removeprefix(prefix + "/")
+                downloads += cache.checkout(str(uri), directory / relative)
+    logger.success(f"Pulled data into {PROJ_ROOT / 'data'}, {downloads} objects downloaded")
+
+
+@app.command()
+def gc(grace_hours: float = 1.0):
+    """Delete cached objects that no project on this host references any more."""
+    with DataCache() as cache:
+        stats = cache.gc(grace_hours * 3600)
+    logger.info(
+        f"{stats['stale_refs']} stale references dropped, {stats['deleted']} of "
+        f"{stats['objects']} objects deleted ({stats['freed_bytes'] / 2**20:.1f} MiB freed)"
+    )
+
+
+if __name__ == "__main__":
+    app()
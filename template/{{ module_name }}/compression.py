@@ -0,0 +1,369 @@
+"""Transparent zstd / lz4 compression of interim and processed files, in seekable frames.
+
+With `COMPRESSION=zstd` (or `lz4`) in `.env`, tables written through
+`streaming.py` go to `<path>.zst` (`.lz4`) at `COMPRESSION_LEVEL`. Readers given
+`<path>` find the compressed file on their own, so stages and commands keep
+their plain `.csv` paths. zstd and lz4 need `pip install zstandard` and
+`pip install lz4`.
+
+Data is cut into independent frames of `FRAME_BYTES` uncompressed bytes. The
+frames are compressed on a thread pool, because both libraries release the GIL.
+A seek table in a trailing skippable frame (the zstd seekable format, used for
+lz4 as well) lists the frame sizes. The `zstd` and `lz4` command line tools skip
+that frame, so they still decompress these files. `open_file` uses the table to
+read any byte range by decompressing only the frames that cover it. This is how
+`ingest.py` splits a compressed CSV between processes.
+
+This module's command converts the tables already under `data/interim` and
+`data/processed` after `COMPRESSION` changes.
+"""
+
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import io
+from itertools import accumulate
+import os
+from pathlib import Path
+import shutil
+import struct
+import threading
+from typing import IO, Annotated, Any
+
+from loguru import logger
+import typer
+
+from {{ module_name }}.config import (
+    COMPRESSION,
+    COMPRESSION_LEVEL,
+    CPU_COUNT,
+    INTERIM_DATA_DIR,
+    PROCESSED_DATA_DIR,
+)
+
+SUFFIXES = {"zstd": ".zst", "lz4": ".lz4"}
+CODECS = {suffix: codec for codec, suffix in SUFFIXES.items()}
+FRAME_BYTES = 4 * 1024**2
+TABLE_PATTERNS = ("*.csv", "*.csv.zst", "*.csv.lz4")
+
+_SKIPPABLE_MAGIC = 0x184D2A5E
+_SEEKABLE_MAGIC = 0x8F92EAB1
+_FOOTER = struct.Struct("<IBI")  # number of frames, descriptor, seekable magic
+_ENTRY = struct.Struct("<II")  # compressed size, decompressed size
+_local = threading.local()
+
+app = typer.Typer()
+
+
+def _module(codec: str) -> Any:
+    try:
+        if codec == "zstd":
+            import zstandard
+
+            return zstandard
+        import lz4.frame
+
+        return lz4.frame
+    except ModuleNotFoundError as e:
+        package = "zstandard" if codec == "zstd" else "lz4"
+        raise ModuleNotFoundError(f"{codec} compression requires: pip install {package}") from e
+
+
+def compress_frame(data: bytes, codec: str, level: int = COMPRESSION_LEVEL) -> bytes:
+    """One self-contained frame; level 0 is the codec's default."""
+    if codec == "lz4":
+        return _module(codec).compress(data, compression_level=level)
+    # compressors are not thread-safe, so each pool thread keeps its own
+    compressors = _local.__dict__.setdefault("zstd", {})
+    if level not in compressors:
+        compressors[level] = _module(codec).ZstdCompressor(level=level)
+    return compressors[level].compress(data)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    """Decompress all frames of `data`, skipping skippable frames such as the seek table."""
+    if codec == "zstd":
+        decompressor = _module(codec).ZstdDecompressor()
+        return decompressor.decompressobj(read_across_frames=True).decompress(data)
+    lz4_frame = _module(codec)
+    parts, offset, view = [], 0, memoryview(data)
+    while offset < len(data):
+        part, used = lz4_frame.decompress(view[offset:], return_bytes_read=True)
+        parts.append(part)
+        offset += used
+    return b"".join(parts)
+
+
+def codec_of(path: str | Path) -> str | None:
+    return CODECS.get(Path(path).suffix)
+
+
+def compressed_path(path: Path, codec: str = COMPRESSION) -> Path:
+    """Where a table meant for `path` is written: with the codec's suffix appended, if any."""
+    if codec == "none" or codec_of(path) is not None:
+        return path
+    return path.with_name(path.name + SUFFIXES[codec])
+
+
+def variants(path: Path) -> list[Path]:
+    """`path` and its compressed variants."""
+    if codec_of(path) is not None:
+        return [path]
+    return [path, *(path.with_name(path.name + suffix) for suffix in CODECS)]
+
+
+def locate(path: Path) -> Path:
+    """The file holding `path`'s data: the newest of its existing variants, else `path`."""
+    existing = [p for p in variants(path) if p.exists()]
+    return max(existing, key=lambda p: p.stat().st_mtime_ns) if existing else path
+
+
+def _read_seek_table(f: IO[bytes]) -> list[tuple[int, int]] | None:
+    end = f.seek(0, os.SEEK_END)
+    if end < _FOOTER.size:
+        return None
+    f.seek(end - _FOOTER.size)
+    frames, descriptor, magic = _FOOTER.unpack(f.read(_FOOTER.size))
+    if magic != _SEEKABLE_MAGIC or descriptor & 0x80:  # per-frame checksums are not written
+        return None
+    f.seek(end - _FOOTER.size - frames * _ENTRY.size)
+    table = f.read(frames * _ENTRY.size)
+    return [_ENTRY.unpack_from(table, i * _ENTRY.size) for i in range(frames)]
+
+
+def _seek_table(frames: list[tuple[int, int]]) -> bytes:
+    entries = b"".join(_ENTRY.pack(*frame) for frame in frames)
+    footer = _FOOTER.pack(len(frames), 0, _SEEKABLE_MAGIC)
+    return struct.pack("<II", _SKIPPABLE_MAGIC, len(entries) + len(footer)) + entries + footer
+
+
+class SeekableWriter(io.RawIOBase):
+    """Compress written bytes into frames on a thread pool, in order, ending with a seek table.
+
+    With `append=True` the seek table of an existing file is read and rewritten
+    after the new frames.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        codec: str,
+        level: int = COMPRESSION_LEVEL,
+        threads: int = CPU_COUNT,
+        append: bool = False,
+    ):
+        super().__init__()
+        self.codec, self.level = codec, level
+        self.frames: list[tuple[int, int]] = []
+        if append and path.exists() and path.stat().st_size > 0:
+            self.file = io.FileIO(path, "r+")
+            table = _read_seek_table(self.file)
+            if table is None:
+                self.file.close()
+                raise NoSeekTable(f"Cannot append to {path}: it has no seek table")
+            self.frames = table
+            self.file.seek(sum(size for size, _ in table))
+            self.file.truncate()
+        else:
+            self.file = io.FileIO(path, "w")
+        self.buffer = bytearray()
+        self.pool = ThreadPoolExecutor(threads)
+        self.max_pending = 2 * threads
+        self.pending: deque[tuple[Future, int]] = deque()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        view = memoryview(data).cast("B")
+        size = len(view)
+        if self.buffer:  # complete the partial frame first
+            take = FRAME_BYTES - len(self.buffer)
+            self.buffer += view[:take]
+            view = view[take:]
+            if len(self.buffer) == FRAME_BYTES:
+                self._submit(bytes(self.buffer))
+                self.buffer.clear()
+        while len(view) >= FRAME_BYTES:
+            self._submit(bytes(view[:FRAME_BYTES]))
+            view = view[FRAME_BYTES:]
+        self.buffer += view
+        return size
+
+    def _submit(self, data: bytes) -> None:
+        future = self.pool.submit(compress_frame, data, self.codec, self.level)
+        self.pending.append((future, len(data)))
+        while len(self.pending) > self.max_pending:
+            self._drain()
+
+    def _drain(self) -> None:
+        future, size = self.pending.popleft()
+        frame = future.result()
+        self.file.write(frame)
+        self.frames.append((len(frame), size))
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            if self.buffer:
+                self._submit(bytes(self.buffer))
+                self.buffer.clear()
+            while self.pending:
+                self._drain()
+            self.file.write(_seek_table(self.frames))
+        finally:
+            self.pool.shutdown()
+            self.file.close()
+            super().close()
+
+
+class NoSeekTable(ValueError):
+    """A compressed file without a seek table, e.g. written by the `zstd` command."""
+
+
+class SeekableReader(io.RawIOBase):
+    """Random access to the uncompressed bytes of a file with a seek table."""
+
+    def __init__(self, path: Path, codec: str):
+        super().__init__()
+        self.codec = codec
+        self.file = io.FileIO(path, "r")
+        table = _read_seek_table(self.file)
+        if table is None:
+            self.file.close()
+            raise NoSeekTable(f"{path} has no seek table")
+        self.offsets = [0, *accumulate(size for size, _ in table)]
+        self.starts = [0, *accumulate(size for _, size in table)]
+        self.size = self.starts[-1]
+        self.position = 0
+        self.cached: tuple[int, bytes] = (-1, b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self.position, os.SEEK_END: self.size}[whence]
+        self.position = max(0, base + offset)
+        return self.position
+
+    def tell(self) -> int:
+        return self.position
+
+    def _frame(self, index: int) -> bytes:
+        if self.cached[0] != index:
+            self.file.seek(self.offsets[index])
+            data = self.file.read(self.offsets[index + 1] - self.offsets[index])
+            self.cached = (index, decompress(data, self.codec))
+        return self.cached[1]
+
+    def readinto(self, buffer: Any) -> int:
+        if self.position >= self.size:
+            return 0
+        index = bisect_right(self.starts, self.position) - 1
+        frame = self._frame(index)
+        start = self.position - self.starts[index]
+        n = min(len(buffer), len(frame) - start)
+        stop = start + n
+        buffer[:n] = frame[start:stop]
+        self.position += n
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            self.file.close()
+        super().close()
+
+
+def _stream_reader(path: Path, codec: str) -> IO[bytes]:
+    if codec == "lz4":
+        return _module(codec).open(path, "rb")
+    decompressor = _module(codec).ZstdDecompressor()
+    return io.BufferedReader(decompressor.stream_reader(open(path, "rb"), read_across_frames=True))
+
+
+def open_file(
+    path: str | Path, mode: str = "r", level: int = COMPRESSION_LEVEL, **kwargs: Any
+) -> IO[Any]:
+    """Like `open`, (de)compressing `.zst` / `.lz4` files in seekable frames.
+
+    Modes are `r`, `w` and `a`, with `b` for bytes; text keyword arguments such as
+    `newline` are passed on to the text wrapper. Compressed files written by other
+    tools have no seek table and are read front to back.
+    """
+    path = Path(path)
+    codec = codec_of(path)
+    if codec is None:
+        return open(path, mode, **kwargs)
+    if mode[0] == "r":
+        try:
+            stream: Any = io.BufferedReader(SeekableReader(path, codec), FRAME_BYTES)
+        except NoSeekTable:
+            stream = _stream_reader(path, codec)
+    else:
+        stream = io.BufferedWriter(SeekableWriter(path, codec, level, append=mode[0] == "a"))
+    return stream if "b" in mode else io.TextIOWrapper(stream, **kwargs)
+
+
+def data_size(path: Path) -> int:
+    """Uncompressed size of a file."""
+    if codec_of(path) is None:
+        return path.stat().st_size
+    with open(path, "rb") as f:
+        table = _read_seek_table(f)
+    if table is None:
+        raise NoSeekTable(f"{path} has no seek table, convert it with compression.py first")
+    return sum(size for _, size in table)
+
+
+def convert(path: Path, codec: str = COMPRESSION, level: int = COMPRESSION_LEVEL) -> Path:
+    """Rewrite a table with `codec` (`none` to decompress it), replacing the original."""
+    target = compressed_path(path.with_suffix("") if codec_of(path) else path, codec)
+    if target == path and codec_of(path) is None:
+        return path
+    if target == path:
+        with open(path, "rb") as f:
+            if _read_seek_table(f) is not None:
+                return path
+    tmp = target.with_name(f".tmp-{target.name}")  # keeps the codec suffix
+    with open_file(path, "rb") as source, open_file(tmp, "wb", level) as output:
+        shutil.copyfileobj(source, output, FRAME_BYTES)
+    os.replace(tmp, target)
+    if target != path:
+        path.unlink()
+    return target
+
+
+@app.command()
+def main(
+    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
+    paths: Annotated[
+        list[Path] | None,
+        typer.Argument(help="Tables or directories [default: data/interim, data/processed]"),
+    ] = None,
+    # ----------------------------------------------
+    codec: Annotated[
+        str, typer.Option(help="zstd, lz4 or none [default: COMPRESSION]")
+    ] = COMPRESSION,
+    level: int = COMPRESSION_LEVEL,
+):
+    """Convert existing tables to the configured codec, e.g. after changing COMPRESSION."""
+    files = []
+    for path in paths or [INTERIM_DATA_DIR, PROCESSED_DATA_DIR]:
+        if path.is_dir():
+            files.extend(p for pattern in TABLE_PATTERNS for p in sorted(path.rglob(pattern)))
+        else:
+            files.append(path)
+    before = sum(path.stat().st_size for path in files)
+    after = sum(convert(path, codec, level).stat().st_size for path in files)
+    logger.success(
+        f"{len(files)} tables now stored with {codec}: "
+        f"{before / 2**20:.1f} MiB -> {after / 2**20:.1f} MiB"
+    )
+
+
+if __name__ == "__main__":
+    app()
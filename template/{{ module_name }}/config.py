@@ -1,24 +1,34 @@
+import math
+import os
 from pathlib import Path
 import sys
+from typing import TextIO
 
 from dotenv import load_dotenv
 from loguru import logger
 
 ########### SETUP ###############
 
-# set up logger
-logger.remove()
-logger.add(sys.stdout, colorize=True)
-
-# If tqdm is installed, configure loguru with tqdm.write
-# https://github.com/Delgan/loguru/issues/135
-try:
-    from tqdm import tqdm
 
+def log_to(stream: TextIO) -> None:
+    """Send loguru output to `stream`."""
     logger.remove()
-    logger.add(lambda msg: tqdm.write(msg, end="", file=sys.stdout), colorize=True)
-except ModuleNotFoundError:
-    pass
+    logger.add(stream, colorize=True)
+
+    # If tqdm is installed, configure loguru with tqdm.write
+    # https://github.com/Delgan/loguru/issues/135
+    try:
+        from tqdm import tqdm
+
+        logger.remove()
+        logger.add(lambda msg: tqdm.write(msg, end="", file=stream), colorize=True)
+    except ModuleNotFoundError:
+        pass
+
+
+# set up logger; messages logged while importing go to stderr, so that they never mix
+# with data written to stdout (e.g. the predictions of the streaming scorer)
+log_to(sys.stderr)
 
 ########## VARIABLES ############
 
@@ -36,5 +46,83 @@ MODELS_DIR = PROJ_ROOT / "models"
 REPORTS_DIR = PROJ_ROOT / "reports"
 FIGURES_DIR = REPORTS_DIR / "figures"
 
+# bucket mirrored by `make sync_data_up` (empty without dataset storage), see storage.py
+{%- if dataset_storage == 's3' %}
+DATASET_URI = os.getenv("DATASET_URI", "s3://{{ s3_bucket }}")
+{%- elif dataset_storage == 'gcs' %}
+DATASET_URI = os.getenv("DATASET_URI", "gs://{{ gcs_bucket }}")
+{%- elif dataset_storage == 'azure' %}
+DATASET_URI = os.getenv("DATASET_URI", "az://{{ azure_container }}")
+{%- else %}
+DATASET_URI = os.getenv("DATASET_URI", "")
+{%- endif %}
+
+# host-wide content-addressed cache shared by all projects on this machine (see cas.py),
+# e.g. DATA_CACHE_DIR=/srv/data-cache in .env; files are linked into it as hard links
+# or, with DATA_CACHE_LINK=reflink, copy-on-write clones (btrfs, XFS)
+DATA_CACHE_DIR = Path(os.environ["DATA_CACHE_DIR"]) if os.getenv("DATA_CACHE_DIR") else None
+DATA_CACHE_LINK = os.getenv("DATA_CACHE_LINK", "hardlink")
+if DATA_CACHE_LINK not in ("hardlink", "reflink"):
+    raise ValueError(f"DATA_CACHE_LINK must be hardlink or reflink, not {DATA_CACHE_LINK!r}")
+
+# compression of tables written to data/interim and data/processed (see compression.py):
+# none, zstd or lz4, at COMPRESSION_LEVEL (0 is the codec's default)
+COMPRESSION = os.getenv("COMPRESSION", "none")
+if COMPRESSION not in ("none", "zstd", "lz4"):
+    raise ValueError(f"COMPRESSION must be none, zstd or lz4, not {COMPRESSION!r}")
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "0"))
+
+# floating point precision of feature arrays (features loaded by train/predict,
+# DataFrames from dtypes.load_frame), override with FLOAT_DTYPE in .env;
+# reductions are still accumulated in float64 (see precision.py)
+FLOAT_DTYPE = os.getenv("FLOAT_DTYPE", "{{ numeric_precision | default('float64') }}")
+if FLOAT_DTYPE not in ("float32", "float64"):
+    raise ValueError(f"FLOAT_DTYPE must be float32 or float64, not {FLOAT_DTYPE!r}")
+
+
+def _available_cpus() -> int:
+    """CPUs this process may use: its affinity mask, capped by a cgroup (container) quota."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    quota = None
+    try:  # cgroup v2: "<quota> <period>" or "max <period>"
+        limit, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:  # cgroup v1: a quota of -1 means unlimited
+            limit = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text())
+            period = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota is not None:
+        cpus = min(cpus or 1, max(1, math.ceil(quota)))
+    return cpus or 1
+
+
+# CPU budget of parallel stages (see parallel.py): WORKERS processes or threads, each
+# allowed THREADS_PER_WORKER BLAS/OpenMP threads; override any of them in .env
+CPU_COUNT = int(os.getenv("CPU_COUNT") or _available_cpus())
+WORKERS = int(os.getenv("WORKERS") or CPU_COUNT)
+THREADS_PER_WORKER = int(os.getenv("THREADS_PER_WORKER") or max(1, CPU_COUNT // WORKERS))
+
+# native thread pools outside worker pools default to the CPU budget rather than to every
+# core of the host (only effective before NumPy and friends are imported)
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+for _var in THREAD_ENV_VARS:
+    os.environ.setdefault(_var, str(CPU_COUNT))
+
 # log current root dir
 logger.info(f"PROJ_ROOT path is: {PROJ_ROOT}")
+
+# later messages go to stderr as well, unless LOG_STREAM=stdout is set in .env
+LOG_STREAM = sys.stdout if os.getenv("LOG_STREAM") == "stdout" else sys.stderr
+if LOG_STREAM is not sys.stderr:
+    log_to(LOG_STREAM)
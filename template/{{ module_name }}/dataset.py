@@ -1,28 +1,273 @@
+from collections.abc import Iterable, Iterator
+from contextlib import nullcontext
+from itertools import islice
+import math
 from pathlib import Path
+import random
+import shutil
+from typing import Annotated, Any
 
 from loguru import logger
 from tqdm import tqdm
 import typer
 
-from {{ module_name }}.config import PROCESSED_DATA_DIR, RAW_DATA_DIR
+from {{ module_name }}.compression import variants
+from {{ module_name }}.config import INTERIM_DATA_DIR, PROCESSED_DATA_DIR, RAW_DATA_DIR
+from {{ module_name }}.dedup import Deduplicator
+from {{ module_name }}.ingest import read_csv_parallel, read_csv_tail
+from {{ module_name }}.manifest import MANIFEST_DIR, Manifest
+from {{ module_name }}.partitioned import PartitionedDataset
+from {{ module_name }}.smallfiles import read_shard
+from {{ module_name }}.streaming import (
+    DEFAULT_BATCH_SIZE,
+    inputs_ready,
+    read_csv_batches,
+    read_table,
+    write_csv_batches,
+    write_table,
+)
 
 app = typer.Typer()
 
 
+def process(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Clean raw records and return the processed table."""
+    # ---- REPLACE THIS WITH YOUR OWN CODE ----
+    logger.info("Processing dataset...")
+    processed = []
+    for i, row in enumerate(tqdm(rows, total=len(rows))):
+        if i == 5:
+            logger.info("Something happened for iteration 5.")
+        processed.append(row)
+    logger.success("Processing dataset complete.")
+    # -----------------------------------------
+    return processed
+
+
+def read_rows(path: Path, workers: int = 1, offset: int = 0) -> list[dict[str, Any]]:
+    """Records of a CSV file or tar shard; of a CSV file only from byte `offset` on."""
+    if path.suffix == ".tar":
+        return read_shard(path)
+    if offset:
+        return read_csv_tail(path, offset)
+    if workers > 1:
+        return [row for batch in read_csv_parallel(path, workers=workers) for row in batch]
+    return read_table(path)
+
+
+def input_files(input_path: Path) -> list[Path]:
+    """`input_path` itself, or the CSV files and tar shards in the directory."""
+    if input_path.is_dir():
+        return sorted([*input_path.glob("*.csv"), *input_path.glob("*.tar")])
+    return [input_path]
+
+
+def _starts_record(path: Path, offset: int) -> bool:
+    """Whether byte `offset` of a plain CSV file follows a newline."""
+    if path.suffix != ".csv":
+        return False
+    with open(path, "rb") as f:
+        f.seek(offset - 1)
+        return f.read(1) == b"\n"
+
+
+def pending_offsets(manifest: Manifest, files: list[Path]) -> dict[Path, int] | None:
+    """Files to process with the byte offset to start from, or None if a rebuild is needed.
+
+    New files start at 0 and CSV files that were only appended to since they were
+    recorded at their previous size. Any other change (a rewritten file, or data
+    appended to a tar shard) invalidates rows already in the output.
+    """
+    offsets = {}
+    for file in manifest.pending(files):
+        offset = manifest.resume_offset(file)
+        if offset is None or (offset and not _starts_record(file, offset)):
+            logger.warning(f"{file} was rewritten since it was processed")
+            return None
+        offsets[file] = offset
+    return offsets
+
+
+def _uniform(rng: random.Random) -> float:
+    """Uniform on the open interval (0, 1), safe to take the logarithm of."""
+    u = rng.random()
+    return u if u > 0.0 else _uniform(rng)
+
+
+class Reservoir:
+    """Uniform random sample of at most `size` items of a stream (Vitter's Algorithm L).
+
+    Once full, it draws how many items to skip before the next replacement, so
+    random numbers are only drawn for the O(size * log(n / size)) items that are kept.
+    """
+
+    def __init__(self, size: int, rng: random.Random):
+        self.size = size
+        self.rng = rng
+        self.items: list[Any] = []
+        self.seen = 0
+        self.w = 1.0
+        self.next = 0
+
+    def _skip(self) -> None:
+        self.w *= math.exp(math.log(_uniform(self.rng)) / self.size)
+        self.next = self.seen + math.floor(math.log(_uniform(self.rng)) / math.log1p(-self.w)) + 1
+
+    def add(self, item: Any) -> None:
+        if len(self.items) < self.size:
+            self.items.append(item)
+            if len(self.items) == self.size:
+                self._skip()
+        elif self.seen == self.next:
+            self.items[self.rng.randrange(self.size)] = item
+            self._skip()
+        self.seen += 1
+
+
+def _stratum_rng(seed: int, stratum: Any) -> random.Random:
+    # one generator per stratum, so a stratum's sample does not depend on the others
+    return random.Random(f"{seed}:{stratum}")
+
+
+def sample_rows(
+    rows: Iterable[dict[str, Any]],
+    size: int | None = None,
+    fraction: float | None = None,
+    stratify_by: str | None = None,
+    seed: int = 0,
+) -> Iterator[dict[str, Any]]:
+    """Sample records in one pass, deterministically for a given `seed`.
+
+    With `fraction`, every record is kept with that probability and yielded right
+    away, in input order. With `size`, a reservoir of `size` records (per stratum
+    with `stratify_by`) is yielded once the stream is exhausted, in input order.
+    Memory is bounded by the reservoirs: `size` times the number of strata.
+    """
+    if (size is None) == (fraction is None):
+        raise ValueError("Give exactly one of size and fraction")
+    rngs: dict[Any, random.Random] = {}
+    reservoirs: dict[Any, Reservoir] = {}
+    for index, row in enumerate(rows):
+        stratum = row[stratify_by] if stratify_by else None
+        if fraction is not None:
+            if stratum not in rngs:
+                rngs[stratum] = _stratum_rng(seed, stratum)
+            if rngs[stratum].random() < fraction:
+                yield row
+            continue
+        if stratum not in reservoirs:
+            reservoirs[stratum] = Reservoir(size, _stratum_rng(seed, stratum))
+        reservoirs[stratum].add((index, row))
+    kept = [item for reservoir in reservoirs.values() for item in reservoir.items]
+    for _, row in sorted(kept, key=lambda item: item[0]):
+        yield row
+
+
+def _stream_rows(files: list[Path]) -> Iterator[dict[str, Any]]:
+    for file in files:
+        batches = [read_shard(file)] if file.suffix == ".tar" else read_csv_batches(file)
+        for batch in batches:
+            yield from batch
+
+
 @app.command()
 def main(
     # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
     input_path: Path = RAW_DATA_DIR / "dataset.csv",
     output_path: Path = PROCESSED_DATA_DIR / "dataset.csv",
     # ----------------------------------------------
+    workers: int = 1,
+    partition_by: Annotated[
+        list[str] | None,
+        typer.Option(help="Column to partition the output directory by (repeatable)"),
+    ] = None,
+    dedup_key: Annotated[
+        list[str] | None,
+        typer.Option(help="Key column for deduplication against all previous runs (repeatable)"),
+    ] = None,
+    full_refresh: Annotated[
+        bool, typer.Option(help="Ignore the manifest and rebuild the output from all inputs")
+    ] = False,
 ):
-    # ---- REPLACE THIS WITH YOUR OWN CODE ----
-    logger.info("Processing dataset...")
-    for i in tqdm(range(10), total=10):
-        if i == 5:
-            logger.info("Something happened for iteration 5.")
-    logger.success("Processing dataset complete.")
-    # -----------------------------------------
+    """Process new raw files and rows appended to processed ones into the processed dataset.
+
+    `input_path` is a CSV file or a directory of CSV files and tar shards of small files
+    (see `smallfiles.py`). Processed inputs are tracked in a manifest under
+    `data/interim/manifests`, so re-runs skip unchanged files and only read the rows
+    appended to a CSV file since. When a processed file was rewritten, the output is
+    rebuilt from all inputs, since its old rows cannot be told apart.
+    """
+    if not inputs_ready(input_path):
+        return
+    files = input_files(input_path)
+    dataset_root = output_path.with_suffix("")
+    manifest = Manifest(MANIFEST_DIR / f"{output_path.stem}.json")
+    pending = None if full_refresh else pending_offsets(manifest, files)
+    if pending is None:
+        logger.info(f"Rebuilding {output_path} from all inputs")
+        full_refresh = True
+        manifest.clear()
+        for path in variants(output_path):
+            path.unlink(missing_ok=True)
+        if partition_by:
+            shutil.rmtree(dataset_root, ignore_errors=True)
+        pending = dict.fromkeys(files, 0)
+    logger.info(f"{len(pending)} of {len(files)} input files are new or appended to")
+
+    dedup_context = Deduplicator(dedup_key, reset=full_refresh) if dedup_key else nullcontext()
+    with dedup_context as dedup:
+        for file, offset in pending.items():
+            rows = read_rows(file, workers, offset)
+            if dedup is not None:
+                rows = dedup.filter_batch(rows)
+            processed = process(rows)
+            if partition_by:
+                PartitionedDataset(dataset_root, partition_by).write([processed])
+            else:
+                write_table(processed, output_path, append=True)
+            # advance the watermark only once the file's output is durable
+            if dedup is not None:
+                dedup.save()
+            manifest.record(file)
+            manifest.save()
+    manifest.save()
+
+
+@app.command()
+def sample(
+    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
+    input_path: Path = RAW_DATA_DIR / "dataset.csv",
+    output_path: Annotated[
+        Path | None, typer.Option(help="[default: data/interim/<input>_sample.csv]")
+    ] = None,
+    # ----------------------------------------------
+    size: Annotated[
+        int | None, typer.Option(help="Reservoir size: rows to keep (per stratum)")
+    ] = None,
+    fraction: Annotated[
+        float | None, typer.Option(help="Keep each row with this probability, e.g. 0.01")
+    ] = None,
+    stratify_by: Annotated[
+        str | None, typer.Option(help="Key column with one reservoir per value")
+    ] = None,
+    seed: int = 0,
+):
+    """Write a random development subset of the raw data in one streaming pass.
+
+    `--size` keeps a uniform reservoir of that many rows, or that many rows of every
+    value of `--stratify-by`; `--fraction` keeps each row with that probability, so
+    every stratum is sampled at the same rate. The same seed gives the same sample.
+    """
+    if (size is None) == (fraction is None):
+        raise typer.BadParameter("Give exactly one of --size and --fraction")
+    if not inputs_ready(input_path):
+        return
+    output_path = output_path or INTERIM_DATA_DIR / f"{input_path.stem}_sample.csv"
+    files = input_files(input_path)
+    rows = iter(sample_rows(_stream_rows(files), size, fraction, stratify_by, seed))
+    batches = iter(lambda: list(islice(rows, DEFAULT_BATCH_SIZE)), [])
+    written = write_csv_batches(batches, output_path)
+    logger.success(f"Sampled {written} rows from {len(files)} files into {output_path}")
 
 
 if __name__ == "__main__":
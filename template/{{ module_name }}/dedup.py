@@ -0,0 +1,160 @@
+"""Streaming record deduplication with bounded memory, resumable across runs.
+
+Each record is reduced to a 128-bit digest of its key columns. A scalable Bloom
+filter answers "definitely new" for most records without touching disk; only
+Bloom hits are checked against the exact digest set, which is spilled to an
+on-disk SQLite table. Both are persisted under `INTERIM_DATA_DIR / "dedup"`, so
+each new drop is deduplicated against the full history in a single pass.
+"""
+
+from collections.abc import Iterable, Iterator, Sequence
+from hashlib import blake2b
+import math
+import os
+from pathlib import Path
+import pickle
+import shutil
+import sqlite3
+from typing import Any
+
+from loguru import logger
+
+from {{ module_name }}.config import INTERIM_DATA_DIR
+
+DEDUP_DIR = INTERIM_DATA_DIR / "dedup"
+_SQL_CHUNK = 900  # stay below SQLite's host-parameter limit
+
+
+class BloomFilter:
+    """Fixed-capacity Bloom filter using double hashing over a 128-bit digest."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.n_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.n_hashes = max(1, round(self.n_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.n_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest: bytes) -> Iterator[int]:
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.n_bits for i in range(self.n_hashes))
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(digest))
+
+    def add(self, digest: bytes) -> None:
+        for p in self._positions(digest):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+
+class ScalableBloomFilter:
+    """Bloom filter that grows by adding tighter filters as it fills up (Almeida et al.)."""
+
+    def __init__(self, initial_capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.error_rate = error_rate
+        self.filters = [BloomFilter(initial_capacity, error_rate / 2)]
+
+    def __contains__(self, digest: bytes) -> bool:
+        return any(digest in f for f in self.filters)
+
+    def add(self, digest: bytes) -> None:
+        current = self.filters[-1]
+        if current.count >= current.capacity:
+            tightening = 0.5 ** (len(self.filters) + 1)
+            current = BloomFilter(current.capacity * 2, self.error_rate * tightening)
+            self.filters.append(current)
+        current.add(digest)
+
+
+def record_digest(row: dict[str, Any], key_columns: Sequence[str]) -> bytes:
+    key = "\x1f".join(str(row.get(column, "")) for column in key_columns)
+    return blake2b(key.encode(), digest_size=16).digest()
+
+
+class Deduplicator:
+    """Drop records whose key columns were already seen in this or any previous run.
+
+    State is kept per key-column set (`dedup/<col1>-<col2>` by default) and is
+    discarded first when `reset=True`. Use as a context manager so the filter and
+    key store are saved on exit.
+    """
+
+    def __init__(
+        self,
+        key_columns: Sequence[str],
+        state_dir: Path | None = None,
+        initial_capacity: int = 1_000_000,
+        error_rate: float = 0.001,
+        reset: bool = False,
+    ):
+        self.key_columns = list(key_columns)
+        self.state_dir = state_dir or DEDUP_DIR / "-".join(self.key_columns)
+        if reset:
+            shutil.rmtree(self.state_dir, ignore_errors=True)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.bloom_path = self.state_dir / "bloom.pkl"
+        if self.bloom_path.exists():
+            with open(self.bloom_path, "rb") as f:
+                self.bloom = pickle.load(f)
+        else:
+            self.bloom = ScalableBloomFilter(initial_capacity, error_rate)
+        self.db = sqlite3.connect(self.state_dir / "keys.sqlite")
+        self.db.execute("CREATE TABLE IF NOT EXISTS keys (digest BLOB PRIMARY KEY) WITHOUT ROWID")
+        self.stats = {"records": 0, "duplicates": 0, "candidates": 0}
+
+    def _known(self, digests: list[bytes]) -> set[bytes]:
+        known = set()
+        for start in range(0, len(digests), _SQL_CHUNK):
+            stop = start + _SQL_CHUNK
+            chunk = digests[start:stop]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = self.db.execute(
+                f"SELECT digest FROM keys WHERE digest IN ({placeholders})", chunk
+            )
+            known.update(row[0] for row in cursor)
+        return known
+
+    def filter_batch(self, batch: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        digests = [record_digest(row, self.key_columns) for row in batch]
+        candidates = [d for d in digests if d in self.bloom]
+        known = self._known(candidates)
+        self.stats["records"] += len(batch)
+        self.stats["candidates"] += len(candidates)
+
+        kept, new_digests = [], []
+        for row, digest in zip(batch, digests):
+            if digest in known:
+                continue
+            known.add(digest)  # also drops duplicates within the batch
+            self.bloom.add(digest)
+            new_digests.append((digest,))
+            kept.append(row)
+        self.db.executemany("INSERT OR IGNORE INTO keys VALUES (?)", new_digests)
+        self.stats["duplicates"] += len(batch) - len(kept)
+        return kept
+
+    def filter(self, batches: Iterable[list[dict[str, Any]]]) -> Iterator[list[dict[str, Any]]]:
+        for batch in batches:
+            if kept := self.filter_batch(batch):
+                yield kept
+
+    def save(self) -> None:
+        self.db.commit()
+        tmp = self.bloom_path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(self.bloom, f)
+        os.replace(tmp, self.bloom_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.save()
+            logger.info(
+                f"Dedup: {self.stats['duplicates']} of {self.stats['records']} records dropped "
+                f"({self.stats['candidates']} Bloom hits checked on disk)"
+            )
+        self.db.close()
@@ -0,0 +1,312 @@
+"""Compact column types for tables, inferred in one streaming pass and persisted.
+
+`infer_schema` tracks min/max, nulls and a bounded set of distinct values per
+column and picks the narrowest type: the smallest (u)int that holds the range,
+float32 when every value survives a float32 round trip, categories for
+low-cardinality strings and (Arrow-backed) strings otherwise. The schema is
+saved next to the data as `<name>.schema.json`; `load_table` and `load_frame`
+apply it on every later load instead of re-inferring. With `FLOAT_DTYPE=float32`
+(see `config.py`) `load_frame` reads every float column as float32.
+
+Rows appended after the schema was inferred may no longer fit it. `load_frame`
+checks every chunk against the schema before narrowing and raises `StaleSchema`
+rather than wrapping integers around or turning unseen categories into NaN;
+re-run the inference to widen the schema.
+
+Run `python -m {{ module_name }}.dtypes <csv>` to infer a schema and write a
+memory before/after report (the report needs pandas).
+"""
+
+from collections.abc import Callable, Iterable, Iterator
+import json
+from pathlib import Path
+import struct
+from typing import Annotated, Any
+
+from loguru import logger
+import typer
+
+from {{ module_name }}.compression import locate, open_file
+from {{ module_name }}.config import FLOAT_DTYPE, PROCESSED_DATA_DIR, REPORTS_DIR
+from {{ module_name }}.profiling import NULL_VALUES
+from {{ module_name }}.streaming import DEFAULT_BATCH_SIZE, read_csv_batches
+
+MAX_CATEGORIES = 1_000
+CATEGORY_RATIO = 0.5  # at most one distinct value per two non-null rows
+LOAD_CHUNK_ROWS = 1_000_000
+
+_INT_TYPES = [
+    ("int8", -(2**7), 2**7 - 1),
+    ("int16", -(2**15), 2**15 - 1),
+    ("int32", -(2**31), 2**31 - 1),
+    ("int64", -(2**63), 2**63 - 1),
+]
+_UINT_TYPES = [
+    ("uint8", 2**8 - 1),
+    ("uint16", 2**16 - 1),
+    ("uint32", 2**32 - 1),
+    ("uint64", 2**64 - 1),
+]
+
+app = typer.Typer()
+
+
+def _fits_float32(number: float) -> bool:
+    try:
+        single = struct.unpack("f", struct.pack("f", number))[0]
+    except OverflowError:
+        return False
+    return float(f"{single:.7g}") == number
+
+
+class _ColumnStats:
+    def __init__(self):
+        self.count = 0
+        self.nulls = 0
+        self.integer = True
+        self.numeric = True
+        self.float32 = True
+        self.low: float | None = None
+        self.high: float | None = None
+        self.distinct: set[str] | None = set()
+
+    def update(self, value: Any) -> None:
+        self.count += 1
+        if value is None or value in NULL_VALUES:
+            self.nulls += 1
+            return
+        if self.distinct is not None:
+            self.distinct.add(str(value))
+            if len(self.distinct) > MAX_CATEGORIES:
+                self.distinct = None
+        if not self.numeric:
+            return
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            self.numeric = self.integer = False
+            return
+        if self.integer and not (isinstance(value, int) or str(value).lstrip("+-").isdigit()):
+            self.integer = False
+        if self.integer:
+            number = int(value)  # exact, beyond float's 53 bits
+        elif self.float32:
+            self.float32 = _fits_float32(number)
+        self.low = number if self.low is None else min(self.low, number)
+        self.high = number if self.high is None else max(self.high, number)
+
+    def dtype(self) -> dict[str, Any]:
+        values = self.count - self.nulls
+        if values == 0:
+            return {"dtype": "string"}
+        if self.numeric and self.integer:
+            low, high = int(self.low), int(self.high)
+            if low >= 0:
+                dtype = next((name for name, top in _UINT_TYPES if high <= top), None)
+            else:
+                dtype = next(
+                    (name for name, bottom, top in _INT_TYPES if bottom <= low and high <= top),
+                    None,
+                )
+            if dtype is None:  # beyond 64 bits: keep the digits exactly as text
+                return {"dtype": "string"}
+            if self.nulls:  # pandas' nullable integer types, e.g. Int16 or UInt8
+                dtype = dtype.replace("uint", "UInt").replace("int", "Int")
+            return {"dtype": dtype, "min": low, "max": high}
+        if self.numeric:
+            dtype = "float32" if self.float32 else "float64"
+            return {"dtype": dtype, "min": self.low, "max": self.high}
+        if self.distinct is not None and len(self.distinct) <= CATEGORY_RATIO * values:
+            return {"dtype": "category", "categories": sorted(self.distinct)}
+        return {"dtype": "string"}
+
+
+def infer_schema(batches: Iterable[list[dict[str, Any]]]) -> dict[str, dict[str, Any]]:
+    """Narrowest column types for a stream of record batches."""
+    stats: dict[str, _ColumnStats] = {}
+    for batch in batches:
+        for row in batch:
+            for column, value in row.items():
+                if column not in stats:
+                    stats[column] = _ColumnStats()
+                stats[column].update(value)
+    return {column: s.dtype() for column, s in stats.items()}
+
+
+def schema_path(data_path: Path) -> Path:
+    return data_path.with_suffix(".schema.json")
+
+
+def save_schema(schema: dict[str, dict[str, Any]], data_path: Path) -> Path:
+    path = schema_path(data_path)
+    path.write_text(json.dumps(schema, indent=1))
+    return path
+
+
+def load_schema(data_path: Path) -> dict[str, dict[str, Any]] | None:
+    path = schema_path(data_path)
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def _caster(dtype: str) -> Callable[[Any], Any]:
+    kind = int if "int" in dtype.lower() else float if dtype.startswith("float") else None
+    if kind is None:
+        return lambda value: value
+
+    def cast(value: Any) -> Any:
+        return None if value is None or value in NULL_VALUES else kind(value)
+
+    return cast
+
+
+def read_typed_batches(
+    path: Path, batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[list[dict[str, Any]]]:
+    """Like `streaming.read_csv_batches`, with numeric columns typed by the persisted schema."""
+    schema = load_schema(path) or {}
+    casters = {column: _caster(spec["dtype"]) for column, spec in schema.items()}
+    for batch in read_csv_batches(path, batch_size):
+        if casters:
+            batch = [
+                {k: casters[k](v) if k in casters else v for k, v in row.items()} for row in batch
+            ]
+        yield batch
+
+
+def load_table(path: Path) -> list[dict[str, Any]]:
+    """Read a CSV file as records, with numeric columns typed by its persisted schema."""
+    return [row for batch in read_typed_batches(path) for row in batch]
+
+
+def pandas_dtypes(schema: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    import pandas as pd
+
+    try:
+        import pyarrow  # noqa: F401
+
+        string_dtype = pd.StringDtype("pyarrow")
+    except ModuleNotFoundError:
+        string_dtype = pd.StringDtype()
+    dtypes = {}
+    for column, spec in schema.items():
+        if spec["dtype"] == "category":
+            dtypes[column] = pd.CategoricalDtype(spec["categories"])
+        elif spec["dtype"] == "string":
+            dtypes[column] = string_dtype
+        elif spec["dtype"] == "float64":
+            dtypes[column] = FLOAT_DTYPE
+        else:
+            dtypes[column] = spec["dtype"]
+    return dtypes
+
+
+class StaleSchema(ValueError):
+    """The data holds values its persisted schema cannot represent."""
+
+
+def _stale_columns(chunk: Any, schema: dict[str, dict[str, Any]]) -> list[str]:
+    """Columns of a chunk read without narrowing whose values do not fit the schema."""
+    import numpy as np
+    import pandas as pd
+
+    stale = []
+    for column, spec in schema.items():
+        if column not in chunk.columns:
+            continue
+        dtype = spec["dtype"]
+        values = chunk[column].dropna()
+        if dtype == "category":
+            fits = values.isin(spec["categories"]).all()
+        elif "int" in dtype.lower():
+            info = np.iinfo(dtype.lower())
+            fits = (len(values) == len(chunk) or not dtype.islower()) and (  # nulls: UInt8 etc.
+                values.empty
+                or pd.api.types.is_numeric_dtype(values)
+                and bool((values == values.round()).all())
+                and info.min <= values.min()
+                and values.max() <= info.max
+            )
+        elif dtype == "float32":
+            limit = np.finfo(np.float32).max
+            fits = values.empty or (
+                pd.api.types.is_numeric_dtype(values) and bool((values.abs() <= limit).all())
+            )
+        else:
+            continue
+        if not fits:
+            stale.append(column)
+    return stale
+
+
+def load_frame(path: Path) -> Any:
+    """Read a CSV file into a pandas DataFrame using its persisted schema, if any.
+
+    Chunks are read without narrowing, checked against the schema and only then
+    cast, so peak memory is one wide chunk on top of the compact result.
+    """
+    try:
+        import pandas as pd
+    except ModuleNotFoundError as e:
+        raise ModuleNotFoundError("load_frame requires pandas: pip install pandas") from e
+
+    schema = load_schema(path)
+    with open_file(locate(path), newline="") as f:
+        if not schema:
+            return pd.read_csv(f)
+        dtypes = pandas_dtypes(schema)
+        # categories are compared as the strings they were inferred from
+        wide = {column: str for column, spec in schema.items() if spec["dtype"] == "category"}
+        chunks = []
+        for chunk in pd.read_csv(f, dtype=wide, chunksize=LOAD_CHUNK_ROWS):
+            if stale := _stale_columns(chunk, schema):
+                raise StaleSchema(
+                    f"Columns {stale} of {path} no longer fit {schema_path(path)}; "
+                    f"re-infer it with `python -m {{ module_name }}.dtypes {path}`"
+                )
+            chunks.append(chunk.astype({c: dtypes[c] for c in chunk.columns if c in dtypes}))
+    return pd.concat(chunks, ignore_index=True)
+
+
+def memory_report(path: Path) -> dict[str, Any]:
+    """Per-column memory of the default pandas load versus the schema-typed load."""
+    try:
+        import pandas as pd
+    except ModuleNotFoundError as e:
+        raise ModuleNotFoundError("The memory report requires pandas: pip install pandas") from e
+
+    with open_file(locate(path), newline="") as f:
+        before = pd.read_csv(f).memory_usage(deep=True, index=False)
+    after = load_frame(path).memory_usage(deep=True, index=False)
+    columns = {
+        column: {"before": int(before[column]), "after": int(after[column])}
+        for column in before.index
+    }
+    return {"columns": columns, "before": int(before.sum()), "after": int(after.sum())}
+
+
+@app.command()
+def main(
+    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
+    input_path: Annotated[Path, typer.Argument()] = PROCESSED_DATA_DIR / "features.csv",
+    # ----------------------------------------------
+    report: bool = True,
+):
+    """Infer and persist the compact schema of a CSV file, then report memory savings."""
+    schema = infer_schema(read_csv_batches(input_path))
+    path = save_schema(schema, input_path)
+    logger.success(f"Schema for {len(schema)} columns written to {path}")
+    if not report:
+        return
+    result = memory_report(input_path)
+    report_path = REPORTS_DIR / f"memory_{input_path.stem}.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(result, indent=2))
+    ratio = result["before"] / max(result["after"], 1)
+    logger.info(
+        f"Memory: {result['before'] / 2**20:.1f} MiB -> {result['after'] / 2**20:.1f} MiB "
+        f"({ratio:.1f}x smaller), report written to {report_path}"
+    )
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,231 @@
+"""Embedded, memory-mapped feature store for entity lookups at predict time.
+
+A store is a directory under `PROCESSED_DATA_DIR / "feature_store"` holding
+`index.bin`, fixed-width big-endian records (entity hash, timestamp, offset,
+length) sorted by entity then time; `values.bin`, the JSON-encoded feature
+records; and `meta.json`. Both data files are memory-mapped read-only, so any
+number of threads and processes share one copy through the page cache. A lookup
+is a binary search over the index, and batched lookups are sorted first so that
+each search starts where the previous one ended.
+
+Each entity can have many versions by timestamp. `as_of` returns the newest
+version at or before that time, which keeps training joins free of future data.
+Stores are built out of core (sorted runs, then a merge) into a temporary
+directory and swapped in by rename, so readers never see a partial store.
+"""
+
+from collections.abc import Iterable, Iterator, Sequence
+from datetime import datetime, timedelta
+from hashlib import blake2b
+import heapq
+import json
+import mmap
+import os
+from pathlib import Path
+import shutil
+import struct
+import tempfile
+from typing import Any
+
+from loguru import logger
+
+from {{ module_name }}.config import PROCESSED_DATA_DIR
+
+FEATURE_STORE_DIR = PROCESSED_DATA_DIR / "feature_store"
+
+_RECORD = struct.Struct(">QQQI")  # entity hash, biased timestamp, value offset, value length
+_BIAS = 1 << 63  # maps signed timestamps to unsigned so bytes sort in time order
+_LATEST = (1 << 64) - 1
+_EPOCH = datetime(1970, 1, 1)
+
+
+def entity_hash(key: Any) -> int:
+    return int.from_bytes(blake2b(str(key).encode(), digest_size=8).digest(), "big")
+
+
+def timestamp_us(value: Any) -> int:
+    """Microseconds since the epoch of a number (seconds), datetime or ISO-8601 string.
+
+    Naive datetimes are taken as UTC.
+    """
+    if isinstance(value, datetime):
+        moment = value
+    elif isinstance(value, (int, float)):
+        return round(value * 1_000_000)
+    else:
+        try:
+            return round(float(value) * 1_000_000)
+        except ValueError:
+            moment = datetime.fromisoformat(str(value))
+    if moment.tzinfo is not None:
+        moment = moment.replace(tzinfo=None) - moment.utcoffset()
+    return (moment - _EPOCH) // timedelta(microseconds=1)
+
+
+def _as_of_key(as_of: Any) -> int:
+    return _LATEST if as_of is None else timestamp_us(as_of) + _BIAS
+
+
+def _sorted_runs(records: Iterable[bytes], directory: Path, run_size: int) -> list[Path]:
+    runs, run = [], []
+    for record in records:
+        run.append(record)
+        if len(run) >= run_size:
+            runs.append(_write_run(sorted(run), directory, len(runs)))
+            run = []
+    runs.append(_write_run(sorted(run), directory, len(runs)))
+    return runs
+
+
+def _write_run(run: list[bytes], directory: Path, number: int) -> Path:
+    path = directory / f"run-{number:05d}.bin"
+    path.write_bytes(b"".join(run))
+    return path
+
+
+def _read_run(path: Path) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while record := f.read(_RECORD.size):
+            yield record
+
+
+def _map(path: Path) -> mmap.mmap | bytes:
+    if path.stat().st_size == 0:  # empty files cannot be mapped
+        return b""
+    with open(path, "rb") as f:  # the mapping stays valid after the file is closed
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class FeatureStore:
+    """Read-only view of a materialized store; safe to share between threads."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text())
+        self._index = _map(self.path / "index.bin")
+        self._values = _map(self.path / "values.bin")
+        self.size = len(self._index) // _RECORD.size
+
+    @classmethod
+    def build(
+        cls,
+        path: Path,
+        rows: Iterable[dict[str, Any]],
+        key_column: str,
+        time_column: str | None = None,
+        run_size: int = 1_000_000,
+    ) -> "FeatureStore":
+        """Materialize `rows` (one per entity and, with `time_column`, per point in time)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{path.name}-", dir=path.parent))
+        count = 0
+
+        def index_records(values) -> Iterator[bytes]:
+            nonlocal count
+            offset = 0
+            for row in rows:
+                features = {k: v for k, v in row.items() if k not in (key_column, time_column)}
+                blob = json.dumps([str(row[key_column]), features], default=str).encode()
+                values.write(blob)
+                when = timestamp_us(row[time_column]) if time_column else 0
+                yield _RECORD.pack(entity_hash(row[key_column]), when + _BIAS, offset, len(blob))
+                offset += len(blob)
+                count += 1
+
+        with open(tmp / "values.bin", "wb") as values:
+            runs = _sorted_runs(index_records(values), tmp, run_size)
+        with open(tmp / "index.bin", "wb") as index:
+            index.writelines(heapq.merge(*(_read_run(run) for run in runs)))
+        for run in runs:
+            run.unlink()
+        meta = {"key_column": key_column, "time_column": time_column, "records": count}
+        (tmp / "meta.json").write_text(json.dumps(meta, indent=2))
+        old = path.with_name(f".{path.name}.old")
+        shutil.rmtree(old, ignore_errors=True)
+        if path.exists():
+            os.replace(path, old)
+        os.replace(tmp, path)  # open readers keep their mappings of the old files
+        shutil.rmtree(old, ignore_errors=True)
+        logger.info(f"Feature store with {count} records written to {path}")
+        return cls(path)
+
+    def _record(self, i: int) -> tuple[int, int, int, int]:
+        return _RECORD.unpack_from(self._index, i * _RECORD.size)
+
+    def _upper_bound(self, entity: int, when: int, lo: int) -> int:
+        """Position of the first record after (entity, when), searching from `lo`."""
+        hi = self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._record(mid)[:2] <= (entity, when):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _value(self, key: str, entity: int, when: int, position: int) -> dict[str, Any] | None:
+        # step back over versions of any other key sharing this 64-bit hash
+        for i in range(position - 1, -1, -1):
+            found_entity, found_when, offset, length = self._record(i)
+            if found_entity != entity:
+                return None
+            if found_when <= when:
+                stop = offset + length
+                stored_key, features = json.loads(self._values[offset:stop])
+                if stored_key == key:
+                    return features
+        return None
+
+    def get(self, key: Any, as_of: Any = None) -> dict[str, Any] | None:
+        """Features of `key` (as of a time, if given), or None when unknown."""
+        return self.get_many([key], [as_of])[0]
+
+    def get_many(
+        self, keys: Sequence[Any], as_of: Any | Sequence[Any] = None
+    ) -> list[dict[str, Any] | None]:
+        """Features for each key, in order; `as_of` is one time for all keys or one per key."""
+        if as_of is None or isinstance(as_of, (str, int, float, datetime)):
+            as_of = [as_of] * len(keys)
+        queries = sorted(
+            (entity_hash(key), _as_of_key(when), i)
+            for i, (key, when) in enumerate(zip(keys, as_of))
+        )
+        results: list[dict[str, Any] | None] = [None] * len(keys)
+        lo = 0
+        for entity, when, i in queries:
+            lo = self._upper_bound(entity, when, lo)
+            results[i] = self._value(str(keys[i]), entity, when, lo)
+        return results
+
+    def join(
+        self, rows: Sequence[dict[str, Any]], key_column: str, time_column: str | None = None
+    ) -> list[dict[str, Any]]:
+        """Point-in-time join: each row extended with its entity's features as of the row time."""
+        as_of = [row[time_column] for row in rows] if time_column else None
+        found = self.get_many([row[key_column] for row in rows], as_of)
+        return [{**row, **(features or {})} for row, features in zip(rows, found)]
+
+    def join_rows(self, rows: Sequence[dict[str, Any]]) -> list[dict[str, Any]]:
+        """`join` on the store's own key and time columns, e.g. for requests at predict time.
+
+        Rows without the time column get the latest features of their entity.
+        """
+        time_column = self.meta["time_column"]
+        if not rows or time_column not in rows[0]:
+            time_column = None
+        return self.join(rows, self.meta["key_column"], time_column)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def close(self) -> None:
+        for view in (self._index, self._values):
+            if isinstance(view, mmap.mmap):
+                view.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
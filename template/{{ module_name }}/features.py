@@ -1,28 +1,106 @@
 from pathlib import Path
+from typing import Annotated, Any
 
 from loguru import logger
 from tqdm import tqdm
 import typer
 
 from {{ module_name }}.config import PROCESSED_DATA_DIR
+from {{ module_name }}.dtypes import load_table, read_typed_batches
+from {{ module_name }}.feature_store import FEATURE_STORE_DIR, FeatureStore
+from {{ module_name }}.jit import jit
+from {{ module_name }}.sparse import (
+    DEFAULT_N_FEATURES,
+    HashingEncoder,
+    save_sparse,
+    vstack_batches,
+)
+from {{ module_name }}.streaming import inputs_ready, write_table
 
 app = typer.Typer()
 
 
+@jit
+def session_numbers(keys, timestamps, out, gap):
+    """Example row-loop kernel: number each key's sessions, split by `gap` of inactivity.
+
+    Rows must be sorted by key, then timestamp. Run it in parallel with
+    `map_partitions(session_numbers, (keys, timestamps), out, gap, keys=keys)`.
+    """
+    session = 0
+    for i in range(len(keys)):
+        if i == 0 or keys[i] != keys[i - 1]:
+            session = 0
+        elif timestamps[i] - timestamps[i - 1] > gap:
+            session += 1
+        out[i] = session
+
+
+def build_features(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Turn processed records into a feature table."""
+    # ---- REPLACE THIS WITH YOUR OWN CODE ----
+    logger.info("Generating features from dataset...")
+    features = []
+    for i, row in enumerate(tqdm(rows, total=len(rows))):
+        if i == 5:
+            logger.info("Something happened for iteration 5.")
+        features.append(row)
+    logger.success("Features generation complete.")
+    # -----------------------------------------
+    return features
+
+
 @app.command()
 def main(
     # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
     input_path: Path = PROCESSED_DATA_DIR / "dataset.csv",
     output_path: Path = PROCESSED_DATA_DIR / "features.csv",
     # -----------------------------------------
+    sparse: Annotated[
+        bool, typer.Option(help="Hash features into a sparse CSR matrix saved as .npz")
+    ] = False,
+    n_features: int = DEFAULT_N_FEATURES,
+    text_column: Annotated[
+        list[str] | None,
+        typer.Option(help="Column encoded as bag-of-words tokens when --sparse (repeatable)"),
+    ] = None,
+    exclude_column: Annotated[
+        list[str] | None,
+        typer.Option(help="Column left out when --sparse, e.g. ids and labels (repeatable)"),
+    ] = None,
+    store_key: Annotated[
+        str | None,
+        typer.Option(
+            help="Also materialize the features into the online store by this entity key"
+        ),
+    ] = None,
+    store_time: Annotated[
+        str | None, typer.Option(help="Timestamp column for point-in-time store lookups")
+    ] = None,
 ):
-    # ---- REPLACE THIS WITH YOUR OWN CODE ----
-    logger.info("Generating features from dataset...")
-    for i in tqdm(range(10), total=10):
-        if i == 5:
-            logger.info("Something happened for iteration 5.")
-    logger.success("Features generation complete.")
-    # -----------------------------------------
+    if sparse and store_key:
+        raise typer.BadParameter("--store-key needs dense features, the store holds records")
+    if not inputs_ready(input_path):
+        return
+    if not sparse:
+        features = build_features(load_table(input_path))
+        write_table(features, output_path)
+        if store_key:
+            FeatureStore.build(
+                FEATURE_STORE_DIR / output_path.stem, features, store_key, store_time
+            ).close()
+        return
+    encoder = HashingEncoder(
+        n_features, text_columns=text_column or (), exclude=exclude_column or ()
+    )
+    batches = (build_features(batch) for batch in read_typed_batches(input_path))
+    matrix = vstack_batches(encoder.transform_batches(batches))
+    output_path = output_path.with_suffix(".npz")
+    save_sparse(matrix, output_path)
+    density = matrix.nnz / max(matrix.shape[0] * matrix.shape[1], 1)
+    logger.success(
+        f"Sparse features {matrix.shape} with density {density:.2e} saved to {output_path}"
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,249 @@
+"""Parallel CSV ingestion for large single files.
+
+The file is split into byte ranges aligned on record boundaries and each range is
+parsed in a separate process. Quoted fields may contain newlines: a newline only
+ends a record when it is preceded by an even number of quote characters, so the
+quote count up to each split point is computed (in parallel) before aligning.
+Files compressed by `compression.py` are split the same way, on uncompressed
+offsets, and each process decompresses only the frames of its own ranges.
+"""
+
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import io
+from itertools import pairwise
+from pathlib import Path
+import re
+import time
+from typing import Any
+
+from loguru import logger
+import typer
+
+from {{ module_name }}.compression import compressed_path, data_size, open_file
+from {{ module_name }}.config import INTERIM_DATA_DIR, RAW_DATA_DIR, WORKERS
+from {{ module_name }}.parallel import process_pool
+from {{ module_name }}.streaming import DEFAULT_BATCH_SIZE, write_csv_batches
+
+CHUNK_BYTES = 64 * 1024**2
+BLOCK_BYTES = 4 * 1024**2
+_DELIMITERS = re.compile(rb'["\n]')
+
+Transform = Callable[[list[dict[str, Any]]], list[dict[str, Any]]]
+
+app = typer.Typer()
+
+
+def _count_quotes(path: Path, start: int, end: int) -> int:
+    count = 0
+    with open_file(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0 and (block := f.read(min(BLOCK_BYTES, remaining))):
+            count += block.count(b'"')
+            remaining -= len(block)
+    return count
+
+
+def _next_record_start(f, offset: int, in_quotes: bool) -> int:
+    """Return the offset just past the first record-ending newline at or after `offset`."""
+    f.seek(offset)
+    while block := f.read(BLOCK_BYTES):
+        for match in _DELIMITERS.finditer(block):
+            if match.group() == b'"':
+                in_quotes = not in_quotes
+            elif not in_quotes:
+                return offset + match.end()
+        offset += len(block)
+    return offset
+
+
+def split_byte_ranges(
+    path: Path, n_parts: int, pool: ProcessPoolExecutor | None = None
+) -> tuple[int, list[tuple[int, int]]]:
+    """Split the data section of a CSV file into at most `n_parts` record-aligned ranges.
+
+    Returns the offset where the data starts (after the header) and the ranges.
+    """
+    size = data_size(path)
+    with open_file(path, "rb") as f:
+        data_start = _next_record_start(f, 0, False)
+    step = max(1, (size - data_start) // max(1, n_parts))
+    targets = list(range(data_start + step, size, step))[: n_parts - 1]
+
+    # quotes before each target, counted per segment so the scan runs in parallel
+    edges = [0, *targets]
+    segments = list(pairwise(edges))
+    counts = (
+        pool.map(_count_quotes, [path] * len(segments), *zip(*segments))
+        if pool is not None and segments
+        else (_count_quotes(path, a, b) for a, b in segments)
+    )
+    bounds, quotes = [data_start], 0
+    with open_file(path, "rb") as f:
+        for target, count in zip(targets, counts):
+            quotes += count
+            bounds.append(max(bounds[-1], _next_record_start(f, target, quotes % 2 == 1)))
+    bounds.append(size)
+    return data_start, [(a, b) for a, b in pairwise(bounds) if b > a]
+
+
+def read_header(path: Path, encoding: str = "utf-8") -> list[str]:
+    with open_file(path, newline="", encoding=encoding) as f:
+        return next(csv.reader(f))
+
+
+def _parse_range(
+    path: Path,
+    start: int,
+    end: int,
+    header: list[str],
+    encoding: str,
+    transform: Callable[[list[dict[str, Any]]], Any] | None,
+) -> Any:
+    with open_file(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode(encoding)
+    rows = [dict(zip(header, values)) for values in csv.reader(io.StringIO(text, newline=""))]
+    return transform(rows) if transform is not None else rows
+
+
+def read_csv_tail(path: Path, offset: int, encoding: str = "utf-8") -> list[dict[str, Any]]:
+    """Records from byte `offset`, which must start a record, to the end of the file."""
+    return _parse_range(path, offset, data_size(path), read_header(path, encoding), encoding, None)
+
+
+def _write_range(
+    path: Path,
+    start: int,
+    end: int,
+    header: list[str],
+    encoding: str,
+    transform: Transform | None,
+    part_path: Path,
+) -> int:
+    rows = _parse_range(path, start, end, header, encoding, transform)
+    return write_csv_batches([rows], part_path)
+
+
+def _n_parts(path: Path, workers: int, chunk_bytes: int) -> int:
+    return max(workers, -(-data_size(path) // chunk_bytes))
+
+
+def _log_throughput(path: Path, start: float, workers: int) -> None:
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    megabytes = data_size(path) / 1024**2
+    logger.info(
+        f"Ingested {megabytes:.1f} MB from {path.name} in {elapsed:.2f}s "
+        f"({megabytes / elapsed:.1f} MB/s, {workers} workers)"
+    )
+
+
+def read_csv_parallel(
+    path: Path,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: int | None = None,
+    transform: Transform | None = None,
+    chunk_bytes: int = CHUNK_BYTES,
+    encoding: str = "utf-8",
+) -> Iterator[list[dict[str, Any]]]:
+    """Parallel drop-in for `streaming.read_csv_batches`, yielding batches in file order.
+
+    At most two ranges per worker are in flight, so memory stays bounded by
+    roughly `2 * workers * chunk_bytes` of parsed rows. `transform`, if given, runs
+    inside the workers and must be a picklable module-level function.
+    """
+    workers = workers or WORKERS
+    start = time.perf_counter()
+    header = read_header(path, encoding)
+    with process_pool(workers) as pool:
+        _, ranges = split_byte_ranges(path, _n_parts(path, workers, chunk_bytes), pool)
+        todo = iter(ranges)
+        pending = deque()
+
+        def submit() -> None:
+            if (span := next(todo, None)) is not None:
+                pending.append(pool.submit(_parse_range, path, *span, header, encoding, transform))
+
+        for _ in range(2 * workers):
+            submit()
+        while pending:
+            rows = pending.popleft().result()
+            submit()
+            for offset in range(0, len(rows), batch_size):
+                stop = offset + batch_size
+                yield rows[offset:stop]
+    _log_throughput(path, start, workers)
+
+
+def map_csv_ranges(
+    path: Path,
+    func: Callable[[list[dict[str, Any]]], Any],
+    workers: int | None = None,
+    chunk_bytes: int = CHUNK_BYTES,
+    encoding: str = "utf-8",
+) -> list[Any]:
+    """Apply `func` to the records of every range in parallel and return results in order.
+
+    Useful for reductions (counts, sketches) where only a small summary per range
+    needs to travel back to the parent process.
+    """
+    workers = workers or WORKERS
+    start = time.perf_counter()
+    header = read_header(path, encoding)
+    with process_pool(workers) as pool:
+        _, ranges = split_byte_ranges(path, _n_parts(path, workers, chunk_bytes), pool)
+        futures = [
+            pool.submit(_parse_range, path, a, b, header, encoding, func) for a, b in ranges
+        ]
+        results = [future.result() for future in futures]
+    _log_throughput(path, start, workers)
+    return results
+
+
+def write_csv_parts(
+    path: Path,
+    output_dir: Path,
+    workers: int | None = None,
+    transform: Transform | None = None,
+    chunk_bytes: int = CHUNK_BYTES,
+    encoding: str = "utf-8",
+) -> list[Path]:
+    """Parse a CSV file in parallel and write each range to `output_dir/part-NNNNN.csv`.
+
+    Returns the paths written, with the compression suffix (e.g. `.zst`) if any.
+    """
+    workers = workers or WORKERS
+    start = time.perf_counter()
+    header = read_header(path, encoding)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with process_pool(workers) as pool:
+        _, ranges = split_byte_ranges(path, _n_parts(path, workers, chunk_bytes), pool)
+        parts = [compressed_path(output_dir / f"part-{i:05d}.csv") for i in range(len(ranges))]
+        futures = [
+            pool.submit(_write_range, path, a, b, header, encoding, transform, part)
+            for (a, b), part in zip(ranges, parts)
+        ]
+        rows = sum(future.result() for future in futures)
+    _log_throughput(path, start, workers)
+    logger.success(f"Wrote {rows} rows to {len(parts)} parts in {output_dir}")
+    return parts
+
+
+@app.command()
+def main(
+    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
+    input_path: Path = RAW_DATA_DIR / "dataset.csv",
+    output_dir: Path = INTERIM_DATA_DIR / "dataset",
+    # ----------------------------------------------
+    workers: int = 0,
+    chunk_mb: int = CHUNK_BYTES // 1024**2,
+):
+    """Split a large CSV file into record-aligned parts, parsed in parallel."""
+    write_csv_parts(input_path, output_dir, workers or None, chunk_bytes=chunk_mb * 1024**2)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,87 @@
+"""Opt-in JIT compilation of row-loop kernels, run in parallel over partitions.
+
+Some features (sessionization, rolling windows with custom resets, ...) need a
+plain loop over rows. Decorate such a kernel with `@jit` to compile it with
+Numba's nopython mode when Numba is installed (`pip install numba`); without it,
+or with `NUMBA_DISABLE_JIT=1`, the kernel runs as ordinary Python.
+
+Kernels take NumPy input arrays followed by an output array they fill in place,
+then any scalar arguments: `kernel(*inputs, out, *args)`. `map_partitions` runs
+a kernel over row ranges on a thread pool, writing straight into slices of the
+output. Compiled kernels release the GIL, so partitions run truly in parallel;
+the pure Python fallback runs them one after another in effect.
+"""
+
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from loguru import logger
+
+from {{ module_name }}.config import WORKERS
+from {{ module_name }}.parallel import limited_threads, threads_per_worker
+
+try:
+    import numba
+except ModuleNotFoundError:
+    numba = None
+
+
+def jit(func: Callable | None = None, *, cache: bool = True) -> Any:
+    """Compile `func` with `numba.njit` if available, else return it unchanged.
+
+    Usable bare (`@jit`) or with options (`@jit(cache=False)`). Compiled kernels keep
+    the original Python function as `.py_func`.
+    """
+    if func is None:
+        return lambda f: jit(f, cache=cache)
+    if numba is None:
+        return func
+    return numba.njit(cache=cache, nogil=True)(func)
+
+
+def is_compiled(func: Callable) -> bool:
+    return hasattr(func, "py_func")
+
+
+def partition_bounds(
+    n_rows: int, n_partitions: int, keys: Sequence[Any] | None = None
+) -> list[tuple[int, int]]:
+    """Split `range(n_rows)` into contiguous ranges of about equal size.
+
+    With sorted `keys`, boundaries are moved forward so no run of equal keys is split,
+    which keeps per-key state (sessions, windows) within a single partition.
+    """
+    step = max(1, -(-n_rows // max(1, n_partitions)))
+    bounds, start = [], 0
+    while start < n_rows:
+        stop = min(start + step, n_rows)
+        if keys is not None:
+            while stop < n_rows and keys[stop] == keys[stop - 1]:
+                stop += 1
+        bounds.append((start, stop))
+        start = stop
+    return bounds
+
+
+def map_partitions(
+    kernel: Callable,
+    inputs: Sequence[Any],
+    out: Any,
+    *args: Any,
+    keys: Sequence[Any] | None = None,
+    workers: int | None = None,
+) -> Any:
+    """Run `kernel(*input_slices, out_slice, *args)` over row partitions and return `out`."""
+    workers = workers or WORKERS
+    if not is_compiled(kernel) and workers > 1:
+        logger.debug("Kernel is not compiled; partitions will not run in parallel")
+    bounds = partition_bounds(len(out), workers, keys)
+    with limited_threads(threads_per_worker(workers)), ThreadPoolExecutor(workers) as pool:
+        futures = [
+            pool.submit(kernel, *(array[start:stop] for array in inputs), out[start:stop], *args)
+            for start, stop in bounds
+        ]
+        for future in futures:
+            future.result()
+    return out
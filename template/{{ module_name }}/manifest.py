@@ -0,0 +1,107 @@
+"""Manifest of processed input files, used as a watermark for incremental runs.
+
+Each entry records a file's size, modification time and SHA-256 content hash.
+A file whose size and mtime are unchanged is skipped without being read; if
+only its mtime changed (e.g. it was touched or re-copied), the hash decides.
+A file that grew is told apart from a rewritten one by hashing its previously
+recorded prefix, so data appended to it can be processed on its own.
+Objects in the dataset storage bucket are tracked by URI only.
+"""
+
+from collections.abc import Iterable
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from {{ module_name }}.config import INTERIM_DATA_DIR
+from {{ module_name }}.storage import Location, is_remote
+
+MANIFEST_DIR = INTERIM_DATA_DIR / "manifests"
+_HASH_BLOCK = 1 << 20
+
+
+def file_sha256(path: Path, size: int | None = None) -> str:
+    """SHA-256 of the file's content, or of its first `size` bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        remaining = os.fstat(f.fileno()).st_size if size is None else size
+        while remaining > 0 and (block := f.read(min(_HASH_BLOCK, remaining))):
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Set of already-processed files persisted as JSON.
+
+    With `hash_content=False` files are compared by size and mtime only, which avoids
+    re-reading large inputs just to fingerprint them.
+    """
+
+    def __init__(self, path: Path, hash_content: bool = True):
+        self.path = Path(path)
+        self.hash_content = hash_content
+        self.entries: dict[str, dict[str, Any]] = (
+            json.loads(self.path.read_text()) if self.path.exists() else {}
+        )
+
+    def is_current(self, file: Location) -> bool:
+        """Whether `file` was processed before and its content has not changed since."""
+        entry = self.entries.get(str(file))
+        if entry is None:
+            return False
+        if is_remote(file):  # bucket objects are tracked by name
+            return True
+        file = Path(file)
+        stat = file.stat()
+        if entry["size"] != stat.st_size:
+            return False
+        if entry["mtime_ns"] == stat.st_mtime_ns:
+            return True
+        if entry["sha256"] is None or entry["sha256"] != file_sha256(file):
+            return False
+        entry["mtime_ns"] = stat.st_mtime_ns  # touched but identical
+        return True
+
+    def resume_offset(self, file: Location) -> int | None:
+        """Byte offset from which `file` still has to be processed.
+
+        0 for a file that was never recorded, the recorded size for a file that has only
+        been appended to since, and None for a file that was rewritten (or is current).
+        """
+        entry = self.entries.get(str(file))
+        if entry is None:
+            return 0
+        if is_remote(file) or entry["sha256"] is None:
+            return None
+        file = Path(file)
+        if file.stat().st_size <= entry["size"]:
+            return None
+        return entry["size"] if file_sha256(file, entry["size"]) == entry["sha256"] else None
+
+    def pending(self, files: Iterable[Location]) -> list[Location]:
+        """Files that are new or changed since they were last recorded."""
+        return [file for file in files if not self.is_current(file)]
+
+    def record(self, file: Location) -> None:
+        if is_remote(file):
+            self.entries[str(file)] = {}
+            return
+        file = Path(file)
+        stat = file.stat()
+        self.entries[str(file)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": file_sha256(file) if self.hash_content else None,
+        }
+
+    def clear(self) -> None:
+        self.entries = {}
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.entries, indent=1, sort_keys=True))
+        os.replace(tmp, self.path)
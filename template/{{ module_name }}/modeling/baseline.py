@@ -0,0 +1,34 @@
+"""Placeholder estimator used by the scaffold until a real model is plugged in.
+
+It lives in its own module so pickled models can be loaded regardless of which
+script trained them.
+"""
+
+from collections.abc import Sequence
+from typing import Any
+
+
+def n_rows(X: Any) -> int:
+    """Number of samples in a table, array or sparse matrix (which has no len())."""
+    return X.shape[0] if hasattr(X, "shape") else len(X)
+
+
+class MeanRegressor:
+    """Placeholder estimator predicting the mean label, with a scikit-learn style API."""
+
+    def __init__(self):
+        self.n_samples_ = 0
+        self.mean_ = 0.0
+
+    def partial_fit(self, X: Sequence[Any], y: Sequence[float] | None = None):
+        for value in y if y is not None else [0.0] * n_rows(X):
+            self.n_samples_ += 1
+            self.mean_ += (float(value) - self.mean_) / self.n_samples_
+        return self
+
+    def fit(self, X: Sequence[Any], y: Sequence[float] | None = None):
+        self.n_samples_, self.mean_ = 0, 0.0
+        return self.partial_fit(X, y)
+
+    def predict(self, X: Sequence[Any]) -> list[float]:
+        return [self.mean_] * n_rows(X)
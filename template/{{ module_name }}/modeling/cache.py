@@ -0,0 +1,201 @@
+"""Prediction cache keyed by feature-row hash and model version.
+
+Rows are hashed (128-bit BLAKE2b of the canonical JSON record, or of the
+indices and values of a sparse row) together with the model version, the
+SHA-256 of the model file. Lookups go to an in-memory LRU first, then to a
+bounded SQLite store under `MODELS_DIR / "cache"`; only misses are scored.
+Whenever the model file changes, its version changes and the on-disk store is
+cleared, so stale predictions are never served. A cache may be shared by the
+threads of a scoring pool; its operations are serialized by a lock. Registry
+models (`MODELS_DIR / <name> / <version>.pkl`) get one store per name and version.
+"""
+
+from collections import OrderedDict
+from collections.abc import Sequence
+from hashlib import blake2b
+import json
+from pathlib import Path
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from loguru import logger
+
+from {{ module_name }}.config import MODELS_DIR
+from {{ module_name }}.manifest import file_sha256
+from {{ module_name }}.modeling.baseline import n_rows
+
+CACHE_DIR = MODELS_DIR / "cache"
+_SQL_CHUNK = 900  # stay below SQLite's host-parameter limit
+
+
+def row_keys(features: Any, version: str) -> list[bytes]:
+    """One cache key per row of a record table, dense array or CSR matrix."""
+    prefix = version.encode()
+    if hasattr(features, "indptr"):
+        rows = (
+            features.indices[start:stop].tobytes() + features.data[start:stop].tobytes()
+            for start, stop in zip(features.indptr[:-1], features.indptr[1:])
+        )
+    elif hasattr(features, "dtype"):
+        rows = (row.tobytes() for row in features)
+    else:
+        rows = (json.dumps(row, sort_keys=True, default=str).encode() for row in features)
+    return [blake2b(prefix + row, digest_size=16).digest() for row in rows]
+
+
+def take_rows(features: Any, indices: Sequence[int]) -> Any:
+    if hasattr(features, "shape"):
+        return features[list(indices)]
+    return [features[i] for i in indices]
+
+
+class PredictionCache:
+    """Two-level (memory LRU, bounded SQLite) store of predictions for one model version."""
+
+    def __init__(
+        self,
+        path: Path,
+        version: str,
+        memory_items: int = 100_000,
+        disk_items: int = 10_000_000,
+    ):
+        self.memory: OrderedDict[bytes, Any] = OrderedDict()
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (version TEXT);"
+            "CREATE TABLE IF NOT EXISTS predictions "
+            "(key BLOB PRIMARY KEY, value BLOB, used INTEGER) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS predictions_used ON predictions (used);"
+        )
+        stored = self.db.execute("SELECT version FROM meta").fetchone()
+        if stored is None or stored[0] != version:
+            if stored is not None:
+                logger.info("Model changed, clearing the prediction cache")
+            self.db.execute("DELETE FROM predictions")
+            self.db.execute("DELETE FROM meta")
+            self.db.execute("INSERT INTO meta VALUES (?)", (version,))
+            self.db.commit()
+        self.clock, self.count = self.db.execute(
+            "SELECT COALESCE(MAX(used), 0), COUNT(*) FROM predictions"
+        ).fetchone()
+
+    def _remember(self, key: bytes, value: Any) -> None:
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def get_many(self, keys: Sequence[bytes]) -> dict[bytes, Any]:
+        with self.lock:
+            return self._get_many(keys)
+
+    def _get_many(self, keys: Sequence[bytes]) -> dict[bytes, Any]:
+        found = {}
+        for key in keys:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                found[key] = self.memory[key]
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        self.clock += 1
+        for start in range(0, len(missing), _SQL_CHUNK):
+            stop = start + _SQL_CHUNK
+            chunk = missing[start:stop]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = self.db.execute(
+                f"SELECT key, value FROM predictions WHERE key IN ({placeholders})", chunk
+            )
+            hits = [(key, pickle.loads(value)) for key, value in cursor]
+            for key, value in hits:
+                found[key] = value
+                self._remember(key, value)
+            self.db.executemany(
+                "UPDATE predictions SET used = ? WHERE key = ?", [(self.clock, k) for k, _ in hits]
+            )
+        self.db.commit()  # an open write transaction would lock out other processes
+        return found
+
+    def put_many(self, items: dict[bytes, Any]) -> None:
+        with self.lock:
+            for key, value in items.items():
+                self._remember(key, value)
+            # a key stored meanwhile holds the same prediction, so it is kept as is
+            cursor = self.db.executemany(
+                "INSERT OR IGNORE INTO predictions VALUES (?, ?, ?)",
+                [(key, pickle.dumps(value), self.clock) for key, value in items.items()],
+            )
+            self.count += cursor.rowcount
+            if (excess := self.count - self.disk_items) > 0:  # evict the least recently used
+                cursor = self.db.execute(
+                    "DELETE FROM predictions WHERE key IN "
+                    "(SELECT key FROM predictions ORDER BY used LIMIT ?)",
+                    (excess,),
+                )
+                self.count -= cursor.rowcount
+            self.db.commit()
+
+    def close(self) -> None:
+        with self.lock:
+            self.db.close()
+
+
+class CachedModel:
+    """Wrap a model so `predict` scores only rows missing from the prediction cache."""
+
+    def __init__(self, model: Any, model_path: Path, cache_path: Path | None = None, **kwargs):
+        self.model = model
+        self.version = file_sha256(model_path)
+        self.cache = PredictionCache(
+            cache_path or CACHE_DIR / f"{model_path.stem}.sqlite", self.version, **kwargs
+        )
+        self.stats = {"rows": 0, "hits": 0, "lookup_s": 0.0, "predict_s": 0.0}
+
+    def predict(self, features: Any) -> list[Any]:
+        start = time.perf_counter()
+        keys = row_keys(features, self.version)
+        found = self.cache.get_many(keys)
+        misses = [i for i, key in enumerate(keys) if key not in found]
+        lookup_done = time.perf_counter()
+        if misses:
+            scored = list(self.model.predict(take_rows(features, misses)))
+            fresh = {keys[i]: value for i, value in zip(misses, scored)}
+            self.cache.put_many(fresh)
+            found.update(fresh)
+        with self.cache.lock:
+            self.stats["rows"] += n_rows(features)
+            self.stats["hits"] += n_rows(features) - len(misses)
+            self.stats["lookup_s"] += lookup_done - start
+            self.stats["predict_s"] += time.perf_counter() - lookup_done
+        return [found[key] for key in keys]
+
+    def report(self) -> dict[str, float]:
+        rows = max(self.stats["rows"], 1)
+        summary = {
+            "hit_rate": self.stats["hits"] / rows,
+            "lookup_us_per_row": 1e6 * self.stats["lookup_s"] / rows,
+            "predict_us_per_row": 1e6 * self.stats["predict_s"] / rows,
+        }
+        logger.info(
+            f"Prediction cache: {100 * summary['hit_rate']:.1f}% hits over {self.stats['rows']} rows, "
+            f"{summary['lookup_us_per_row']:.1f}us lookup + "
+            f"{summary['predict_us_per_row']:.1f}us scoring per row"
+        )
+        return summary
+
+
+def registry_cache_path(model_path: Path) -> Path:
+    """Cache store of a registry model, named after the model and its version."""
+    return CACHE_DIR / model_path.parent.name / f"{model_path.stem}.sqlite"
+
+
+def load_cached(model_path: Path) -> CachedModel:
+    """`ModelRegistry` loader that wraps every model in its own prediction cache."""
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    return CachedModel(model, model_path, registry_cache_path(model_path))
@@ -0,0 +1,111 @@
+"""Atomic, asynchronous training checkpoints with retention.
+
+A checkpoint is a pickled dict (model, iteration or optimizer state, RNG state,
+data cursor, ...) written to `ckpt-<step>.pkl` in one directory per training run,
+`MODELS_DIR / "checkpoints" / <model name>` by default.
+The state is serialized in the training thread, so later updates cannot leak
+into it, and written on a background thread: to a temporary file, fsynced, then
+renamed into place. Each file starts with the SHA-256 of its payload, so a torn
+or corrupted checkpoint is skipped and `latest` falls back to the previous one.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+import hashlib
+import os
+from pathlib import Path
+import pickle
+import random
+import sys
+from typing import Any
+
+from loguru import logger
+
+from {{ module_name }}.config import MODELS_DIR
+
+CHECKPOINT_DIR = MODELS_DIR / "checkpoints"
+_PREFIX = "ckpt-"
+
+
+def capture_rng() -> dict[str, Any]:
+    """State of Python's and (if imported) NumPy's global random generators."""
+    state = {"python": random.getstate()}
+    if "numpy" in sys.modules:
+        state["numpy"] = sys.modules["numpy"].random.get_state()
+    return state
+
+
+def restore_rng(state: dict[str, Any]) -> None:
+    random.setstate(state["python"])
+    if "numpy" in state:
+        import numpy as np
+
+        np.random.set_state(state["numpy"])
+
+
+class Checkpointer:
+    """Write checkpoints in the background and keep the `keep` most recent ones."""
+
+    def __init__(self, directory: Path = CHECKPOINT_DIR, keep: int = 3):
+        self.directory = Path(directory)
+        self.keep = max(1, keep)
+        self._pool = ThreadPoolExecutor(1, thread_name_prefix="checkpoint")
+        self._pending: Future | None = None
+
+    def paths(self) -> list[Path]:
+        """Checkpoint files, newest first."""
+        return sorted(self.directory.glob(f"{_PREFIX}*.pkl"), reverse=True)
+
+    def save(self, step: int, state: dict[str, Any]) -> None:
+        """Snapshot `state` now and write it asynchronously as checkpoint `step`."""
+        payload = pickle.dumps({"step": step, **state}, protocol=pickle.HIGHEST_PROTOCOL)
+        self.wait()  # at most one checkpoint in flight bounds memory
+        self._pending = self._pool.submit(self._write, step, payload)
+
+    def _write(self, step: int, payload: bytes) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{_PREFIX}{step:010d}.pkl"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(hashlib.sha256(payload).digest())
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        for index, old in enumerate(self.paths()):
+            if index >= self.keep:
+                old.unlink(missing_ok=True)
+        logger.debug(f"Checkpoint written to {path}")
+
+    def wait(self) -> None:
+        if self._pending is not None:
+            self._pending.result()
+            self._pending = None
+
+    def clear(self) -> None:
+        """Remove every checkpoint, e.g. once training has completed."""
+        self.wait()
+        for path in self.paths():
+            path.unlink(missing_ok=True)
+        if self.directory.exists() and not any(self.directory.iterdir()):
+            self.directory.rmdir()
+
+    def latest(self) -> dict[str, Any] | None:
+        """State of the newest checkpoint that passes its checksum, or None."""
+        for path in self.paths():
+            data = path.read_bytes()
+            digest, payload = data[:32], data[32:]
+            if hashlib.sha256(payload).digest() == digest:
+                logger.info(f"Resuming from {path}")
+                return pickle.loads(payload)
+            logger.warning(f"Skipping corrupt checkpoint {path}")
+        return None
+
+    def close(self) -> None:
+        self.wait()
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
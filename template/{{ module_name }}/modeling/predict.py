@@ -1,14 +1,38 @@
 from pathlib import Path
+import pickle
+from typing import Annotated, Any
 
 from loguru import logger
 from tqdm import tqdm
 import typer
 
 from {{ module_name }}.config import MODELS_DIR, PROCESSED_DATA_DIR
+from {{ module_name }}.dtypes import load_table
+from {{ module_name }}.feature_store import FEATURE_STORE_DIR, FeatureStore
+from {{ module_name }}.modeling.cache import CachedModel, load_cached, registry_cache_path
+from {{ module_name }}.modeling.registry import ModelRegistry, predict_routed
+from {{ module_name }}.sparse import load_features
+from {{ module_name }}.streaming import inputs_ready, write_table
 
 app = typer.Typer()
 
 
+def load_model(model_path: Path) -> Any:
+    with open(model_path, "rb") as f:
+        return pickle.load(f)
+
+
+def predict(model: Any, features: Any) -> list[dict[str, Any]]:
+    """Score an in-memory feature table (records or a sparse matrix) into predictions.
+
+    Called once per micro-batch or model group by the streaming scorer and routed
+    scoring, so it should not log or show progress.
+    """
+    # ---- REPLACE THIS WITH YOUR OWN CODE ----
+    return [{"prediction": p} for p in model.predict(features)]
+    # -----------------------------------------
+
+
 @app.command()
 def main(
     # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
@@ -16,7 +40,31 @@ def main(
     model_path: Path = MODELS_DIR / "model.pkl",
     predictions_path: Path = PROCESSED_DATA_DIR / "test_predictions.csv",
     # -----------------------------------------
+    cache: Annotated[
+        bool, typer.Option(help="Score only rows missing from the prediction cache")
+    ] = False,
+    model_name: Annotated[
+        str | None, typer.Option(help="Load this model from the registry instead of model_path")
+    ] = None,
+    model_version: Annotated[str, typer.Option(help="Version of --model-name")] = "latest",
+    route_column: Annotated[
+        str | None, typer.Option(help="Score each row with the registry model it names")
+    ] = None,
+    version_column: Annotated[
+        str | None, typer.Option(help="Column with the model version for --route-column")
+    ] = None,
+    store: Annotated[
+        str | None,
+        typer.Option(help="Feature store (by name, e.g. features) to join each row with"),
+    ] = None,
 ):
+    sparse = features_path.suffix == ".npz"
+    if sparse and (route_column or store):
+        raise typer.BadParameter("--route-column and --store need CSV features, not sparse .npz")
+    if store and not (FEATURE_STORE_DIR / store).exists():
+        raise typer.BadParameter(f"No feature store {store!r} in {FEATURE_STORE_DIR}")
+    if not inputs_ready(features_path):
+        return
     # ---- REPLACE THIS WITH YOUR OWN CODE ----
     logger.info("Performing inference for model...")
     for i in tqdm(range(10), total=10):
@@ -24,6 +72,34 @@ def main(
             logger.info("Something happened for iteration 5.")
     logger.success("Inference complete.")
     # -----------------------------------------
+    if route_column or store:  # routing and joins work on records
+        features = load_table(features_path)
+    else:
+        features = load_features(features_path)
+    if store:
+        with FeatureStore(FEATURE_STORE_DIR / store) as feature_store:
+            features = feature_store.join_rows(features)
+    if route_column:
+        registry = ModelRegistry(loader=load_cached) if cache else ModelRegistry()
+        predictions = predict_routed(registry, features, predict, route_column, version_column)
+        write_table(predictions, predictions_path)
+        if cache:  # of the models still resident
+            for model, _ in registry.resident.values():
+                model.report()
+        return
+    cache_path = None
+    if model_name:
+        registry = ModelRegistry()
+        model_path = registry.path(*registry.resolve(model_name, model_version))
+        cache_path = registry_cache_path(model_path)
+    elif not inputs_ready(model_path):
+        return
+    model = load_model(model_path)
+    if cache:
+        model = CachedModel(model, model_path, cache_path)
+    write_table(predict(model, features), predictions_path)
+    if cache:
+        model.report()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,175 @@
+"""Registry of named, versioned models kept resident in an in-process LRU.
+
+Models are stored as `MODELS_DIR / <name> / <version>.pkl`; the version
+`"latest"` resolves to the highest version (natural order, so `v10` > `v9`).
+Loaded models stay in memory until the total size exceeds the memory budget
+(`MODEL_MEMORY_MB` in `.env`, sized by their pickle files), then the least
+recently used are evicted. Concurrent first requests for the same model share a
+single load, and `preload` warms the hot set in the background on one pool per
+registry, skipping models that would not fit the budget together.
+"""
+
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+from pathlib import Path
+import pickle
+import re
+import threading
+from typing import Any
+
+from loguru import logger
+
+from {{ module_name }}.config import MODELS_DIR
+
+MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_MB", "2048"))
+
+ModelKey = tuple[str, str]
+
+
+def _load_pickle(path: Path) -> Any:
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _natural(version: str) -> list[Any]:
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", version)]
+
+
+class ModelRegistry:
+    """Thread-safe, memory-bounded cache of models addressed by (name, version)."""
+
+    def __init__(
+        self,
+        root: Path = MODELS_DIR,
+        memory_budget_mb: float = MEMORY_BUDGET_MB,
+        loader: Callable[[Path], Any] = _load_pickle,
+        preload_workers: int = 4,
+    ):
+        self.root = Path(root)
+        self.budget = int(memory_budget_mb * 2**20)
+        self.loader = loader
+        self.resident: OrderedDict[ModelKey, tuple[Any, int]] = OrderedDict()
+        self.loading: dict[ModelKey, Future] = {}
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "loads": 0, "evictions": 0}
+        self.preload_pool = ThreadPoolExecutor(preload_workers, thread_name_prefix="preload")
+
+    def path(self, name: str, version: str) -> Path:
+        return self.root / name / f"{version}.pkl"
+
+    def versions(self, name: str) -> list[str]:
+        return sorted((p.stem for p in (self.root / name).glob("*.pkl")), key=_natural)
+
+    def resolve(self, name: str, version: str = "latest") -> ModelKey:
+        if version == "latest":
+            versions = self.versions(name)
+            if not versions:
+                raise KeyError(f"No versions of model {name!r} in {self.root / name}")
+            version = versions[-1]
+        return name, version
+
+    def register(self, model: Any, name: str, version: str) -> Path:
+        path = self.path(name, version)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(model, f)
+        os.replace(tmp, path)  # readers never see a partially written model
+        with self.lock:  # a re-registered version must not be served from memory
+            self.resident.pop((name, version), None)
+        return path
+
+    def get(self, name: str, version: str = "latest") -> Any:
+        key = self.resolve(name, version)
+        with self.lock:
+            if key in self.resident:
+                self.resident.move_to_end(key)
+                self.stats["hits"] += 1
+                return self.resident[key][0]
+            future = self.loading.get(key)
+            owner = future is None
+            if owner:
+                future = self.loading[key] = Future()
+        if not owner:
+            return future.result()  # another thread is loading this model
+        try:
+            path = self.path(*key)
+            model = self.loader(path)
+            size = path.stat().st_size
+        except BaseException as e:
+            with self.lock:
+                del self.loading[key]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            self.resident[key] = (model, size)
+            self.stats["loads"] += 1
+            self._evict(keep=key)
+            del self.loading[key]
+        future.set_result(model)
+        logger.debug(f"Loaded model {key[0]}:{key[1]} ({size / 2**20:.1f} MiB)")
+        return model
+
+    def _evict(self, keep: ModelKey) -> None:
+        used = sum(size for _, size in self.resident.values())
+        for key in list(self.resident):
+            if used <= self.budget:
+                break
+            if key != keep:
+                used -= self.resident.pop(key)[1]
+                self.stats["evictions"] += 1
+
+    def preload(self, keys: Iterable[ModelKey]) -> list[Future]:
+        """Load models in the background, as many as fit the memory budget together.
+
+        Loading more would evict the first ones before they are used. Returns the
+        futures of the submitted loads.
+        """
+        futures, planned = [], 0
+        for name, version in keys:
+            key = self.resolve(name, version)
+            path = self.path(*key)
+            with self.lock:
+                if key in self.resident:  # must stay resident too
+                    planned += self.resident[key][1]
+                    continue
+                if key in self.loading:
+                    continue
+            size = path.stat().st_size if path.exists() else 0
+            if planned + size > self.budget:
+                break
+            planned += size
+            futures.append(self.preload_pool.submit(self.get, *key))
+        return futures
+
+    def close(self) -> None:
+        self.preload_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def predict_routed(
+    registry: ModelRegistry,
+    rows: Sequence[dict[str, Any]],
+    predict: Callable[[Any, list[dict[str, Any]]], list[Any]],
+    name_column: str,
+    version_column: str | None = None,
+) -> list[Any]:
+    """Score each row with the model named in `name_column`, one call per model.
+
+    Returns one result per row, in input order. Rows must be records: a sparse
+    matrix has no column to route on.
+    """
+    if hasattr(rows, "indptr"):
+        raise TypeError("Routing needs records with the route column, not a sparse matrix")
+    groups: dict[ModelKey, list[int]] = {}
+    for i, row in enumerate(rows):
+        version = str(row[version_column]) if version_column else "latest"
+        groups.setdefault((str(row[name_column]), version), []).append(i)
+    registry.preload(groups)  # load the batch's models concurrently, as far as they fit
+    results: list[Any] = [None] * len(rows)
+    for (name, version), indices in groups.items():
+        model = registry.get(name, version)
+        for i, result in zip(indices, predict(model, [rows[i] for i in indices])):
+            results[i] = result
+    return results
@@ -0,0 +1,210 @@
+"""Score NDJSON or CSV records from stdin and write predictions to stdout.
+
+Records are parsed on a reader thread and grouped into micro-batches of up to
+`batch_size` rows, or fewer once `linger_ms` has passed since the batch started,
+so a slow trickle of input is not held back. Batches are scored on a thread pool
+with the model loaded once. Predictions are written in input order as soon as
+the oldest batch completes. At most `max_in_flight` batches are queued or being
+scored, which bounds memory however fast the input arrives. Log lines always go
+to stderr, so stdout carries nothing but predictions.
+"""
+
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+import csv
+from functools import partial
+import json
+from pathlib import Path
+import queue
+import sys
+import threading
+import time
+from typing import Annotated, Any, TextIO
+
+from loguru import logger
+import typer
+
+from {{ module_name }}.config import MODELS_DIR, log_to
+from {{ module_name }}.modeling.predict import load_model, predict
+from {{ module_name }}.modeling.registry import ModelRegistry, predict_routed
+from {{ module_name }}.parallel import limited_threads, threads_per_worker
+
+app = typer.Typer()
+
+_EOF = object()
+
+
+def read_records(lines: TextIO, fmt: str = "auto") -> Iterator[dict[str, Any]]:
+    """Parse NDJSON or CSV (with a header line); "auto" decides from the first line."""
+    first = ""
+    while not first.strip():
+        if not (first := lines.readline()):
+            return
+    if fmt == "auto":
+        fmt = "ndjson" if first.lstrip().startswith("{") else "csv"
+    if fmt == "csv":
+        reader = csv.reader(lines)
+        header = next(csv.reader([first]))
+        yield from (dict(zip(header, values)) for values in reader if values)
+        return
+    yield json.loads(first)
+    yield from (json.loads(line) for line in lines if line.strip())
+
+
+class RecordWriter:
+    """Write result records as NDJSON or CSV, flushing after every batch."""
+
+    def __init__(self, out: TextIO, fmt: str):
+        self.out = out
+        self.fmt = fmt
+        self.csv: csv.DictWriter | None = None
+
+    def write(self, records: list[dict[str, Any]]) -> None:
+        if self.fmt == "csv":
+            if self.csv is None and records:
+                self.csv = csv.DictWriter(self.out, fieldnames=list(records[0]))
+                self.csv.writeheader()
+            if self.csv is not None:
+                self.csv.writerows(records)
+        else:
+            self.out.writelines(json.dumps(record, default=str) + "\n" for record in records)
+        self.out.flush()
+
+
+def _micro_batches(
+    rows: "queue.Queue[Any]", batch_size: int, linger_s: float
+) -> Iterator[list[dict[str, Any]]]:
+    batch: list[dict[str, Any]] = []
+    deadline = 0.0
+    while True:
+        try:
+            timeout = max(deadline - time.monotonic(), 0) if batch else None
+            row = rows.get(timeout=timeout)
+        except queue.Empty:
+            yield batch  # lingered long enough
+            batch = []
+            continue
+        if row is _EOF:
+            break
+        if isinstance(row, BaseException):
+            raise row
+        if not batch:
+            deadline = time.monotonic() + linger_s
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def score_stream(
+    score: Callable[[list[dict[str, Any]]], list[dict[str, Any]]],
+    lines: TextIO,
+    out: TextIO,
+    input_format: str = "auto",
+    output_format: str = "ndjson",
+    batch_size: int = 256,
+    linger_ms: float = 20.0,
+    max_in_flight: int = 8,
+    workers: int = 4,
+    id_column: str | None = None,
+) -> dict[str, float]:
+    """Score records from `lines` into `out` and return throughput statistics."""
+    rows: queue.Queue[Any] = queue.Queue(maxsize=batch_size)
+
+    def reader() -> None:
+        try:
+            for record in read_records(lines, input_format):
+                rows.put(record)
+        except (ValueError, csv.Error) as e:  # surface parse errors in the scoring loop
+            rows.put(e)
+        finally:
+            rows.put(_EOF)
+
+    def run(batch: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        results = score(batch)
+        if id_column is not None:
+            results = [{id_column: row.get(id_column), **r} for row, r in zip(batch, results)]
+        return results
+
+    writer = RecordWriter(out, output_format)
+    pending: deque[Future] = deque()
+    stats = {"rows": 0, "batches": 0}
+
+    def drain(limit: int) -> None:
+        """Write finished batches in order, waiting while more than `limit` are in flight."""
+        while pending and (len(pending) > limit or pending[0].done()):
+            results = pending.popleft().result()
+            writer.write(results)
+            stats["rows"] += len(results)
+
+    start = time.perf_counter()
+    threading.Thread(target=reader, name="stream-reader", daemon=True).start()
+    pool = ThreadPoolExecutor(workers, thread_name_prefix="score")
+    with limited_threads(threads_per_worker(workers)), pool:
+        for batch in _micro_batches(rows, batch_size, linger_ms / 1000):
+            drain(max_in_flight - 1)
+            pending.append(pool.submit(run, batch))
+            stats["batches"] += 1
+        drain(0)
+    stats["rows_per_s"] = stats["rows"] / max(time.perf_counter() - start, 1e-9)
+    return stats
+
+
+@app.command()
+def main(
+    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
+    model_path: Path = MODELS_DIR / "model.pkl",
+    # -----------------------------------------
+    input_format: Annotated[str, typer.Option(help="ndjson, csv or auto")] = "auto",
+    output_format: Annotated[str, typer.Option(help="ndjson or csv")] = "ndjson",
+    batch_size: Annotated[int, typer.Option(help="Maximum rows per micro-batch")] = 256,
+    linger_ms: Annotated[
+        float, typer.Option(help="Maximum wait for a micro-batch to fill")
+    ] = 20.0,
+    max_in_flight: Annotated[
+        int, typer.Option(help="Batches scored or awaiting output at once")
+    ] = 8,
+    workers: Annotated[int, typer.Option(help="Scoring threads")] = 4,
+    id_column: Annotated[
+        str | None, typer.Option(help="Input column copied into each prediction")
+    ] = None,
+    model_name: Annotated[
+        str | None, typer.Option(help="Load this model from the registry instead of model_path")
+    ] = None,
+    model_version: Annotated[str, typer.Option(help="Version of --model-name")] = "latest",
+    route_column: Annotated[
+        str | None,
+        typer.Option(help="Score each row with the registry model it names"),
+    ] = None,
+):
+    log_to(sys.stderr)  # even with LOG_STREAM=stdout
+    registry = ModelRegistry()
+    if route_column:
+        score = partial(predict_routed, registry, predict=predict, name_column=route_column)
+    else:
+        if model_name:
+            model_path = registry.path(*registry.resolve(model_name, model_version))
+        score = partial(predict, load_model(model_path))
+    stats = score_stream(
+        score,
+        sys.stdin,
+        sys.stdout,
+        input_format,
+        output_format,
+        batch_size,
+        linger_ms,
+        max_in_flight,
+        workers,
+        id_column,
+    )
+    logger.info(
+        f"Scored {stats['rows']} rows in {stats['batches']} batches "
+        f"({stats['rows_per_s']:.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    app()
@@ -1,14 +1,174 @@
+from collections.abc import Callable, Iterable, Sequence
+import hashlib
+import json
 from pathlib import Path
+import pickle
+from typing import Annotated, Any
 
 from loguru import logger
 from tqdm import tqdm
 import typer
 
 from {{ module_name }}.config import MODELS_DIR, PROCESSED_DATA_DIR
+from {{ module_name }}.dtypes import load_table
+from {{ module_name }}.manifest import MANIFEST_DIR, Manifest
+from {{ module_name }}.modeling.baseline import MeanRegressor
+from {{ module_name }}.modeling.checkpoint import (
+    CHECKPOINT_DIR,
+    Checkpointer,
+    capture_rng,
+    restore_rng,
+)
+from {{ module_name }}.modeling.loader import PrefetchLoader
+from {{ module_name }}.modeling.predict import load_model
+from {{ module_name }}.sparse import load_features
+from {{ module_name }}.storage import Location, list_locations, remote_uri, write_bytes
+from {{ module_name }}.streaming import inputs_ready
 
 app = typer.Typer()
 
 
+def label_values(rows: list[dict[str, Any]]) -> list[float]:
+    """Extract the first column of a labels table as floats."""
+    return [float(next(iter(row.values()))) for row in rows]
+
+
+def fit(features: Any, labels: Sequence[float] | None = None) -> Any:
+    """Fit a model on an in-memory feature table (records or a sparse matrix)."""
+    # ---- REPLACE THIS WITH YOUR OWN CODE ----
+    return MeanRegressor().fit(features, labels)
+    # -----------------------------------------
+
+
+def split_labels(
+    rows: list[dict[str, Any]], label_column: str
+) -> tuple[list[dict[str, Any]], list[float]]:
+    features = [{k: v for k, v in row.items() if k != label_column} for row in rows]
+    return features, [float(row[label_column]) for row in rows]
+
+
+def fit_chunks(
+    chunks: Iterable[list[dict[str, Any]]],
+    label_column: str,
+    model: Any = None,
+    callback: Callable[[Any, int], None] | None = None,
+) -> Any:
+    """Fit a model incrementally on a stream of record chunks that include the labels.
+
+    Training continues from `model` if given; `callback(model, i)` runs after chunk `i`.
+    """
+    # ---- REPLACE THIS WITH YOUR OWN CODE ----
+    logger.info("Training some model on streamed chunks...")
+    model = model if model is not None else MeanRegressor()
+    for i, chunk in enumerate(
+        tqdm(chunks, total=len(chunks) if hasattr(chunks, "__len__") else None)
+    ):
+        model.partial_fit(*split_labels(chunk, label_column))
+        if callback is not None:
+            callback(model, i)
+    logger.success("Modeling training complete.")
+    # -----------------------------------------
+    return model
+
+
+def supports_warm_start(model: Any) -> bool:
+    """Whether training can continue from `model` (partial_fit or a warm_start parameter)."""
+    params = model.get_params() if hasattr(model, "get_params") else {}
+    return hasattr(model, "partial_fit") or "warm_start" in params
+
+
+def score_chunks(model: Any, chunks: Iterable[list[dict[str, Any]]], label_column: str) -> float:
+    """Row-weighted `model.score` over labelled chunks (negative MSE without one)."""
+    total, rows = 0.0, 0
+    for chunk in chunks:
+        features, labels = split_labels(chunk, label_column)
+        if hasattr(model, "score"):
+            value = model.score(features, labels)
+        else:
+            errors = [(p - y) ** 2 for p, y in zip(model.predict(features), labels)]
+            value = -sum(errors) / max(len(errors), 1)
+        total, rows = total + value * len(chunk), rows + len(chunk)
+    return total / max(rows, 1)
+
+
+def warm_update(model: Any, chunks: Iterable[list[dict[str, Any]]], label_column: str) -> Any:
+    """Continue training `model` on new chunks only."""
+    if hasattr(model, "partial_fit"):
+        return fit_chunks(chunks, label_column, model)
+    model.set_params(warm_start=True)
+    rows = [row for chunk in chunks for row in chunk]
+    return model.fit(*split_labels(rows, label_column))
+
+
+def _meta_path(model_path: Path) -> Path:
+    return model_path.with_suffix(".meta.json")
+
+
+def _locations_sha256(locations: list[Location]) -> str:
+    return hashlib.sha256("\n".join(map(str, locations)).encode()).hexdigest()
+
+
+def _train_chunks(
+    locations: list[Location],
+    label_column: str,
+    prefetch: int,
+    resume: bool,
+    checkpoint_every: int,
+    keep_checkpoints: int,
+    checkpoint_dir: Path,
+    scores: list[tuple[float, int]] | None = None,
+) -> Any:
+    """Train on `locations`, appending the model's (score, rows) on each chunk to `scores`.
+
+    Every chunk is scored before the model is trained on it, so the scores
+    are on data the model had not seen yet. The first chunk of a fresh run
+    has no model to score it with.
+    """
+    fingerprint = _locations_sha256(locations)
+    with Checkpointer(checkpoint_dir, keep=keep_checkpoints) as checkpointer:
+        model, cursor = None, 0
+        if resume and (state := checkpointer.latest()) is not None:
+            if state.get("locations_sha256") == fingerprint:
+                model, cursor = state["model"], state["cursor"]
+                restore_rng(state["rng"])
+                logger.info(f"Skipping {cursor} of {len(locations)} chunks already trained on")
+            else:
+                logger.warning("Checkpoint was taken on other chunks, training from scratch")
+        if cursor == 0:
+            checkpointer.clear()  # leftovers of another run would outrank this run's checkpoints
+
+        trained = model
+
+        def unseen_scores(loader: Iterable[list[dict[str, Any]]]):
+            for chunk in loader:
+                if scores is not None and trained is not None:
+                    scores.append((score_chunks(trained, [chunk], label_column), len(chunk)))
+                yield chunk
+
+        def checkpoint(model: Any, i: int) -> None:
+            nonlocal trained
+            trained = model
+            position = cursor + i + 1
+            if checkpoint_every and position % checkpoint_every == 0:
+                state = {
+                    "model": model,
+                    "cursor": position,
+                    "rng": capture_rng(),
+                    "locations_sha256": fingerprint,
+                }
+                checkpointer.save(position, state)
+
+        loader = PrefetchLoader(locations[cursor:], prefetch=prefetch)
+        model = fit_chunks(unseen_scores(loader), label_column, model, checkpoint)
+        checkpointer.clear()  # a finished run leaves nothing to resume
+        return model
+
+
+def save_model(model: Any, model_path: Path) -> None:
+    """Pickle `model` atomically, so concurrent readers never load a partial file."""
+    write_bytes(model_path, pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+
+
 @app.command()
 def main(
     # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
@@ -16,7 +176,96 @@ def main(
     labels_path: Path = PROCESSED_DATA_DIR / "labels.csv",
     model_path: Path = MODELS_DIR / "model.pkl",
     # -----------------------------------------
+    chunks: Annotated[
+        Path | None,
+        typer.Option(help="Directory or glob of labelled chunks to stream with prefetching"),
+    ] = None,
+    remote: Annotated[
+        bool, typer.Option(help="Read --chunks from its mirror in the dataset storage bucket")
+    ] = False,
+    label_column: str = "label",
+    prefetch: int = 2,
+    resume: Annotated[
+        bool, typer.Option(help="Continue --chunks training from the latest valid checkpoint")
+    ] = False,
+    checkpoint_every: Annotated[
+        int, typer.Option(help="Checkpoint every N chunks (0 disables checkpoints)")
+    ] = 10,
+    keep_checkpoints: int = 3,
+    warm_start: Annotated[
+        bool, typer.Option(help="Continue the model at --model-path on new --chunks only")
+    ] = False,
+    max_score_drop: Annotated[
+        float, typer.Option(help="Relative score drop on new data that forces a full retrain")
+    ] = 0.1,
+    min_score_drop: Annotated[
+        float, typer.Option(help="Absolute score drop always tolerated, even from a baseline of 0")
+    ] = 0.01,
+    full_retrain_every: Annotated[
+        int, typer.Option(help="Force a full retrain after N warm-start updates")
+    ] = 30,
+    baseline_chunks: Annotated[
+        int, typer.Option(help="Newest chunks whose pre-training scores form the baseline")
+    ] = 5,
 ):
+    if chunks is not None:
+        locations = list_locations(remote_uri(chunks) if remote else chunks)
+        manifest = Manifest(MANIFEST_DIR / f"train_{model_path.stem}.json", hash_content=False)
+        meta_path = _meta_path(model_path)
+        meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        model, trained = None, locations
+        if warm_start and model_path.exists():
+            previous = load_model(model_path)
+            new = manifest.pending(locations)
+            if not new:
+                logger.info("No new chunks since the last training run")
+                return
+            score = score_chunks(previous, PrefetchLoader(new, prefetch=prefetch), label_column)
+            baseline = meta.get("baseline_score", score)
+            drifted = score < baseline - max(max_score_drop * abs(baseline), min_score_drop)
+            due = meta.get("warm_updates", 0) >= full_retrain_every
+            if not supports_warm_start(previous):
+                logger.info("Model does not support warm start, retraining from scratch")
+            elif drifted or due:
+                reason = f"score {score:.4g} vs {baseline:.4g}" if drifted else "periodic"
+                logger.info(f"Full retrain ({reason})")
+            else:
+                logger.info(f"Warm start on {len(new)} new of {len(locations)} chunks")
+                loader = PrefetchLoader(new, prefetch=prefetch)
+                model, trained = warm_update(previous, loader, label_column), new
+                meta = {
+                    "warm_updates": meta.get("warm_updates", 0) + 1,
+                    "baseline_score": baseline,
+                }
+        if model is None:
+            scores: list[tuple[float, int]] = []
+            model = _train_chunks(
+                locations,
+                label_column,
+                prefetch,
+                resume,
+                checkpoint_every,
+                keep_checkpoints,
+                CHECKPOINT_DIR / model_path.stem,
+                scores,
+            )
+            manifest.clear()
+            # new chunks are scored before the model sees them, so the baseline
+            # is the score on the newest chunks before they were trained on
+            meta = {"warm_updates": 0}
+            recent = scores[-baseline_chunks:] if baseline_chunks > 0 else []
+            if recent:
+                rows = sum(n for _, n in recent)
+                meta["baseline_score"] = sum(v * n for v, n in recent) / max(rows, 1)
+                logger.info(f"Baseline score {meta['baseline_score']:.4g}")
+        save_model(model, model_path)
+        meta_path.write_text(json.dumps(meta))
+        for location in trained:
+            manifest.record(location)
+        manifest.save()
+        return
+    if not inputs_ready(features_path):
+        return
     # ---- REPLACE THIS WITH YOUR OWN CODE ----
     logger.info("Training some model...")
     for i in tqdm(range(10), total=10):
@@ -24,6 +273,8 @@ def main(
             logger.info("Something happened for iteration 5.")
     logger.success("Modeling training complete.")
     # -----------------------------------------
+    labels = label_values(load_table(labels_path)) if labels_path.exists() else None
+    save_model(fit(load_features(features_path), labels), model_path)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,61 @@
+"""Worker pools that share the CPU budget with BLAS/OpenMP thread pools.
+
+Every process-parallel stage starts its workers through `process_pool`, which
+caps each worker's native thread pools at `CPU_COUNT // workers` threads
+(`THREADS_PER_WORKER` for the default `WORKERS`). Without the cap, each of 64
+workers would start 64 BLAS threads. CPU-bound thread pools run inside
+`limited_threads`, because native thread limits are process-wide. Limits are set
+through the usual environment variables, which cover freshly started
+interpreters, and through threadpoolctl when it is installed
+(`pip install threadpoolctl`), which also covers libraries already loaded in a
+forked worker.
+"""
+
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import os
+from typing import Any
+
+from {{ module_name }}.config import CPU_COUNT, THREAD_ENV_VARS, THREADS_PER_WORKER, WORKERS
+
+
+def threads_per_worker(workers: int) -> int:
+    """Native threads each of `workers` concurrent workers may use within the CPU budget."""
+    return THREADS_PER_WORKER if workers == WORKERS else max(1, CPU_COUNT // workers)
+
+
+def limit_threads(threads: int) -> Any:
+    """Cap BLAS/OpenMP threads in this process; returns the threadpoolctl limiter, if any."""
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    try:
+        from threadpoolctl import threadpool_limits
+    except ModuleNotFoundError:
+        return None
+    return threadpool_limits(threads)
+
+
+@contextmanager
+def limited_threads(threads: int) -> Iterator[None]:
+    """Temporarily cap BLAS/OpenMP threads, e.g. while a CPU-bound thread pool runs."""
+    saved = {var: os.environ.get(var) for var in THREAD_ENV_VARS}
+    limiter = limit_threads(threads)
+    try:
+        yield
+    finally:
+        if limiter is not None:
+            limiter.restore_original_limits()
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def process_pool(workers: int | None = None) -> ProcessPoolExecutor:
+    """A process pool of `workers` (default `WORKERS`) with native threads capped per worker."""
+    workers = workers or WORKERS
+    return ProcessPoolExecutor(
+        workers, initializer=limit_threads, initargs=(threads_per_worker(workers),)
+    )
@@ -0,0 +1,189 @@
+"""Hive-style partitioned datasets (`col=value/part-N.csv`) with partition pruning.
+
+Every part file is registered in a small JSON index at the dataset root together
+with its partition values, row count and per-column min/max statistics; it also
+counts the parts of each partition directory to number new ones. Readers prune on
+the index alone, so no directory walk is needed and parts whose values cannot
+match a filter are never opened.
+
+Filters are `(column, op, value)` tuples combined with AND, where `op` is one of
+`==`, `!=`, `<`, `<=`, `>`, `>=` or `in`, e.g. `[("region", "==", "eu"), ("week", ">=", 40)]`.
+"""
+
+from collections.abc import Iterable, Iterator, Sequence
+import json
+import operator
+import os
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote
+
+from {{ module_name }}.streaming import DEFAULT_BATCH_SIZE, read_csv_batches, write_csv_batches
+
+INDEX_FILE = "_index.json"
+DEFAULT_ROWS_PER_PART = 1_000_000
+
+Filter = tuple[str, str, Any]
+
+_OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda value, options: value in options,
+}
+
+
+def _coerce(value: Any) -> Any:
+    """Interpret CSV strings as numbers where possible so comparisons are numeric."""
+    if not isinstance(value, str):
+        return value
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _matches(value: Any, op: str, target: Any) -> bool:
+    value = _coerce(value)
+    target = [_coerce(t) for t in target] if op == "in" else _coerce(target)
+    try:
+        return _OPS[op](value, target)
+    except TypeError:  # e.g. comparing a string column with a number
+        return op == "!="
+
+
+def _may_match(stats: list[Any] | None, op: str, target: Any) -> bool:
+    """Whether a part with `[min, max]` stats can contain a value satisfying the filter."""
+    if stats is None:
+        return True
+    low, high = stats
+    try:
+        if op == "==":
+            return low <= _coerce(target) <= high
+        if op == "in":
+            return any(low <= _coerce(t) <= high for t in target)
+        if op in ("<", "<="):
+            return _OPS[op](low, _coerce(target))
+        if op in (">", ">="):
+            return _OPS[op](high, _coerce(target))
+    except TypeError:
+        pass
+    return True
+
+
+def _column_stats(rows: list[dict[str, Any]]) -> dict[str, list[Any] | None]:
+    stats = {}
+    for column in rows[0]:
+        values = [_coerce(row[column]) for row in rows if row[column] not in ("", None)]
+        try:
+            stats[column] = [min(values), max(values)] if values else None
+        except TypeError:  # mixed numbers and strings cannot be ordered
+            stats[column] = None
+    return stats
+
+
+class PartitionedDataset:
+    """A directory of CSV parts partitioned by one or more columns."""
+
+    def __init__(self, root: Path, partition_by: Sequence[str] = ()):
+        self.root = Path(root)
+        self.index_path = self.root / INDEX_FILE
+        if self.index_path.exists():
+            self.index = json.loads(self.index_path.read_text())
+            if partition_by and list(partition_by) != self.index["partition_by"]:
+                raise ValueError(
+                    f"{self.root} is partitioned by {self.index['partition_by']}, "
+                    f"not {list(partition_by)}"
+                )
+        else:
+            self.index = {"partition_by": list(partition_by), "parts": []}
+        if "counts" not in self.index:  # new, or written before part counts were tracked
+            counts: dict[str, int] = {}
+            for part in self.index["parts"]:
+                directory = Path(part["path"]).parent.as_posix()
+                counts[directory] = counts.get(directory, 0) + 1
+            self.index["counts"] = counts
+
+    @property
+    def partition_by(self) -> list[str]:
+        return self.index["partition_by"]
+
+    def _save_index(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.index, indent=1, default=str))
+        os.replace(tmp, self.index_path)
+
+    def write(
+        self,
+        batches: Iterable[list[dict[str, Any]]],
+        rows_per_part: int = DEFAULT_ROWS_PER_PART,
+    ) -> int:
+        """Append batches of records as new parts and return the number of rows written."""
+        groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        written = 0
+        for batch in batches:
+            for row in batch:
+                key = tuple(str(row[column]) for column in self.partition_by)
+                group = groups.setdefault(key, [])
+                group.append({k: v for k, v in row.items() if k not in self.partition_by})
+                if len(group) >= rows_per_part:
+                    written += self._write_part(key, groups.pop(key))
+        for key, rows in groups.items():
+            written += self._write_part(key, rows)
+        self._save_index()
+        return written
+
+    def _write_part(self, key: tuple[str, ...], rows: list[dict[str, Any]]) -> int:
+        directory = Path(*(f"{c}={quote(v, safe='')}" for c, v in zip(self.partition_by, key)))
+        number = self.index["counts"].get(directory.as_posix(), 0)
+        self.index["counts"][directory.as_posix()] = number + 1
+        relative = directory / f"part-{number:05d}.csv"
+        write_csv_batches([rows], self.root / relative)
+        self.index["parts"].append(
+            {
+                "path": relative.as_posix(),
+                "partition": dict(zip(self.partition_by, key)),
+                "rows": len(rows),
+                "stats": _column_stats(rows),
+            }
+        )
+        return len(rows)
+
+    def parts(self, filters: Sequence[Filter] = ()) -> list[dict[str, Any]]:
+        """Index entries of the parts that may contain rows matching `filters`."""
+        selected = []
+        for part in self.index["parts"]:
+            keep = True
+            for column, op, target in filters:
+                if column in part["partition"]:
+                    keep = _matches(part["partition"][column], op, target)
+                elif column in part["stats"]:
+                    keep = _may_match(part["stats"][column], op, target)
+                if not keep:
+                    break
+            if keep:
+                selected.append(part)
+        return selected
+
+    def read(
+        self,
+        filters: Sequence[Filter] = (),
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> Iterator[list[dict[str, Any]]]:
+        """Yield batches of rows matching `filters`, opening only the pruned parts."""
+        for part in self.parts(filters):
+            for batch in read_csv_batches(self.root / part["path"], batch_size):
+                rows = [{**row, **part["partition"]} for row in batch]
+                rows = [
+                    row
+                    for row in rows
+                    if all(_matches(row.get(c), op, target) for c, op, target in filters)
+                ]
+                if rows:
+                    yield rows
@@ -0,0 +1,126 @@
+"""In-process pipeline running dataset -> features -> train -> predict as plain functions.
+
+Each stage receives the in-memory output of the stages it depends on, so nothing
+is serialized between them. Only stages marked as checkpoints are persisted.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+import time
+from typing import Annotated, Any
+
+from loguru import logger
+import typer
+
+from {{ module_name }} import dataset, features
+from {{ module_name }}.config import MODELS_DIR, PROCESSED_DATA_DIR, RAW_DATA_DIR
+from {{ module_name }}.dtypes import load_table
+from {{ module_name }}.modeling import predict, train
+from {{ module_name }}.sparse import save_sparse
+from {{ module_name }}.streaming import inputs_ready, read_table, write_table
+
+app = typer.Typer()
+
+
+@dataclass
+class Stage:
+    """A pipeline step.
+
+    `inputs` names the earlier stages whose outputs are passed to `func` as
+    positional arguments; when empty, the previous stage's output is passed.
+    """
+
+    name: str
+    func: Callable[..., Any]
+    inputs: tuple[str, ...] = ()
+    checkpoint: Path | None = None
+
+
+def persist(result: Any, path: Path) -> None:
+    """Write a stage result to disk: models as pickle, sparse matrices as .npz, tables as CSV."""
+    if path.suffix == ".pkl":
+        train.save_model(result, path)
+    elif path.suffix == ".npz":
+        save_sparse(result, path)
+    else:
+        write_table(result, path)
+
+
+def run(stages: list[Stage], data: Any = None) -> dict[str, Any]:
+    """Run stages in order and return every stage's in-memory result by name."""
+    results: dict[str, Any] = {}
+    for stage in stages:
+        args = [results[name] for name in stage.inputs] if stage.inputs else [data]
+        start = time.perf_counter()
+        data = stage.func(*args)
+        logger.info(f"Stage '{stage.name}' finished in {time.perf_counter() - start:.3f}s")
+        results[stage.name] = data
+        if stage.checkpoint is not None:
+            persist(data, stage.checkpoint)
+            logger.info(f"Checkpointed stage '{stage.name}' to {stage.checkpoint}")
+    return results
+
+
+def default_stages(
+    input_path: Path,
+    labels: list[float] | None = None,
+    checkpoints: dict[str, Path] | None = None,
+) -> list[Stage]:
+    """The scaffold's stage chain, with checkpoints enabled for the given stage names."""
+    checkpoints = checkpoints or {}
+    return [
+        Stage(
+            "dataset",
+            lambda _: dataset.process(read_table(input_path)),
+            checkpoint=checkpoints.get("dataset"),
+        ),
+        Stage("features", features.build_features, checkpoint=checkpoints.get("features")),
+        Stage(
+            "train",
+            lambda feats: train.fit(feats, labels),
+            inputs=("features",),
+            checkpoint=checkpoints.get("train"),
+        ),
+        Stage(
+            "predict",
+            predict.predict,
+            inputs=("train", "features"),
+            checkpoint=checkpoints.get("predict"),
+        ),
+    ]
+
+
+CHECKPOINT_PATHS = {
+    "dataset": PROCESSED_DATA_DIR / "dataset.csv",
+    "features": PROCESSED_DATA_DIR / "features.csv",
+    "train": MODELS_DIR / "model.pkl",
+    "predict": PROCESSED_DATA_DIR / "predictions.csv",
+}
+
+
+@app.command()
+def main(
+    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
+    input_path: Path = RAW_DATA_DIR / "dataset.csv",
+    labels_path: Path = PROCESSED_DATA_DIR / "labels.csv",
+    # -----------------------------------------
+    checkpoint: Annotated[
+        list[str] | None,
+        typer.Option(help="Stage to persist, repeatable (default: train)"),
+    ] = None,
+):
+    checkpoint = checkpoint or ["train"]
+    unknown = set(checkpoint) - set(CHECKPOINT_PATHS)
+    if unknown:
+        raise typer.BadParameter(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+    if not inputs_ready(input_path):
+        return
+    labels = train.label_values(load_table(labels_path)) if labels_path.exists() else None
+    start = time.perf_counter()
+    run(default_stages(input_path, labels, {s: CHECKPOINT_PATHS[s] for s in checkpoint}))
+    logger.success(f"Pipeline complete in {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    app()
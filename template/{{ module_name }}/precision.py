@@ -0,0 +1,88 @@
+"""Project-wide floating point precision for feature arrays.
+
+`config.FLOAT_DTYPE` (the `numeric_precision` template answer, overridable with
+`FLOAT_DTYPE` in `.env`) sets the dtype feature arrays are stored in. float32
+halves memory and memory bandwidth, but it only carries ~7 significant digits,
+so long sums lose precision quickly: the reductions below always accumulate in
+float64 and only the stored arrays use `FLOAT_DTYPE`.
+
+The setting applies where the pipeline holds arrays: feature tables loaded by
+`train.py` and `predict.py` through `sparse.load_features` (dense arrays built
+with `feature_matrix` from CSV, hashed CSR matrices from `features.py --sparse`)
+and DataFrames read with `dtypes.load_frame`. The in-process pipeline, chunked
+training and stream scoring otherwise pass records of plain Python floats
+(float64); convert them with `feature_matrix` where a model takes dense arrays.
+
+Array helpers require numpy.
+"""
+
+from collections.abc import Iterable, Sequence
+import math
+from typing import Any
+
+from {{ module_name }}.config import FLOAT_DTYPE
+from {{ module_name }}.profiling import NULL_VALUES
+
+ACCUMULATOR_DTYPE = "float64"
+
+
+def _numpy() -> Any:
+    try:
+        import numpy as np
+    except ModuleNotFoundError as e:
+        raise ModuleNotFoundError("Feature arrays require numpy: pip install numpy") from e
+    return np
+
+
+def _float(value: Any) -> float:
+    return math.nan if value is None or value in NULL_VALUES else float(value)
+
+
+def as_float_array(values: Iterable[Any]) -> Any:
+    """1-D array of `values` in the project precision."""
+    np = _numpy()
+    return np.asarray([_float(v) for v in values], dtype=FLOAT_DTYPE)
+
+
+def feature_matrix(rows: Sequence[dict[str, Any]], columns: Sequence[str] | None = None) -> Any:
+    """Dense (rows x columns) array of records in the project precision; nulls become NaN."""
+    np = _numpy()
+    columns = list(columns if columns is not None else rows[0] if rows else [])
+    matrix = np.empty((len(rows), len(columns)), dtype=FLOAT_DTYPE)
+    for i, row in enumerate(rows):
+        matrix[i] = [_float(row.get(column)) for column in columns]
+    return matrix
+
+
+def downcast_frame(frame: Any) -> Any:
+    """Cast the float64 columns of a pandas DataFrame to the project precision."""
+    if FLOAT_DTYPE == "float64":
+        return frame
+    columns = frame.select_dtypes("float64").columns
+    return frame.astype(dict.fromkeys(columns, FLOAT_DTYPE))
+
+
+def stable_sum(values: Any, axis: int | None = None) -> Any:
+    """Sum accumulated in float64, whatever the precision of `values`."""
+    if hasattr(values, "dtype"):
+        return values.sum(axis=axis, dtype=ACCUMULATOR_DTYPE)
+    return math.fsum(values)
+
+
+def stable_mean(values: Any, axis: int | None = None) -> Any:
+    """Mean accumulated in float64, whatever the precision of `values`."""
+    if hasattr(values, "dtype"):
+        return values.mean(axis=axis, dtype=ACCUMULATOR_DTYPE)
+    values = list(values)
+    return math.fsum(values) / len(values) if values else math.nan
+
+
+def stable_matmul(a: Any, b: Any) -> Any:
+    """Matrix product accumulated in float64 and returned in the project precision.
+
+    Use for long inner dimensions (e.g. Gram matrices X.T @ X over many rows), where
+    float32 accumulation error grows with the number of summed terms.
+    """
+    np = _numpy()
+    product = np.matmul(a.astype(ACCUMULATOR_DTYPE), b.astype(ACCUMULATOR_DTYPE))
+    return product.astype(FLOAT_DTYPE)
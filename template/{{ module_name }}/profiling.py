@@ -0,0 +1,180 @@
+"""One-pass dataset profiling with bounded memory.
+
+Per column: count, nulls, min/max, approximate quantiles (KLL), approximate
+distinct count (HyperLogLog) and top-k heavy hitters (SpaceSaving). The report
+keeps the sketch states, so profiles of shards can be merged with `merge`.
+"""
+
+from collections.abc import Iterable
+import json
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+import typer
+
+from {{ module_name }}.config import RAW_DATA_DIR, REPORTS_DIR
+from {{ module_name }}.ingest import map_csv_ranges
+from {{ module_name }}.sketches import HyperLogLog, KLLSketch, SpaceSaving
+from {{ module_name }}.streaming import read_csv_batches
+
+QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+NULL_VALUES = frozenset(["", "NA", "N/A", "NaN", "nan", "null", "NULL", "None"])
+
+app = typer.Typer()
+
+
+class ColumnProfile:
+    """Streaming statistics for a single column."""
+
+    def __init__(self):
+        self.count = 0
+        self.nulls = 0
+        self.numeric_min: float | None = None
+        self.numeric_max: float | None = None
+        self.text_min: str | None = None
+        self.text_max: str | None = None
+        self.quantiles = KLLSketch()
+        self.distinct = HyperLogLog()
+        self.top = SpaceSaving()
+
+    def update(self, value: Any) -> None:
+        self.count += 1
+        if value is None or value in NULL_VALUES:
+            self.nulls += 1
+            return
+        self.distinct.update(value)
+        self.top.update(value)
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            text = str(value)
+            self.text_min = text if self.text_min is None else min(self.text_min, text)
+            self.text_max = text if self.text_max is None else max(self.text_max, text)
+            return
+        self.quantiles.update(number)
+        self.numeric_min = number if self.numeric_min is None else min(self.numeric_min, number)
+        self.numeric_max = number if self.numeric_max is None else max(self.numeric_max, number)
+
+    def merge(self, other: "ColumnProfile") -> "ColumnProfile":
+        self.count += other.count
+        self.nulls += other.nulls
+        for attr, pick in [
+            ("numeric_min", min),
+            ("numeric_max", max),
+            ("text_min", min),
+            ("text_max", max),
+        ]:
+            values = [v for v in (getattr(self, attr), getattr(other, attr)) if v is not None]
+            setattr(self, attr, pick(values) if values else None)
+        self.quantiles.merge(other.quantiles)
+        self.distinct.merge(other.distinct)
+        self.top.merge(other.top)
+        return self
+
+    def summary(self, top_n: int = 10) -> dict[str, Any]:
+        numeric = self.quantiles.n > 0
+        quantiles = None
+        if numeric:
+            quantiles = dict(zip(map(str, QUANTILES), self.quantiles.quantiles(QUANTILES)))
+        return {
+            "count": self.count,
+            "nulls": self.nulls,
+            "min": self.numeric_min if numeric else self.text_min,
+            "max": self.numeric_max if numeric else self.text_max,
+            "quantiles": quantiles,
+            "distinct_approx": self.distinct.count(),
+            "top": self.top.top(top_n),
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        state = {k: v for k, v in vars(self).items() if k not in ("quantiles", "distinct", "top")}
+        state["sketches"] = {
+            "quantiles": self.quantiles.to_dict(),
+            "distinct": self.distinct.to_dict(),
+            "top": self.top.to_dict(),
+        }
+        return state
+
+    @classmethod
+    def from_dict(cls, state: dict[str, Any]) -> "ColumnProfile":
+        profile = cls()
+        sketches = state["sketches"]
+        profile.quantiles = KLLSketch.from_dict(sketches["quantiles"])
+        profile.distinct = HyperLogLog.from_dict(sketches["distinct"])
+        profile.top = SpaceSaving.from_dict(sketches["top"])
+        for key, value in state.items():
+            if key != "sketches":
+                setattr(profile, key, value)
+        return profile
+
+
+def profile_batches(batches: Iterable[list[dict[str, Any]]]) -> dict[str, ColumnProfile]:
+    profiles: dict[str, ColumnProfile] = {}
+    for batch in batches:
+        for row in batch:
+            for column, value in row.items():
+                if column not in profiles:
+                    profiles[column] = ColumnProfile()
+                profiles[column].update(value)
+    return profiles
+
+
+def merge_profiles(shards: Iterable[dict[str, ColumnProfile]]) -> dict[str, ColumnProfile]:
+    merged: dict[str, ColumnProfile] = {}
+    for shard in shards:
+        for column, profile in shard.items():
+            merged[column] = merged[column].merge(profile) if column in merged else profile
+    return merged
+
+
+def _profile_rows(rows: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    return {column: p.to_dict() for column, p in profile_batches([rows]).items()}
+
+
+def write_report(profiles: dict[str, ColumnProfile], output_path: Path) -> None:
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        "columns": {column: p.summary() for column, p in profiles.items()},
+        "state": {column: p.to_dict() for column, p in profiles.items()},
+    }
+    output_path.write_text(json.dumps(report, indent=2, default=str))
+    logger.success(f"Profile of {len(profiles)} columns written to {output_path}")
+
+
+def read_report(path: Path) -> dict[str, ColumnProfile]:
+    state = json.loads(path.read_text())["state"]
+    return {column: ColumnProfile.from_dict(s) for column, s in state.items()}
+
+
+@app.command()
+def profile(
+    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
+    input_path: Path = RAW_DATA_DIR / "dataset.csv",
+    output_path: Path = REPORTS_DIR / "profile.json",
+    # -----------------------------------------
+    workers: int = 1,
+):
+    """Profile a CSV file in a single streaming pass."""
+    logger.info(f"Profiling {input_path}...")
+    if workers > 1:
+        shards = map_csv_ranges(input_path, _profile_rows, workers)
+        profiles = merge_profiles(
+            {column: ColumnProfile.from_dict(s) for column, s in shard.items()} for shard in shards
+        )
+    else:
+        profiles = profile_batches(read_csv_batches(input_path))
+    write_report(profiles, output_path)
+
+
+@app.command()
+def merge(
+    shard_paths: list[Path],
+    output_path: Path = REPORTS_DIR / "profile.json",
+):
+    """Combine profile reports of dataset shards into a single report."""
+    write_report(merge_profiles(read_report(path) for path in shard_paths), output_path)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,171 @@
+"""Mergeable streaming sketches for one-pass dataset statistics.
+
+All sketches use memory independent of the stream length and can be merged, so
+shards of a dataset can be summarized independently and combined afterwards.
+Each sketch round-trips through `to_dict`/`from_dict` (JSON-serializable).
+"""
+
+import base64
+from hashlib import blake2b
+import math
+import random
+from typing import Any
+
+
+class KLLSketch:
+    """Approximate quantiles (Karnin, Lang & Liberty) in O(k log(n/k)) memory.
+
+    Items are kept in a hierarchy of compactors; an item at level h stands for
+    2**h items of the stream. Rank error is roughly 1.7 / k with high probability.
+    """
+
+    def __init__(self, k: int = 200, seed: int | None = None):
+        self.k = k
+        self.compactors: list[list[float]] = [[]]
+        self.n = 0
+        self._random = random.Random(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return math.ceil(self.k * (2 / 3) ** depth) + 1
+
+    def _size(self) -> int:
+        return sum(len(c) for c in self.compactors)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _compress(self) -> None:
+        while self._size() >= self._max_size():
+            for level, items in enumerate(self.compactors):
+                if len(items) >= self._capacity(level):
+                    if level + 1 == len(self.compactors):
+                        self.compactors.append([])
+                    items.sort()
+                    keep = [items.pop()] if len(items) % 2 else []
+                    offset = self._random.random() < 0.5
+                    self.compactors[level + 1].extend(items[offset::2])
+                    self.compactors[level] = keep
+                    break
+
+    def update(self, value: float) -> None:
+        self.compactors[0].append(value)
+        self.n += 1
+        if len(self.compactors[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, fractions: list[float]) -> list[float | None]:
+        weighted = sorted(
+            (item, 2**level) for level, items in enumerate(self.compactors) for item in items
+        )
+        total = sum(weight for _, weight in weighted)
+        results = []
+        for fraction in fractions:
+            if not weighted:
+                results.append(None)
+                continue
+            target, cumulative = fraction * total, 0
+            for item, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    break
+            results.append(item)
+        return results
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"k": self.k, "n": self.n, "compactors": self.compactors}
+
+    @classmethod
+    def from_dict(cls, state: dict[str, Any]) -> "KLLSketch":
+        sketch = cls(state["k"])
+        sketch.n = state["n"]
+        sketch.compactors = [list(items) for items in state["compactors"]]
+        return sketch
+
+
+def _hash64(value: Any) -> int:
+    return int.from_bytes(blake2b(str(value).encode(), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """Approximate distinct counts in 2**p bytes, with ~1.04 / sqrt(2**p) relative error."""
+
+    def __init__(self, p: int = 14):
+        self.p = p
+        self.registers = bytearray(1 << p)
+
+    def update(self, value: Any) -> None:
+        x = _hash64(value)
+        index = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        self.registers[index] = max(self.registers[index], rank)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0**-r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small cardinalities
+        return round(estimate)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"p": self.p, "registers": base64.b64encode(self.registers).decode()}
+
+    @classmethod
+    def from_dict(cls, state: dict[str, Any]) -> "HyperLogLog":
+        sketch = cls(state["p"])
+        sketch.registers = bytearray(base64.b64decode(state["registers"]))
+        return sketch
+
+
+class SpaceSaving:
+    """Top-k heavy hitters (Metwally et al.): counts overestimate by at most n / k."""
+
+    def __init__(self, k: int = 100):
+        self.k = k
+        self.counts: dict[str, int] = {}
+
+    def update(self, value: Any, count: int = 1) -> None:
+        key = str(value)
+        if key in self.counts or len(self.counts) < self.k:
+            self.counts[key] = self.counts.get(key, 0) + count
+            return
+        victim = min(self.counts, key=self.counts.__getitem__)
+        self.counts[key] = self.counts.pop(victim) + count
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        combined = dict(self.counts)
+        for key, count in other.counts.items():
+            combined[key] = combined.get(key, 0) + count
+        ranked = sorted(combined.items(), key=lambda kv: -kv[1])
+        self.counts = dict(ranked[: self.k])
+        return self
+
+    def top(self, n: int = 10) -> list[tuple[str, int]]:
+        return sorted(self.counts.items(), key=lambda kv: -kv[1])[:n]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"k": self.k, "counts": self.counts}
+
+    @classmethod
+    def from_dict(cls, state: dict[str, Any]) -> "SpaceSaving":
+        sketch = cls(state["k"])
+        sketch.counts = dict(state["counts"])
+        return sketch
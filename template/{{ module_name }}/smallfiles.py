@@ -0,0 +1,212 @@
+"""Concurrent reading of raw datasets made of many small files, and packing into shards.
+
+With millions of small JSON, text or image files, reading one file at a time is
+bound by per-file latency (open, stat, first byte), especially on network
+filesystems. Here directories are listed on a thread pool, and files are read
+through a bounded pool that keeps `readahead` reads in flight. Results come
+back in path order, or in completion order when `ordered=False`.
+
+`pack_shards` (also this module's command) packs the files into tar shards of
+about `shard_mb` each under `data/interim/shards`. `dataset.py` reads such a
+directory of shards with a few large sequential reads per pass instead of
+millions of small ones.
+"""
+
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import csv
+from fnmatch import fnmatch
+import io
+from itertools import islice
+import json
+import os
+from pathlib import Path, PurePosixPath
+import tarfile
+from typing import Any
+
+from loguru import logger
+import typer
+
+from {{ module_name }}.config import INTERIM_DATA_DIR, RAW_DATA_DIR
+from {{ module_name }}.modeling.loader import DECOMPRESSORS
+from {{ module_name }}.streaming import DEFAULT_BATCH_SIZE, inputs_ready
+
+IO_WORKERS = 32  # file reads wait on I/O, so this is not bounded by the CPU budget
+SHARD_BYTES = 256 * 1024**2
+TEXT_SUFFIXES = {".txt", ".md", ".html", ".xml"}
+
+app = typer.Typer()
+
+
+def _scan(directory: Path) -> tuple[list[Path], list[Path]]:
+    files, subdirs = [], []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(Path(entry.path))
+            elif entry.is_file():
+                files.append(Path(entry.path))
+    return files, subdirs
+
+
+def list_files(root: Path, pattern: str = "*", workers: int = IO_WORKERS) -> list[Path]:
+    """Sorted files under `root` whose name matches `pattern`, listing directories in parallel."""
+    files: list[Path] = []
+    with ThreadPoolExecutor(workers) as pool:
+        pending = {pool.submit(_scan, Path(root))}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                found, subdirs = future.result()
+                files.extend(path for path in found if fnmatch(path.name, pattern))
+                pending |= {pool.submit(_scan, subdir) for subdir in subdirs}
+    return sorted(files)
+
+
+def read_concurrently(
+    paths: Iterable[Path],
+    read: Callable[[Path], Any],
+    workers: int = IO_WORKERS,
+    ordered: bool = True,
+    readahead: int | None = None,
+) -> Iterator[tuple[Path, Any]]:
+    """Yield `(path, read(path))` with at most `readahead` (default `4 * workers`) reads in flight."""
+    todo = iter(paths)
+    readahead = readahead or 4 * workers
+
+    def submit(pool: ThreadPoolExecutor, path: Path) -> Future:
+        return pool.submit(lambda: (path, read(path)))
+
+    with ThreadPoolExecutor(workers) as pool:
+        if ordered:
+            buffer = deque(submit(pool, path) for path in islice(todo, readahead))
+            while buffer:
+                result = buffer.popleft().result()
+                if (path := next(todo, None)) is not None:
+                    buffer.append(submit(pool, path))
+                yield result
+            return
+        pending = {submit(pool, path) for path in islice(todo, readahead)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if (path := next(todo, None)) is not None:
+                    pending.add(submit(pool, path))
+                yield future.result()
+
+
+def decode_file(name: str, data: bytes) -> list[dict[str, Any]]:
+    """Records of one file by suffix: JSON, JSON lines, CSV, text, or raw bytes (e.g. images).
+
+    Every record gets a `path` column with `name`.
+    """
+    suffixes = PurePosixPath(name).suffixes
+    while suffixes and suffixes[-1] in DECOMPRESSORS:
+        data = DECOMPRESSORS[suffixes.pop()](data)
+    suffix = suffixes[-1] if suffixes else ""
+    if suffix == ".json":
+        parsed = json.loads(data)
+        records = parsed if isinstance(parsed, list) else [parsed]
+    elif suffix in (".jsonl", ".ndjson"):
+        records = [json.loads(line) for line in data.splitlines() if line.strip()]
+    elif suffix == ".csv":
+        records = list(csv.DictReader(io.StringIO(data.decode())))
+    elif suffix in TEXT_SUFFIXES:
+        records = [{"text": data.decode()}]
+    else:
+        records = [{"bytes": data}]
+    return [
+        {"path": name, **(record if isinstance(record, dict) else {"value": record})}
+        for record in records
+    ]
+
+
+def read_small_files(
+    root: Path,
+    pattern: str = "*",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: int = IO_WORKERS,
+    ordered: bool = True,
+) -> Iterator[list[dict[str, Any]]]:
+    """Batches of records from all matching files under `root`, read concurrently.
+
+    With `ordered=True` the output is deterministic: files in sorted path order.
+    """
+    root = Path(root)
+    paths = list_files(root, pattern, workers)
+    logger.info(f"Reading {len(paths)} files under {root}")
+    batch: list[dict[str, Any]] = []
+    for path, data in read_concurrently(paths, Path.read_bytes, workers, ordered):
+        batch.extend(decode_file(path.relative_to(root).as_posix(), data))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def read_shard(path: Path) -> list[dict[str, Any]]:
+    """Records of every file packed into a tar shard, in packing order."""
+    records = []
+    with tarfile.open(path) as tar:
+        for member in tar:
+            if member.isfile():
+                records.extend(decode_file(member.name, tar.extractfile(member).read()))
+    return records
+
+
+def pack_shards(
+    root: Path,
+    output_dir: Path,
+    pattern: str = "*",
+    shard_bytes: int = SHARD_BYTES,
+    workers: int = IO_WORKERS,
+) -> list[Path]:
+    """Pack matching files under `root` into `output_dir/shard-NNNNN.tar`, in sorted order."""
+    root = Path(root)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = list_files(root, pattern, workers)
+    files = read_concurrently(paths, Path.read_bytes, workers)
+    shards = []
+    item = next(files, None)
+    while item is not None:
+        shard = output_dir / f"shard-{len(shards):05d}.tar"
+        size = 0
+        with tarfile.open(shard.with_suffix(".tmp"), "w") as tar:
+            while item is not None and size < shard_bytes:
+                path, data = item
+                info = tarfile.TarInfo(path.relative_to(root).as_posix())
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+                size += len(data)
+                item = next(files, None)
+        os.replace(shard.with_suffix(".tmp"), shard)
+        shards.append(shard)
+    for stale in output_dir.glob("shard-*.tar"):  # left over from a larger previous pack
+        if stale not in shards:
+            stale.unlink()
+    logger.success(f"Packed {len(paths)} files into {len(shards)} shards in {output_dir}")
+    return shards
+
+
+@app.command()
+def main(
+    # ---- REPLACE DEFAULT PATHS AS APPROPRIATE ----
+    input_dir: Path = RAW_DATA_DIR,
+    output_dir: Path = INTERIM_DATA_DIR / "shards",
+    # ----------------------------------------------
+    pattern: str = "*",
+    shard_mb: int = SHARD_BYTES // 1024**2,
+    workers: int = IO_WORKERS,
+):
+    """Pack many small raw files into tar shards for fast sequential passes."""
+    if not inputs_ready(input_dir):
+        return
+    pack_shards(input_dir, output_dir, pattern, shard_mb * 1024**2, workers)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,294 @@
+"""Chunk-level dataset snapshots, deduplicated locally and in dataset storage.
+
+Files are split with content-defined chunking (FastCDC-style gear hash,
+chunks of 256 KiB to 4 MiB, about 1 MiB on average). Cut points depend only on
+nearby content, so editing a few rows of a large file changes only the chunks
+around the edit. Chunks are stored once, by SHA-256, under
+`.snapshots/chunks`. A snapshot is a JSON manifest listing each file's chunks,
+so keeping many versions costs little more than the changed chunks.
+
+`push` and `pull` copy only the chunks missing on the other side, in parallel,
+and the manifest always goes last. The remote is `SNAPSHOT_REMOTE` from `.env`,
+which may be a bucket URI or a local directory. It defaults to `snapshots/` in
+the dataset storage bucket. Chunking runs at about 1 GB/s with Numba and NumPy
+installed (see `jit.py`), and at only about 5 MB/s in pure Python otherwise.
+"""
+
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import mmap
+import os
+from pathlib import Path
+import time
+from typing import Annotated, Any
+
+from loguru import logger
+import typer
+
+from {{ module_name }}.config import DATASET_URI, PROCESSED_DATA_DIR, PROJ_ROOT
+from {{ module_name }}.jit import is_compiled, jit
+from {{ module_name }}.storage import is_remote, list_locations, read_bytes, write_bytes
+
+SNAPSHOT_DIR = PROJ_ROOT / ".snapshots"
+SNAPSHOT_REMOTE = os.getenv("SNAPSHOT_REMOTE") or (
+    f"{DATASET_URI.rstrip('/')}/snapshots" if DATASET_URI else ""
+)
+TRANSFER_WORKERS = 16
+
+MIN_CHUNK = 256 * 1024
+AVG_CHUNK = 1024 * 1024
+MAX_CHUNK = 4 * 1024 * 1024
+# a gear hash bit k depends on the last k + 1 bytes, so the masks use the top bits;
+# the stricter mask below the average size and the looser one above it narrow the
+# chunk size distribution (normalized chunking)
+_MASK_SMALL = ((1 << 22) - 1) << 10
+_MASK_LARGE = ((1 << 18) - 1) << 14
+GEAR = [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:4], "big") >> 1 for i in range(256)]
+
+app = typer.Typer()
+
+
+@jit
+def next_cut(data, start, end, gear, mask_small, mask_large, min_size, avg_size, max_size):
+    """Offset where the content-defined chunk starting at `start` ends."""
+    size = min(end - start, max_size)
+    if size <= min_size:
+        return start + size
+    h = 0
+    i = start + min_size
+    normal = start + min(avg_size, size)
+    while i < normal:
+        h = ((h << 1) + gear[data[i]]) & 0xFFFFFFFF
+        if h & mask_small == 0:
+            return i + 1
+        i += 1
+    stop = start + size
+    while i < stop:
+        h = ((h << 1) + gear[data[i]]) & 0xFFFFFFFF
+        if h & mask_large == 0:
+            return i + 1
+        i += 1
+    return stop
+
+
+def chunk_file(path: Path) -> Iterator[bytes]:
+    """Content-defined chunks of a file, read through a memory map."""
+    if path.stat().st_size == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        data, gear = view, GEAR
+        if is_compiled(next_cut):
+            import numpy as np
+
+            data, gear = np.frombuffer(view, dtype=np.uint8), np.array(GEAR, dtype=np.int64)
+        start, end = 0, len(view)
+        while start < end:
+            stop = next_cut(
+                data, start, end, gear, _MASK_SMALL, _MASK_LARGE, MIN_CHUNK, AVG_CHUNK, MAX_CHUNK
+            )
+            yield view[start:stop]
+            start = stop
+        del data  # release the NumPy view before the map is closed
+
+
+class ChunkStore:
+    """Chunks and manifests under a local directory or bucket prefix."""
+
+    def __init__(self, root: str | Path):
+        self.root = root if is_remote(root) else Path(root)
+
+    def location(self, key: str) -> str | Path:
+        if isinstance(self.root, Path):
+            return self.root / key
+        return f"{self.root.rstrip('/')}/{key}"
+
+    def keys(self, prefix: str) -> set[str]:
+        location = self.location(prefix)
+        if isinstance(self.root, Path):
+            if not Path(location).is_dir():
+                return set()
+            return {Path(p).relative_to(self.root).as_posix() for p in list_locations(location)}
+        root = self.root.rstrip("/") + "/"
+        return {str(p).removeprefix(root) for p in list_locations(f"{location}/")}
+
+    def get(self, key: str) -> bytes:
+        return read_bytes(self.location(key))
+
+    def put(self, key: str, data: bytes) -> None:
+        write_bytes(self.location(key), data)
+
+    def manifest(self, snapshot_id: str) -> dict[str, Any]:
+        return json.loads(self.get(f"manifests/{snapshot_id}.json"))
+
+    def snapshot_ids(self) -> list[str]:
+        return sorted(Path(key).stem for key in self.keys("manifests"))
+
+
+def chunk_key(digest: str) -> str:
+    return f"chunks/{digest[:2]}/{digest}"
+
+
+def _files(paths: Iterable[Path]) -> list[Path]:
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(p for p in path.rglob("*") if p.is_file() and not p.name.startswith("."))
+        elif path.exists():
+            files.append(path)
+    return sorted(files)
+
+
+def create(paths: Iterable[Path], message: str = "", store: ChunkStore | None = None) -> str:
+    """Snapshot files into the local chunk store and return the snapshot id.
+
+    Files whose size and mtime match the latest snapshot are not re-read.
+    """
+    store = store or ChunkStore(SNAPSHOT_DIR)
+    ids = store.snapshot_ids()
+    previous = store.manifest(ids[-1])["files"] if ids else {}
+    existing = store.keys("chunks")
+    files, new_chunks, new_bytes = {}, 0, 0
+    for path in _files(paths):
+        name = path.resolve().relative_to(PROJ_ROOT).as_posix()
+        stat = path.stat()
+        entry = previous.get(name)
+        if entry and (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+            files[name] = entry
+            continue
+        chunks = []
+        for chunk in chunk_file(path):
+            digest = hashlib.sha256(chunk).hexdigest()
+            chunks.append([digest, len(chunk)])
+            if (key := chunk_key(digest)) not in existing:
+                store.put(key, chunk)
+                existing.add(key)
+                new_chunks += 1
+                new_bytes += len(chunk)
+        files[name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "chunks": chunks}
+    created = time.gmtime()
+    body = json.dumps(files, sort_keys=True).encode()
+    snapshot_id = time.strftime("%Y%m%dT%H%M%SZ-", created) + hashlib.sha256(body).hexdigest()[:8]
+    manifest = {
+        "id": snapshot_id,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", created),
+        "message": message,
+    }
+    store.put(f"manifests/{snapshot_id}.json", json.dumps({**manifest, "files": files}).encode())
+    logger.success(
+        f"Snapshot {snapshot_id}: {len(files)} files, {new_chunks} new chunks "
+        f"({new_bytes / 2**20:.1f} MiB stored)"
+    )
+    return snapshot_id
+
+
+def transfer(
+    source: ChunkStore, target: ChunkStore, snapshot_ids: Iterable[str], workers: int
+) -> int:
+    """Copy snapshots and the chunks the target lacks; returns the number of chunks copied."""
+    manifests = [source.manifest(snapshot_id) for snapshot_id in snapshot_ids]
+    needed = {
+        chunk_key(digest)
+        for manifest in manifests
+        for entry in manifest["files"].values()
+        for digest, _ in entry["chunks"]
+    }
+    missing = sorted(needed - target.keys("chunks"))
+    with ThreadPoolExecutor(workers) as pool:
+        for _ in pool.map(lambda key: target.put(key, source.get(key)), missing):
+            pass
+    for manifest in manifests:  # only once all of its chunks are in place
+        target.put(f"manifests/{manifest['id']}.json", json.dumps(manifest).encode())
+    return len(missing)
+
+
+def checkout(snapshot_id: str, store: ChunkStore | None = None) -> int:
+    """Restore the files of a snapshot from the local chunk store; returns files written."""
+    store = store or ChunkStore(SNAPSHOT_DIR)
+    written = 0
+    for name, entry in store.manifest(snapshot_id)["files"].items():
+        path = PROJ_ROOT / name
+        if path.exists():
+            stat = path.stat()
+            if (stat.st_size, stat.st_mtime_ns) == (entry["size"], entry["mtime_ns"]):
+                continue
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "wb") as f:
+            f.writelines(store.get(chunk_key(digest)) for digest, _ in entry["chunks"])
+        os.utime(tmp, ns=(entry["mtime_ns"], entry["mtime_ns"]))  # lets later runs skip it
+        os.replace(tmp, path)
+        written += 1
+    return written
+
+
+def _remote() -> ChunkStore:
+    if not SNAPSHOT_REMOTE:
+        raise ValueError("No snapshot remote: set SNAPSHOT_REMOTE or DATASET_URI in .env")
+    return ChunkStore(SNAPSHOT_REMOTE)
+
+
+@app.command(name="create")
+def create_command(
+    paths: Annotated[
+        list[Path] | None, typer.Argument(help="Files or directories [default: data/processed]")
+    ] = None,
+    message: str = "",
+):
+    """Snapshot files or directories into the local store.
+
+    Chunking needs Numba and NumPy to run at about 1 GB/s; pure Python manages about 5 MB/s.
+    """
+    if not is_compiled(next_cut):
+        logger.warning("Numba is not installed, chunking runs at about 5 MB/s: pip install numba")
+    create(paths or [PROCESSED_DATA_DIR], message)
+
+
+@app.command(name="list")
+def list_command(remote: bool = False):
+    """List snapshots, oldest first."""
+    store = _remote() if remote else ChunkStore(SNAPSHOT_DIR)
+    for snapshot_id in store.snapshot_ids():
+        manifest = store.manifest(snapshot_id)
+        size = sum(entry["size"] for entry in manifest["files"].values())
+        logger.info(
+            f"{snapshot_id}  {len(manifest['files'])} files, {size / 2**20:.1f} MiB  "
+            f"{manifest['message']}"
+        )
+
+
+@app.command()
+def push(snapshot_id: str = "", workers: int = TRANSFER_WORKERS):
+    """Upload a snapshot (default: all local ones) with only the chunks the remote lacks."""
+    local = ChunkStore(SNAPSHOT_DIR)
+    ids = [snapshot_id] if snapshot_id else local.snapshot_ids()
+    copied = transfer(local, _remote(), ids, workers)
+    logger.success(f"Pushed {len(ids)} snapshots, {copied} chunks uploaded")
+
+
+@app.command()
+def pull(snapshot_id: str = "latest", workers: int = TRANSFER_WORKERS, restore: bool = True):
+    """Download a snapshot with only the chunks missing locally, then check it out."""
+    remote, local = _remote(), ChunkStore(SNAPSHOT_DIR)
+    if snapshot_id == "latest":
+        ids = remote.snapshot_ids()
+        if not ids:
+            raise typer.BadParameter(f"No snapshots in {SNAPSHOT_REMOTE} yet, push one first")
+        snapshot_id = ids[-1]
+    copied = transfer(remote, local, [snapshot_id], workers)
+    logger.info(f"Pulled snapshot {snapshot_id}, {copied} chunks downloaded")
+    if restore:
+        written = checkout(snapshot_id, local)
+        logger.success(f"Checked out {snapshot_id}, {written} files written")
+
+
+@app.command(name="checkout")
+def checkout_command(snapshot_id: str):
+    """Restore the files of a local snapshot."""
+    written = checkout(snapshot_id)
+    logger.success(f"Checked out {snapshot_id}, {written} files written")
+
+
+if __name__ == "__main__":
+    app()
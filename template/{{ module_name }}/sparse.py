@@ -0,0 +1,151 @@
+"""Sparse (CSR) feature matrices built with the hashing trick.
+
+`HashingEncoder` maps every record to a sparse row without a fitted vocabulary:
+numeric values (numeric strings too, as read from CSV without a schema) land in
+the column `hash(name)`, categorical values get an indicator in `hash(name=value)`
+and text columns a bag-of-words count per token. Leave out ids and labels with
+`exclude`.
+Being stateless, it encodes batches independently, so a feature matrix is built
+in one streaming pass. Matrices are stored as `.npz` and never densified;
+scikit-learn estimators accept them directly.
+
+Requires numpy and scipy (installed with scikit-learn).
+"""
+
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+import math
+import os
+from pathlib import Path
+import re
+from typing import Any
+import zlib
+
+from {{ module_name }}.config import FLOAT_DTYPE
+from {{ module_name }}.dtypes import load_table
+from {{ module_name }}.precision import feature_matrix
+from {{ module_name }}.profiling import NULL_VALUES
+
+DEFAULT_N_FEATURES = 2**20
+_TOKEN = re.compile(r"(?u)\b\w\w+\b")
+
+
+def _scipy() -> tuple[Any, Any]:
+    try:
+        import numpy as np
+        from scipy import sparse
+    except ModuleNotFoundError as e:
+        raise ModuleNotFoundError("Sparse features require scipy: pip install scipy") from e
+    return np, sparse
+
+
+def _number(value: Any) -> float | None:
+    """`value` as a finite float if it is a number or a numeric string, else None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int | float):
+        return float(value)
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+class HashingEncoder:
+    """Stateless encoder of records into hashed sparse rows.
+
+    With `alternate_sign`, the sign of each value is taken from its hash so that
+    collisions cancel out in expectation instead of accumulating.
+    """
+
+    def __init__(
+        self,
+        n_features: int = DEFAULT_N_FEATURES,
+        text_columns: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+        alternate_sign: bool = True,
+    ):
+        self.n_features = n_features
+        self.text_columns = set(text_columns)
+        self.exclude = set(exclude)
+        self.alternate_sign = alternate_sign
+
+    def _terms(self, row: dict[str, Any]) -> Iterator[tuple[str, float]]:
+        for column, value in row.items():
+            if column in self.exclude or value is None or value in NULL_VALUES:
+                continue
+            if column in self.text_columns:
+                for token in _TOKEN.findall(str(value).lower()):
+                    yield f"{column}:{token}", 1.0
+            elif (number := _number(value)) is not None:
+                if number:
+                    yield column, number
+            else:
+                yield f"{column}={value}", 1.0
+
+    def transform(self, rows: Sequence[dict[str, Any]]) -> Any:
+        """Encode records as a CSR matrix of shape (len(rows), n_features)."""
+        np, sparse = _scipy()
+        indptr, indices, data = array("q", [0]), array("q"), array("d")
+        for row in rows:
+            for term, value in self._terms(row):
+                h = zlib.crc32(term.encode())
+                indices.append(h % self.n_features)
+                data.append(-value if self.alternate_sign and h & 0x80000000 else value)
+            indptr.append(len(indices))
+        matrix = sparse.csr_matrix(
+            (
+                np.frombuffer(data, dtype="float64").astype(FLOAT_DTYPE),
+                np.frombuffer(indices, dtype="int64"),
+                np.frombuffer(indptr, dtype="int64"),
+            ),
+            shape=(len(rows), self.n_features),
+        )
+        matrix.sum_duplicates()
+        return matrix
+
+    def transform_batches(self, batches: Iterable[Sequence[dict[str, Any]]]) -> Iterator[Any]:
+        for batch in batches:
+            yield self.transform(batch)
+
+
+def vstack_batches(matrices: Iterable[Any]) -> Any:
+    _, sparse = _scipy()
+    return sparse.vstack(list(matrices), format="csr")
+
+
+def save_sparse(matrix: Any, path: Path) -> None:
+    _, sparse = _scipy()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.stem}.tmp.npz")
+    sparse.save_npz(tmp, matrix.tocsr())
+    os.replace(tmp, path)
+
+
+def load_sparse(path: Path) -> Any:
+    """Load a CSR matrix in the project precision, whatever precision it was saved in."""
+    _, sparse = _scipy()
+    matrix = sparse.load_npz(path).tocsr()
+    return matrix if matrix.dtype == FLOAT_DTYPE else matrix.astype(FLOAT_DTYPE)
+
+
+def load_features(path: Path) -> Any:
+    """Load a feature table: a CSR matrix for `.npz` files, a dense array otherwise.
+
+    CSV features become a (rows x columns) array in `FLOAT_DTYPE`, or stay typed
+    records when numpy is not installed.
+    """
+    if path.suffix == ".npz":
+        return load_sparse(path)
+    rows = load_table(path)
+    try:
+        import numpy  # noqa: F401
+    except ModuleNotFoundError:
+        return rows
+    try:
+        return feature_matrix(rows)
+    except ValueError as e:
+        raise ValueError(
+            f"{path} has non-numeric columns; hash them with `features.py --sparse`"
+        ) from e
@@ -0,0 +1,152 @@
+"""Embedded SQL over the project's data directories, powered by DuckDB.
+
+Every CSV or Parquet file (and every partitioned dataset directory) under
+`data/raw`, `data/interim`, `data/processed` and `data/external` is exposed as a
+view in a schema named after its directory, e.g. `processed.features` for
+`data/processed/features.csv`. Views scan the files lazily, so filters and
+projections are pushed down into the readers and results can be streamed.
+
+DuckDB is optional: install it with `pip install duckdb` to use this module.
+"""
+
+from collections.abc import Iterator
+import os
+from pathlib import Path
+import re
+from typing import Annotated, Any
+
+from loguru import logger
+import typer
+
+from {{ module_name }}.config import (
+    EXTERNAL_DATA_DIR,
+    INTERIM_DATA_DIR,
+    PROCESSED_DATA_DIR,
+    RAW_DATA_DIR,
+)
+from {{ module_name }}.streaming import DEFAULT_BATCH_SIZE
+
+DATA_SCHEMAS = {
+    "raw": RAW_DATA_DIR,
+    "interim": INTERIM_DATA_DIR,
+    "processed": PROCESSED_DATA_DIR,
+    "external": EXTERNAL_DATA_DIR,
+}
+SPILL_DIR = INTERIM_DATA_DIR / ".duckdb"
+# CSV files DuckDB can read; lz4-compressed tables (see compression.py) are not exposed
+CSV_SUFFIXES = (".csv", ".csv.gz", ".csv.zst")
+
+app = typer.Typer()
+
+_connection = None
+
+
+def _literal(path: Path) -> str:
+    return "'" + path.as_posix().replace("'", "''") + "'"
+
+
+def _scan_expression(path: Path) -> str | None:
+    """DuckDB table function reading `path`, or None if it is not a dataset."""
+    if path.is_dir():
+        # DuckDB fails on a glob without matches, so only list the suffixes present
+        patterns = [
+            _literal(path / "**" / f"*{suffix}")
+            for suffix in CSV_SUFFIXES
+            if next(path.glob(f"**/*{suffix}"), None)
+        ]
+        if patterns:
+            files = f"[{', '.join(patterns)}]"
+            return f"read_csv_auto({files}, hive_partitioning = true, union_by_name = true)"
+        if next(path.glob("**/*.parquet"), None):
+            return f"read_parquet({_literal(path / '**' / '*.parquet')}, hive_partitioning = true)"
+        return None
+    if path.suffix == ".parquet":
+        return f"read_parquet({_literal(path)})"
+    if path.name.endswith(CSV_SUFFIXES):
+        return f"read_csv_auto({_literal(path)})"
+    return None
+
+
+def _view_name(path: Path) -> str:
+    return re.sub(r"\W", "_", path.name.split(".")[0])
+
+
+def refresh(connection: Any) -> list[str]:
+    """(Re)create one view per dataset found in the data directories."""
+    views = []
+    for schema, directory in DATA_SCHEMAS.items():
+        connection.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+        for path in sorted(directory.glob("*")) if directory.exists() else []:
+            if path.name.startswith(".") or (scan := _scan_expression(path)) is None:
+                continue
+            view = f'{schema}."{_view_name(path)}"'
+            connection.execute(f"CREATE OR REPLACE VIEW {view} AS SELECT * FROM {scan}")
+            views.append(view)
+    return views
+
+
+def connect() -> Any:
+    """Return the process-wide DuckDB connection with views over the data directories.
+
+    Larger-than-memory queries spill to `data/interim/.duckdb`; set
+    `DUCKDB_MEMORY_LIMIT` (e.g. `8GB`) and `DUCKDB_THREADS` in `.env` to bound them.
+    """
+    global _connection
+    if _connection is None:
+        try:
+            import duckdb
+        except ModuleNotFoundError as e:
+            raise ModuleNotFoundError("SQL queries require duckdb: pip install duckdb") from e
+
+        SPILL_DIR.mkdir(parents=True, exist_ok=True)
+        config = {"temp_directory": str(SPILL_DIR)}
+        if memory_limit := os.getenv("DUCKDB_MEMORY_LIMIT"):
+            config["memory_limit"] = memory_limit
+        if threads := os.getenv("DUCKDB_THREADS"):
+            config["threads"] = int(threads)
+        _connection = duckdb.connect(config=config)
+    refresh(_connection)
+    return _connection
+
+
+def query(sql: str, params: list[Any] | None = None) -> Any:
+    """Run SQL against the project data and return a lazy DuckDB relation.
+
+    Nothing is materialized until the relation is consumed, e.g. with `.df()`,
+    `.fetch_record_batch()`, `.write_parquet(path)` or `query_batches`.
+    """
+    return connect().sql(sql, params=params)
+
+
+def query_batches(
+    sql: str, batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[list[dict[str, Any]]]:
+    """Stream query results as batches of records, like `streaming.read_csv_batches`."""
+    result = connect().execute(sql)
+    columns = [column[0] for column in result.description]
+    while rows := result.fetchmany(batch_size):
+        yield [dict(zip(columns, row)) for row in rows]
+
+
+@app.command()
+def main(
+    sql: str,
+    output_path: Annotated[
+        Path | None, typer.Option(help="Write the result to .parquet or .csv instead of printing")
+    ] = None,
+    limit: int = 20,
+):
+    """Run a SQL query over the project's data directories."""
+    relation = query(sql)
+    if output_path is None:
+        relation.limit(limit).show()
+    elif output_path.suffix == ".parquet":
+        relation.write_parquet(str(output_path))
+        logger.success(f"Query result written to {output_path}")
+    else:
+        relation.write_csv(str(output_path))
+        logger.success(f"Query result written to {output_path}")
+
+
+if __name__ == "__main__":
+    app()
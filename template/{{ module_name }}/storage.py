@@ -0,0 +1,139 @@
+"""Byte-level access to local files and the project's dataset storage bucket.
+
+Locations are local paths or URIs: `s3://bucket/key`, `gs://bucket/key` or
+`az://container/blob`. `remote_uri` maps a path under the project root to its
+mirror in `config.DATASET_URI`, the layout `make sync_data_up` produces.
+Remote access uses the client library of the configured `dataset_storage`;
+Azure reads the connection string from `AZURE_STORAGE_CONNECTION_STRING`.
+"""
+
+from collections.abc import Iterator
+from functools import cache
+import os
+from pathlib import Path
+from typing import Any
+
+from {{ module_name }}.config import DATASET_URI, PROJ_ROOT
+
+Location = str | Path
+CHUNK_SIZE = 8 * 2**20
+
+
+def is_remote(location: Location) -> bool:
+    return "://" in str(location)
+
+
+def remote_uri(path: Path) -> str:
+    """URI of the bucket mirror of a local project path, e.g. `data/processed/x.csv`."""
+    if not DATASET_URI:
+        raise ValueError("No dataset storage configured: set DATASET_URI in .env")
+    relative = Path(path).resolve().relative_to(PROJ_ROOT).as_posix()
+    return f"{DATASET_URI.rstrip('/')}/{relative}"
+
+
+def _split(uri: str) -> tuple[str, str, str]:
+    scheme, _, rest = uri.partition("://")
+    bucket, _, key = rest.partition("/")
+    return scheme, bucket, key
+
+
+@cache
+def _client(scheme: str) -> Any:
+    try:
+        if scheme == "s3":
+            import botocore.session
+
+            session = botocore.session.Session(profile=os.getenv("AWS_PROFILE"))
+            return session.create_client("s3")
+        if scheme == "gs":
+            from google.cloud import storage
+
+            return storage.Client()
+        if scheme == "az":
+            from azure.storage.blob import BlobServiceClient
+
+            connection = os.environ["AZURE_STORAGE_CONNECTION_STRING"]
+            return BlobServiceClient.from_connection_string(connection)
+    except ModuleNotFoundError as e:
+        raise ModuleNotFoundError(f"Install the client library for {scheme}:// storage") from e
+    raise ValueError(f"Unsupported storage scheme: {scheme}://")
+
+
+def read_bytes(location: Location) -> bytes:
+    if not is_remote(location):
+        return Path(location).read_bytes()
+    scheme, bucket, key = _split(str(location))
+    client = _client(scheme)
+    if scheme == "s3":
+        return client.get_object(Bucket=bucket, Key=key)["Body"].read()
+    if scheme == "gs":
+        return client.bucket(bucket).blob(key).download_as_bytes()
+    return client.get_blob_client(bucket, key).download_blob().readall()
+
+
+def read_chunks(location: Location, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Stream an object in pieces of about `chunk_size` bytes, never holding all of it."""
+    if not is_remote(location):
+        with open(location, "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+        return
+    scheme, bucket, key = _split(str(location))
+    client = _client(scheme)
+    if scheme == "s3":
+        yield from client.get_object(Bucket=bucket, Key=key)["Body"].iter_chunks(chunk_size)
+    elif scheme == "gs":
+        with client.bucket(bucket).blob(key).open("rb", chunk_size=chunk_size) as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+    else:
+        yield from client.get_blob_client(bucket, key).download_blob().chunks()
+
+
+def write_bytes(location: Location, data: bytes) -> None:
+    if not is_remote(location):
+        path = Path(location)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        return
+    scheme, bucket, key = _split(str(location))
+    client = _client(scheme)
+    if scheme == "s3":
+        client.put_object(Bucket=bucket, Key=key, Body=data)
+    elif scheme == "gs":
+        client.bucket(bucket).blob(key).upload_from_string(data)
+    else:
+        client.get_blob_client(bucket, key).upload_blob(data, overwrite=True)
+
+
+def object_version(location: Location) -> str:
+    """Identifier that changes whenever the object's content changes (its ETag)."""
+    scheme, bucket, key = _split(str(location))
+    client = _client(scheme)
+    if scheme == "s3":
+        return client.head_object(Bucket=bucket, Key=key)["ETag"]
+    if scheme == "gs":
+        return client.bucket(bucket).get_blob(key).etag
+    return client.get_blob_client(bucket, key).get_blob_properties().etag
+
+
+def list_locations(location: Location) -> list[Location]:
+    """Sorted files under a local directory or glob, or objects under a bucket prefix."""
+    if not is_remote(location):
+        path = Path(location)
+        if path.is_dir():
+            return sorted(p for p in path.rglob("*") if p.is_file() and not p.name.startswith("."))
+        return sorted(path.parent.glob(path.name)) if "*" in path.name else [path]
+    scheme, bucket, prefix = _split(str(location))
+    client = _client(scheme)
+    if scheme == "s3":
+        pages = client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix)
+        keys = [obj["Key"] for page in pages for obj in page.get("Contents", [])]
+    elif scheme == "gs":
+        keys = [blob.name for blob in client.list_blobs(bucket, prefix=prefix)]
+    else:
+        container = client.get_container_client(bucket)
+        keys = [blob.name for blob in container.list_blobs(name_starts_with=prefix)]
+    return sorted(f"{scheme}://{bucket}/{key}" for key in keys if not key.endswith("/"))
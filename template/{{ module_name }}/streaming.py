@@ -0,0 +1,110 @@
+"""Streaming readers and writers for the tables passed between pipeline stages.
+
+A table is a list of records (dicts keyed by column name). Stages that need
+more than a batch at a time should iterate over `read_csv_batches` instead of
+loading the whole file. Tables go through `compression.py`: with `COMPRESSION`
+set they are written compressed next to the requested path, and readers find
+them from the plain path.
+"""
+
+from collections.abc import Iterable, Iterator
+import csv
+from itertools import islice
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from {{ module_name }}.compression import compressed_path, locate, open_file
+
+DEFAULT_BATCH_SIZE = 10_000
+
+
+def inputs_ready(*paths: Path) -> bool:
+    """Whether every input exists (under any compression), warning about the missing ones.
+
+    Stage commands return early without their inputs, so the scaffold of a fresh
+    project runs end to end before any data has been added.
+    """
+    missing = [str(path) for path in paths if not locate(path).exists()]
+    if missing:
+        logger.warning(f"Input not found, skipping: {', '.join(missing)}")
+    return not missing
+
+
+def read_csv_batches(
+    path: Path, batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[list[dict[str, Any]]]:
+    """Yield records from a CSV file in batches of at most `batch_size` rows."""
+    with open_file(locate(path), newline="") as f:
+        reader = csv.DictReader(f)
+        while batch := list(islice(reader, batch_size)):
+            yield batch
+
+
+def existing_header(path: Path) -> list[str] | None:
+    """The header of the CSV file at `path`, or None if it does not exist or is empty."""
+    if not path.exists() or path.stat().st_size == 0:
+        return None
+    with open_file(path, newline="") as f:
+        return next(csv.reader(f), None)
+
+
+def _check_columns(columns: Iterable[str], header: list[str], path: Path) -> None:
+    unknown = [column for column in columns if column not in header]
+    if unknown:
+        raise ValueError(f"Cannot append columns {unknown} to {path} with header {header}")
+
+
+def write_csv_batches(
+    batches: Iterable[list[dict[str, Any]]], path: Path, append: bool = False
+) -> int:
+    """Write batches of records to a CSV file and return the number of rows written.
+
+    The header is taken from the first record and is only written when the file
+    is created. With `append=True` records are written in the column order of the
+    existing header, leaving missing columns empty; unknown columns raise ValueError.
+    """
+    path = compressed_path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = existing_header(path) if append else None
+    rows = 0
+    with open_file(path, "a" if append else "w", newline="") as f:
+        writer = None
+        for batch in batches:
+            if not batch:
+                continue
+            if writer is None:
+                if header is None:
+                    writer = csv.DictWriter(f, fieldnames=list(batch[0]))
+                    writer.writeheader()
+                else:
+                    _check_columns(batch[0], header, path)
+                    writer = csv.DictWriter(f, fieldnames=header)
+            writer.writerows(batch)
+            rows += len(batch)
+    return rows
+
+
+def read_table(path: Path) -> list[dict[str, Any]]:
+    """Read a whole CSV file into memory as a list of records."""
+    return [row for batch in read_csv_batches(path) for row in batch]
+
+
+def write_table(table: Any, path: Path, append: bool = False) -> None:
+    """Persist an in-memory table as CSV, optionally appending to an existing file.
+
+    Lists of records are written with the csv module; anything exposing a pandas-style
+    `to_csv` (e.g. a DataFrame) is delegated to it.
+    """
+    path = compressed_path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if hasattr(table, "to_csv"):
+        header = existing_header(path) if append else None
+        if header is not None:
+            _check_columns(table.columns, header, path)
+            table = table.reindex(columns=header)
+        with open_file(path, "a" if append else "w", newline="") as f:
+            table.to_csv(f, index=False, header=header is None)
+    else:
+        write_csv_batches([list(table)], path, append=append)
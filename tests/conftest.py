@@ -47,6 +47,7 @@ CONFIG_OPTIONS = {
     "docs": ["mkdocs", "none"],
     "testing_framework": ["pytest", "unittest", "none"],
     "jupyter_kernel_support": ["Yes", "No"],
+    "numeric_precision": ["float64", "float32"],
 }
 
 
@@ -95,6 +96,7 @@ def config_generator(fast=False):
         "docs",
         "testing_framework",
         "jupyter_kernel_support",
+        "numeric_precision",
     ]
     multi_select_cyclers = {k: cycle(CONFIG_OPTIONS[k]) for k in cycle_fields}
 
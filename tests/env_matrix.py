@@ -207,13 +207,40 @@ def get_expected_files(config: dict) -> list:
     if config.get("include_code_scaffold") == "Yes":
         expected.extend(
             [
+                f"{config['module_name']}/benchmarks.py",
+                f"{config['module_name']}/cas.py",
+                f"{config['module_name']}/compression.py",
                 f"{config['module_name']}/config.py",
                 f"{config['module_name']}/dataset.py",
+                f"{config['module_name']}/dedup.py",
+                f"{config['module_name']}/dtypes.py",
+                f"{config['module_name']}/feature_store.py",
                 f"{config['module_name']}/features.py",
+                f"{config['module_name']}/ingest.py",
+                f"{config['module_name']}/jit.py",
+                f"{config['module_name']}/manifest.py",
                 f"{config['module_name']}/modeling/__init__.py",
-                f"{config['module_name']}/modeling/train.py",
+                f"{config['module_name']}/modeling/baseline.py",
+                f"{config['module_name']}/modeling/cache.py",
+                f"{config['module_name']}/modeling/checkpoint.py",
+                f"{config['module_name']}/modeling/loader.py",
                 f"{config['module_name']}/modeling/predict.py",
+                f"{config['module_name']}/modeling/registry.py",
+                f"{config['module_name']}/modeling/stream.py",
+                f"{config['module_name']}/modeling/train.py",
+                f"{config['module_name']}/parallel.py",
+                f"{config['module_name']}/partitioned.py",
+                f"{config['module_name']}/pipeline.py",
                 f"{config['module_name']}/plots.py",
+                f"{config['module_name']}/precision.py",
+                f"{config['module_name']}/profiling.py",
+                f"{config['module_name']}/sketches.py",
+                f"{config['module_name']}/snapshots.py",
+                f"{config['module_name']}/sparse.py",
+                f"{config['module_name']}/smallfiles.py",
+                f"{config['module_name']}/sql.py",
+                f"{config['module_name']}/storage.py",
+                f"{config['module_name']}/streaming.py",
             ]
         )
 
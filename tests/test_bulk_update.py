@@ -0,0 +1,98 @@
+"""
+Tests for scripts/bulk_update.py that do not need Copier or network access.
+"""
+
+import importlib.util
+import subprocess
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+yaml = pytest.importorskip("yaml")
+
+SCRIPT = Path(__file__).parents[1] / "scripts" / "bulk_update.py"
+ANSWERS_FILE = ".copier-answers.yml"
+
+
+@pytest.fixture(scope="module")
+def bulk_update():
+    spec = importlib.util.spec_from_file_location("bulk_update", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_project(path, commit="v1", **answers):
+    """A git repository with a committed answers file recording `commit`."""
+    path.mkdir(parents=True)
+    answers = {"_commit": commit, "_src_path": "gh:org/template", **answers}
+    (path / ANSWERS_FILE).write_text(yaml.safe_dump(answers))
+    (path / "README.md").write_text("project\n")
+    git = ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+    subprocess.run([*git, "init", "-q"], cwd=path, check=True)
+    subprocess.run([*git, "add", "."], cwd=path, check=True)
+    subprocess.run([*git, "commit", "-q", "-m", "init"], cwd=path, check=True)
+    return path
+
+
+def update_args(**overrides):
+    args = {"answers_file": ANSWERS_FILE, "data": [], "dry_run": True, "conflict": "inline"}
+    return SimpleNamespace(**{**args, **overrides})
+
+
+def test_find_projects_stops_at_answers_and_skips_tool_dirs(bulk_update, tmp_path):
+    for directory in ["a", "a/nested", "b/c", ".venv/d", "node_modules/e"]:
+        (tmp_path / directory).mkdir(parents=True)
+        (tmp_path / directory / ANSWERS_FILE).write_text("_commit: v1\n")
+    (tmp_path / "f").mkdir()
+
+    found = bulk_update.find_projects([tmp_path], ANSWERS_FILE)
+
+    assert found == [tmp_path / "a", tmp_path / "b" / "c"]
+
+
+def test_normalize_url_expands_shortcuts(bulk_update):
+    assert bulk_update.normalize_url("gh:org/repo") == "https://github.com/org/repo.git"
+    assert bulk_update.normalize_url("gl:org/repo.git") == "https://gitlab.com/org/repo.git"
+    assert bulk_update.normalize_url("/srv/template") == "/srv/template"
+
+
+def test_update_project_statuses(bulk_update, tmp_path):
+    project = make_project(tmp_path / "project", commit="v1", license="MIT")
+
+    up_to_date = bulk_update.update_project(project, update_args(), "v1", "v1", None)
+    assert up_to_date.status == "up-to-date"
+
+    # a different --data answer means the project still needs updating
+    args = update_args(data=["license=BSD"])
+    assert bulk_update.update_project(project, args, "v1", "v1", None).status == "would-update"
+
+    would_update = bulk_update.update_project(project, update_args(), "v2", "v2", None)
+    assert (would_update.status, would_update.message) == ("would-update", "v1")
+
+    (project / "README.md").write_text("edited\n")
+    dirty = bulk_update.update_project(project, update_args(), "v2", "v2", None)
+    assert dirty.status == "dirty"
+
+
+def test_conflicted_files_lists_markers_and_rejects(bulk_update, tmp_path):
+    project = make_project(tmp_path / "project")
+    (project / "README.md").write_text(f"{bulk_update.CONFLICT_MARKER}\nmine\n=======\ntheirs\n")
+    (project / "Makefile.rej").write_text("rejected hunk\n")
+
+    assert bulk_update.conflicted_files(project) == ["Makefile.rej", "README.md"]
+
+    # conflicts left by an earlier run are reported even when already at the target
+    result = bulk_update.update_project(project, update_args(), "v1", "v1", None)
+    assert (result.status, result.conflicts) == ("conflicts", ["Makefile.rej", "README.md"])
+
+
+def test_mirror_env_points_git_at_the_mirror(bulk_update, monkeypatch):
+    monkeypatch.setenv("GIT_CONFIG_COUNT", "1")
+
+    env = bulk_update.mirror_env("https://github.com/org/repo.git", Path("/cache/abc.git"))
+
+    assert env["GIT_CONFIG_COUNT"] == "2"
+    assert env["GIT_CONFIG_KEY_1"] == "url./cache/abc.git.insteadOf"
+    assert env["GIT_CONFIG_VALUE_1"] == "https://github.com/org/repo.git"
@@ -233,6 +233,19 @@ def verify_makefile_commands(root, config):
     assert result.returncode == 0
 
 
+def test_scaffold_modules_compile(fast):
+    """Test that every generated scaffold module is valid Python."""
+    config = next(config_generator(fast=1))
+    config["include_code_scaffold"] = "Yes"
+
+    with bake_project(config) as project_dir:
+        module_files = sorted((project_dir / config["module_name"]).rglob("*.py"))
+        assert module_files, "scaffold should generate Python modules"
+        for module_file in module_files:
+            source = module_file.read_text()
+            compile(source, str(module_file), "exec")
+
+
 def test_copier_answers_file_created(fast):
     """Test that .copier-answers.yml is created with correct content."""
     config = next(config_generator(fast=1))
@@ -243,7 +256,9 @@ def test_copier_answers_file_created(fast):
 
         content = answers_file.read_text()
         # Verify key configuration values are recorded
-        # Note: project_name has when: false, so it's auto-derived and not in answers
+        # project_name is recorded so that `copier update` does not re-derive it
+        # from the temporary directory it renders into
+        assert "project_name" in content
         assert "repo_name" in content
         assert "environment_manager" in content
         assert "dependency_file" in content
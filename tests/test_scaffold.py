@@ -0,0 +1,1168 @@
+"""
+Behavioural tests for the generated code scaffold.
+
+One project is baked with the scaffold and its modules are run on small inputs,
+each in a fresh interpreter with the project on PYTHONPATH, so module-level
+configuration (paths, environment variables) is read as in a real project.
+"""
+
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from conftest import bake_project, config_generator, get_copier_cmd
+
+SCAFFOLD_DEPENDENCIES = ("dotenv", "loguru", "tqdm", "typer")
+
+
+def _missing_dependencies():
+    try:
+        get_copier_cmd()
+    except RuntimeError:
+        return ["copier"]
+    missing = []
+    for module in SCAFFOLD_DEPENDENCIES:
+        try:
+            __import__(module)
+        except ModuleNotFoundError:
+            missing.append(module)
+    return missing
+
+
+pytestmark = pytest.mark.skipif(
+    bool(_missing_dependencies()),
+    reason=f"scaffold dependencies not installed: {_missing_dependencies()}",
+)
+
+
+@pytest.fixture(scope="module")
+def project():
+    config = next(config_generator(fast=1))
+    config["include_code_scaffold"] = "Yes"
+    with bake_project(config) as project_dir:
+        yield project_dir, config["module_name"]
+
+
+def run(project, *args, env=None, check=True, input=None):
+    """Run the project's Python with `args` from its root and return the completed process."""
+    project_dir, module = project
+    result = subprocess.run(
+        [sys.executable, *args],
+        cwd=project_dir,
+        env={**os.environ, "PYTHONPATH": str(project_dir), **(env or {})},
+        capture_output=True,
+        text=True,
+        input=input,
+    )
+    if check:
+        assert result.returncode == 0, result.stderr
+    return result
+
+
+def run_code(project, code, env=None):
+    """Run a snippet in the project; `MODULE` in it stands for the module name."""
+    _, module = project
+    return run(project, "-c", textwrap.dedent(code).replace("MODULE", module), env=env)
+
+
+def write_csv(path, rows, mode="w"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, mode, newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        if mode == "w":
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def train_model(project, name):
+    """Train the placeholder model on a small feature table and return its path."""
+    project_dir, module = project
+    features = project_dir / "data" / "processed" / f"{name}_features.csv"
+    write_csv(features, [{"x": i} for i in range(10)])
+    model_path = project_dir / "models" / f"{name}.pkl"
+    run(
+        project,
+        "-m",
+        f"{module}.modeling.train",
+        "--features-path",
+        str(features),
+        "--model-path",
+        str(model_path),
+    )
+    return model_path
+
+
+def test_ingest_ranges_keep_quoted_records_whole(project):
+    """Parallel parsing splits on record boundaries, not inside quoted newlines."""
+    project_dir, _ = project
+    rng = random.Random(0)
+    rows = [
+        {
+            "id": str(i),
+            "text": f'line one, "quoted"\nline two {rng.random()}' if i % 3 else "plain",
+            "value": str(rng.randint(0, 1000)),
+        }
+        for i in range(5000)
+    ]
+    write_csv(project_dir / "data" / "raw" / "quoted.csv", rows)
+    run_code(
+        project,
+        """
+        import csv
+        from MODULE.config import INTERIM_DATA_DIR, RAW_DATA_DIR
+        from MODULE.ingest import read_csv_parallel, split_byte_ranges, write_csv_parts
+
+        path = RAW_DATA_DIR / "quoted.csv"
+        _, ranges = split_byte_ranges(path, 16)
+        assert len(ranges) > 1, ranges
+        expected = list(csv.DictReader(open(path, newline="")))
+        rows = [row for batch in read_csv_parallel(path, workers=2, chunk_bytes=4096) for row in batch]
+        assert rows == expected
+        parts = write_csv_parts(path, INTERIM_DATA_DIR / "quoted", workers=2, chunk_bytes=4096)
+        assert all(part.exists() for part in parts)
+        written = [row for part in parts for row in csv.DictReader(open(part, newline=""))]
+        assert written == expected
+        """,
+    )
+
+
+def test_dataset_processes_appended_rows_and_rebuilds_rewritten_files(project):
+    """Re-runs read only appended rows, deduplicate on the key and rebuild after a rewrite."""
+    project_dir, module = project
+    raw = project_dir / "data" / "raw" / "events"
+    output = project_dir / "data" / "processed" / "events.csv"
+    command = ["-m", f"{module}.dataset", "main", "--input-path", str(raw)]
+    command += ["--output-path", str(output)]
+    command += ["--dedup-key", "id"]
+
+    write_csv(raw / "a.csv", [{"id": i, "value": i * 10} for i in range(10)])
+    run(project, *command)
+    assert [row["id"] for row in read_csv(output)] == [str(i) for i in range(10)]
+
+    # appended rows, one of them a duplicate of an earlier id, and a new file
+    write_csv(raw / "a.csv", [{"id": 3, "value": -1}, {"id": 10, "value": 100}], mode="a")
+    write_csv(raw / "b.csv", [{"id": 11, "value": 110}, {"id": 0, "value": -1}])
+    run(project, *command)
+    rows = read_csv(output)
+    assert [row["id"] for row in rows] == [str(i) for i in range(12)]
+    assert "-1" not in {row["value"] for row in rows}
+
+    # unchanged inputs are skipped
+    run(project, *command)
+    assert read_csv(output) == rows
+
+    # a rewritten file invalidates its earlier rows, so the output is rebuilt
+    write_csv(raw / "a.csv", [{"id": 20, "value": 200}])
+    run(project, *command)
+    assert [row["id"] for row in read_csv(output)] == ["20", "11", "0"]
+
+
+def test_training_resumes_from_checkpoint(project):
+    """An interrupted chunked run resumes after the last checkpointed chunk."""
+    project_dir, _ = project
+    chunks = project_dir / "data" / "processed" / "chunks"
+    for i in range(6):
+        write_csv(chunks / f"chunk-{i}.csv", [{"x": j, "label": i} for j in range(5)])
+    run_code(
+        project,
+        """
+        from MODULE.config import MODELS_DIR, PROCESSED_DATA_DIR
+        from MODULE.modeling import train
+        from MODULE.storage import list_locations
+
+        locations = list_locations(PROCESSED_DATA_DIR / "chunks")
+        checkpoint_dir = MODELS_DIR / "checkpoints" / "resumed"
+        seen = []
+        loader = train.PrefetchLoader
+
+        def interrupted(locations, prefetch):
+            for i, chunk in enumerate(loader(locations, prefetch=prefetch)):
+                if len(seen) == 4:
+                    raise KeyboardInterrupt
+                seen.append(i)
+                yield chunk
+
+        train.PrefetchLoader = interrupted
+        try:
+            train._train_chunks(locations, "label", 1, True, 2, 3, checkpoint_dir)
+        except KeyboardInterrupt:
+            pass
+        assert [p.name for p in checkpoint_dir.glob("ckpt-*.pkl")], "no checkpoint written"
+
+        given = []
+
+        def recorded(locations, prefetch):
+            given.extend(locations)
+            return loader(locations, prefetch=prefetch)
+
+        train.PrefetchLoader = recorded
+        model = train._train_chunks(locations, "label", 1, True, 2, 3, checkpoint_dir)
+        assert given == locations[4:], given
+        assert model.n_samples_ == 30 and abs(model.mean_ - 2.5) < 1e-9, vars(model)
+        assert not checkpoint_dir.exists(), "checkpoints should be cleared after success"
+        """,
+    )
+
+
+def test_prediction_cache_scores_only_misses(project):
+    """Cached rows are not re-scored, across instances, until the model file changes."""
+    run_code(
+        project,
+        """
+        from MODULE.config import MODELS_DIR
+        from MODULE.modeling.cache import CachedModel
+
+        class Doubler:
+            scored = 0
+
+            def predict(self, rows):
+                Doubler.scored += len(rows)
+                return [2 * row["x"] for row in rows]
+
+        model_path = MODELS_DIR / "doubler.pkl"
+        model_path.write_bytes(b"version 1")
+        rows = [{"x": i} for i in range(100)]
+
+        cached = CachedModel(Doubler(), model_path)
+        assert cached.predict(rows) == [2 * i for i in range(100)]
+        assert cached.predict(rows[50:] + [{"x": 100}]) == [2 * i for i in range(50, 101)]
+        assert Doubler.scored == 101
+        assert cached.report()["hit_rate"] == 50 / 151
+
+        # a new instance finds the predictions on disk
+        assert CachedModel(Doubler(), model_path).predict(rows) == [2 * i for i in range(100)]
+        assert Doubler.scored == 101
+
+        # a changed model invalidates them
+        model_path.write_bytes(b"version 2")
+        CachedModel(Doubler(), model_path).predict(rows)
+        assert Doubler.scored == 201
+        """,
+    )
+
+
+def test_feature_store_point_in_time_lookups(project):
+    """Lookups return the newest version at or before the requested time."""
+    run_code(
+        project,
+        """
+        from MODULE.feature_store import FEATURE_STORE_DIR, FeatureStore
+
+        rows = [
+            {"user": "a", "ts": "2024-01-01T00:00:00", "spend": 1},
+            {"user": "a", "ts": "2024-02-01T00:00:00", "spend": 2},
+            {"user": "b", "ts": "2024-01-15T00:00:00", "spend": 3},
+        ]
+        FeatureStore.build(FEATURE_STORE_DIR / "users", rows, "user", "ts", run_size=2).close()
+        with FeatureStore(FEATURE_STORE_DIR / "users") as store:
+            assert len(store) == 3
+            assert store.get("a") == {"spend": 2}
+            assert store.get("a", as_of="2024-01-20T00:00:00") == {"spend": 1}
+            assert store.get("a", as_of="2023-12-31T00:00:00") is None
+            assert store.get("c") is None
+            requests = [{"user": "b", "ts": "2024-03-01T00:00:00"}, {"user": "a", "ts": "2024-01-02"}]
+            assert [row.get("spend") for row in store.join_rows(requests)] == [3, 1]
+            assert store.join_rows([{"user": "a"}]) == [{"user": "a", "spend": 2}]
+        """,
+    )
+
+
+def test_feature_store_from_features_to_predict(project):
+    """`features --store-key` materializes the store and `predict --store` joins it."""
+    project_dir, module = project
+    processed = project_dir / "data" / "processed"
+    write_csv(processed / "accounts.csv", [{"id": i, "score": i / 10} for i in range(20)])
+    features = ["-m", f"{module}.features", "--input-path", str(processed / "accounts.csv")]
+    features += ["--output-path", str(processed / "accounts_features.csv")]
+
+    rejected = run(project, *features, "--sparse", "--store-key", "id", check=False)
+    assert rejected.returncode == 2
+    assert "--store-key" in rejected.stderr
+
+    run(project, *features, "--store-key", "id")
+    run(
+        project,
+        "-m",
+        f"{module}.modeling.train",
+        "--features-path",
+        str(processed / "accounts_features.csv"),
+        "--model-path",
+        str(project_dir / "models" / "accounts.pkl"),
+    )
+    write_csv(processed / "requests.csv", [{"id": 3}, {"id": 99}])
+    predict = ["-m", f"{module}.modeling.predict", "--features-path"]
+    predict += [str(processed / "requests.csv"), "--model-path", "models/accounts.pkl"]
+    predict += ["--predictions-path", str(processed / "request_predictions.csv")]
+    run(project, *predict, "--store", "accounts_features")
+    assert len(read_csv(processed / "request_predictions.csv")) == 2
+
+    missing = run(project, *predict, "--store", "nope", check=False)
+    assert missing.returncode == 2
+    assert "No feature store" in missing.stderr
+
+
+def test_snapshots_store_only_changed_chunks(project, tmp_path):
+    """An edit adds only nearby chunks, and push/pull restore identical files."""
+    remote = tmp_path / "remote"
+    run_code(
+        project,
+        f"""
+        import random
+        import shutil
+
+        from MODULE import snapshots
+        from MODULE.config import PROCESSED_DATA_DIR
+
+        path = PROCESSED_DATA_DIR / "blob.bin"
+        original = random.Random(0).randbytes(3 * 2**20)
+        path.write_bytes(original)
+        first = snapshots.create([path])
+        local = snapshots.ChunkStore(snapshots.SNAPSHOT_DIR)
+        before = len(local.keys("chunks"))
+
+        edited = bytearray(original)
+        edited[1_500_000:1_500_010] = b"x" * 10
+        path.write_bytes(edited)
+        second = snapshots.create([path])
+        added = len(local.keys("chunks")) - before
+        assert 0 < added < before, (added, before)
+
+        remote = snapshots.ChunkStore(r"{remote}")
+        assert snapshots.transfer(local, remote, [first, second], 4) == before + added
+        assert snapshots.transfer(local, remote, [first, second], 4) == 0
+
+        path.unlink()
+        shutil.rmtree(snapshots.SNAPSHOT_DIR)
+        local = snapshots.ChunkStore(snapshots.SNAPSHOT_DIR)
+        assert snapshots.transfer(remote, local, [first], 4) == before
+        assert snapshots.checkout(first, local) == 1
+        assert path.read_bytes() == original
+        """,
+    )
+
+    _, module = project
+    (tmp_path / "empty").mkdir()
+    result = run(
+        project,
+        "-m",
+        f"{module}.snapshots",
+        "pull",
+        env={"SNAPSHOT_REMOTE": str(tmp_path / "empty")},
+        check=False,
+    )
+    assert result.returncode == 2
+    assert "No snapshots" in result.stderr
+
+
+def test_stream_keeps_input_order_and_bounds_in_flight_batches(project):
+    """Batches finishing out of order are written in order, with at most max_in_flight queued."""
+    run_code(
+        project,
+        """
+        import io
+        import json
+        import threading
+        import time
+
+        from MODULE.modeling.stream import score_stream
+
+        started, peak = [], []
+        release = threading.Event()
+
+        def score(batch):
+            started.append(batch[0]["i"])
+            release.wait(5)
+            time.sleep(0.002 * (7 - batch[0]["i"] % 7))  # later batches tend to finish first
+            return [{"prediction": 2 * row["i"]} for row in batch]
+
+        def let_go():
+            peak.append(len(started))
+            release.set()
+
+        threading.Timer(0.5, let_go).start()
+        lines = io.StringIO("".join(json.dumps({"i": i}) + "\\n" for i in range(500)))
+        out = io.StringIO()
+        stats = score_stream(
+            score, lines, out, batch_size=10, max_in_flight=3, workers=8, id_column="i"
+        )
+        assert peak == [3], peak
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert records == [{"i": i, "prediction": 2 * i} for i in range(500)]
+        assert (stats["rows"], stats["batches"]) == (500, 50)
+        """,
+    )
+
+
+@pytest.mark.parametrize("flags", [[], ["-X", "dev"], ["-u", "-W", "ignore"]])
+def test_stream_command_writes_only_predictions_to_stdout(project, flags):
+    """Import-time and scoring log lines go to stderr whatever the interpreter flags."""
+    _, module = project
+    model_path = train_model(project, "streamed")
+    result = run(
+        project,
+        *flags,
+        "-m",
+        f"{module}.modeling.stream",
+        "--model-path",
+        str(model_path),
+        env={"LOG_STREAM": "stdout"},
+        input="".join(f'{{"x": {i}}}\n' for i in range(20)),
+    )
+    lines = result.stdout.splitlines()
+    assert len(lines) == 20
+    assert all(json.loads(line) == {"prediction": 0.0} for line in lines), lines
+    assert "PROJ_ROOT" in result.stderr
+
+
+def test_pipeline_passes_results_in_memory_and_persists_checkpoints(project, tmp_path):
+    """Stages get earlier results in memory; only checkpointed stages are written."""
+    project_dir, _ = project
+    write_csv(project_dir / "data" / "raw" / "pipeline.csv", [{"x": i} for i in range(8)])
+    result = run_code(
+        project,
+        f"""
+        from pathlib import Path
+        import pickle
+
+        from MODULE import pipeline
+        from MODULE.config import RAW_DATA_DIR
+        from MODULE.streaming import read_table
+
+        checkpoints = {{"features": Path(r"{tmp_path}") / "features.csv",
+                        "train": Path(r"{tmp_path}") / "model.pkl"}}
+        stages = pipeline.default_stages(RAW_DATA_DIR / "pipeline.csv", [2.0] * 8, checkpoints)
+        assert [stage.name for stage in stages] == ["dataset", "features", "train", "predict"]
+        results = pipeline.run(stages)
+        assert results["predict"] == [{{"prediction": 2.0}}] * 8
+        assert read_table(checkpoints["features"]) == [{{"x": str(i)}} for i in range(8)]
+        with open(checkpoints["train"], "rb") as f:
+            assert pickle.load(f).predict([{{}}]) == [2.0]
+
+        # a stage may take any earlier results, not just the previous one
+        doubled = pipeline.run([
+            pipeline.Stage("rows", lambda _: [1, 2]),
+            pipeline.Stage("total", sum),
+            pipeline.Stage("both", lambda rows, total: rows + [total], inputs=("rows", "total")),
+        ])
+        assert doubled["both"] == [1, 2, 3]
+        """,
+    )
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["features.csv", "model.pkl"]
+    # predict() and fit() run once per batch elsewhere, so they stay quiet
+    assert "Performing inference" not in result.stderr
+    assert "Training some model" not in result.stderr
+
+
+def test_pipeline_command_checkpoints_train_by_default(project):
+    project_dir, module = project
+    write_csv(project_dir / "data" / "raw" / "dataset.csv", [{"x": i} for i in range(4)])
+    model_path = project_dir / "models" / "model.pkl"
+    model_path.unlink(missing_ok=True)
+
+    run(project, "-m", f"{module}.pipeline")
+    assert model_path.exists()
+    assert not list(model_path.parent.glob(".*.tmp"))
+
+    unknown = run(project, "-m", f"{module}.pipeline", "--checkpoint", "nope", check=False)
+    assert unknown.returncode == 2
+    assert "Unknown stage" in unknown.stderr
+
+
+def test_warm_start_baseline_uses_unseen_scores_and_retrains_on_drift(project, tmp_path):
+    project_dir, module = project
+    chunks = tmp_path / "chunks"
+    chunks.mkdir()
+    model_path = project_dir / "models" / "warm.pkl"
+    meta_path = model_path.with_suffix(".meta.json")
+    args = ["-m", f"{module}.modeling.train", "--chunks", str(chunks)]
+    args += ["--model-path", str(model_path), "--warm-start"]
+
+    for i, label in enumerate([1.0, 3.0, 1.0]):
+        write_csv(chunks / f"{i}.csv", [{"label": label}] * 2)
+    run(project, *args)
+    # chunk 1 is scored by the model fitted on chunk 0 and chunk 2 by the one fitted on
+    # chunks 0-1; scoring after training would give -(5/3 - 3) ** 2 and -(5/3 - 1) ** 2
+    assert json.loads(meta_path.read_text()) == {"warm_updates": 0, "baseline_score": -2.5}
+
+    # new data scoring close to the baseline is a warm start that keeps the baseline
+    write_csv(chunks / "3.csv", [{"label": 0.0}, {"label": 3.0}])
+    assert "Warm start on 1 new of 4 chunks" in run(project, *args).stderr
+    assert json.loads(meta_path.read_text()) == {"warm_updates": 1, "baseline_score": -2.5}
+
+    write_csv(chunks / "4.csv", [{"label": 50.0}])
+    assert "Full retrain (score" in run(project, *args).stderr
+    assert json.loads(meta_path.read_text())["warm_updates"] == 0
+
+
+def test_warm_start_tolerates_small_drops_from_a_zero_baseline(project, tmp_path):
+    project_dir, module = project
+    chunks = tmp_path / "chunks"
+    chunks.mkdir()
+    model_path = project_dir / "models" / "zero.pkl"
+    args = ["-m", f"{module}.modeling.train", "--chunks", str(chunks)]
+    args += ["--model-path", str(model_path), "--warm-start"]
+    for i in range(3):
+        write_csv(chunks / f"{i}.csv", [{"label": 1.0}] * 2)
+    run(project, *args)
+    assert json.loads(model_path.with_suffix(".meta.json").read_text())["baseline_score"] == 0.0
+
+    write_csv(chunks / "3.csv", [{"label": 1.05}, {"label": 0.95}])
+    assert "Warm start on 1 new" in run(project, *args).stderr
+    write_csv(chunks / "4.csv", [{"label": 1.5}, {"label": 0.5}])
+    assert "Full retrain" in run(project, *args, "--min-score-drop", "0.1").stderr
+
+
+def test_dtypes_narrows_columns_and_rejects_rows_that_outgrow_the_schema(project, tmp_path):
+    project_dir, module = project
+    table = tmp_path / "table.csv"
+    write_csv(
+        table,
+        [
+            {"small": i % 100, "signed": -i, "half": i / 2, "fine": i / 3, "kind": "ab"[i % 2]}
+            for i in range(40)
+        ],
+    )
+    result = run(project, "-m", f"{module}.dtypes", str(table), "--no-report")
+    schema = json.loads(table.with_suffix(".schema.json").read_text())
+    assert {column: spec["dtype"] for column, spec in schema.items()} == {
+        "small": "uint8",
+        "signed": "int8",
+        "half": "float32",
+        "fine": "float64",
+        "kind": "category",
+    }
+
+    write_csv(table, [{"small": 300, "signed": 0, "half": 0, "fine": 0, "kind": "c"}], mode="a")
+    stale = run_code(
+        project,
+        f"""
+        from pathlib import Path
+
+        from MODULE.dtypes import StaleSchema, load_frame, load_table
+
+        table = Path(r"{table}")
+        assert load_table(table)[-1]["small"] == 300  # records are only typed, not narrowed
+        try:
+            load_frame(table)
+        except StaleSchema as e:
+            print(e)
+        """,
+    )
+    assert "['small', 'kind']" in stale.stdout
+    # the message's command re-infers the schema
+    command = stale.stdout.split("`")[1].split()
+    assert command[:3] == ["python", "-m", f"{module}.dtypes"]
+    run(project, *command[1:], "--no-report")
+    assert json.loads(table.with_suffix(".schema.json").read_text())["small"]["dtype"] == "uint16"
+    assert "Schema for 5 columns" in result.stderr
+
+
+def test_small_files_are_read_in_order_and_packed_into_shards(project, tmp_path):
+    project_dir, module = project
+    raw = tmp_path / "raw"
+    for i in range(30):
+        (raw / f"d{i % 3}").mkdir(parents=True, exist_ok=True)
+        (raw / f"d{i % 3}" / f"{i:02d}.json").write_text(json.dumps({"i": i}))
+    (raw / "notes.txt").write_text("skipped by the pattern")
+    shards = tmp_path / "shards"
+    run_code(
+        project,
+        f"""
+        from pathlib import Path
+        import time
+
+        from MODULE.smallfiles import read_concurrently, read_shard, read_small_files, pack_shards
+
+        raw, shards = Path(r"{raw}"), Path(r"{shards}")
+        records = [r for batch in read_small_files(raw, "*.json", batch_size=7) for r in batch]
+        assert [r["path"] for r in records] == sorted(f"d{{i % 3}}/{{i:02d}}.json" for i in range(30))
+
+        # reads overlap, and results still come back in path order
+        def slow(path):
+            time.sleep(0.05 if path.name == "a" else 0)
+            return path.name
+        names = [name for _, name in read_concurrently([Path(n) for n in "abc"], slow, workers=3)]
+        assert names == ["a", "b", "c"]
+        done = [name for _, name in read_concurrently([Path(n) for n in "abc"], slow, 3, False)]
+        assert done[-1] == "a"
+
+        packed = pack_shards(raw, shards, "*.json", shard_bytes=64)
+        assert len(packed) > 1
+        assert [r for shard in packed for r in read_shard(shard)] == records
+        """,
+    )
+
+    missing = run(project, "-m", f"{module}.smallfiles", "--input-dir", str(tmp_path / "nope"))
+    assert "Input not found, skipping" in missing.stderr
+
+
+def test_float32_features_reach_train_and_predict(project, tmp_path):
+    project_dir, module = project
+    features = tmp_path / "features.csv"
+    write_csv(features, [{"x": i / 3, "y": i} for i in range(6)])
+    env = {"FLOAT_DTYPE": "float32"}
+    run_code(
+        project,
+        f"""
+        from pathlib import Path
+
+        import numpy as np
+
+        from MODULE.precision import stable_sum
+        from MODULE.sparse import load_features
+
+        matrix = load_features(Path(r"{features}"))
+        assert matrix.dtype == np.float32 and matrix.shape == (6, 2)
+        assert matrix[5].tolist() == [np.float32(5 / 3), 5.0]
+        # reductions accumulate in float64 even over float32 arrays
+        assert stable_sum(np.full(10**6, 0.1, dtype=np.float32)).dtype == np.float64
+        """,
+        env=env,
+    )
+
+    model_path = tmp_path / "model.pkl"
+    predictions = tmp_path / "predictions.csv"
+    paths = ["--features-path", str(features), "--model-path", str(model_path)]
+    run(project, "-m", f"{module}.modeling.train", *paths, env=env)
+    for _ in range(2):  # the second run is answered from the prediction cache
+        args = [*paths, "--predictions-path", str(predictions), "--cache"]
+        result = run(project, "-m", f"{module}.modeling.predict", *args, env=env)
+        assert len(read_csv(predictions)) == 6
+    assert "100.0% hits over 6 rows" in result.stderr
+
+    write_csv(features, [{"x": "a"}])
+    bad = run(project, "-m", f"{module}.modeling.predict", *paths, env=env, check=False)
+    assert "non-numeric columns" in bad.stderr
+
+
+def test_partitioned_reads_open_only_parts_that_may_match(project, tmp_path):
+    run_code(
+        project,
+        f"""
+        from pathlib import Path
+
+        from MODULE import partitioned
+        from MODULE.partitioned import PartitionedDataset
+
+        root = Path(r"{tmp_path}") / "events"
+        rows = [{{"region": "eu" if i % 2 else "us/east", "week": i // 10, "n": i}} for i in range(40)]
+        dataset = PartitionedDataset(root, ["region"])
+        assert dataset.write([rows[:20], rows[20:]], rows_per_part=10) == 40
+        assert len(dataset.parts()) == 4
+        assert (root / "region=us%2Feast" / "part-00000.csv").exists()
+
+        # a reopened dataset keeps numbering parts per partition directory
+        reopened = PartitionedDataset(root)
+        reopened.write([[{{"region": "eu", "week": 9, "n": 99}}]])
+        assert reopened.index["counts"]["region=eu"] == 3
+
+        opened = []
+        read_csv_batches = partitioned.read_csv_batches
+        partitioned.read_csv_batches = lambda path, size: opened.append(path.parent.name) or read_csv_batches(path, size)
+        filters = [("region", "==", "eu"), ("week", ">=", 3)]
+        found = [row for batch in reopened.read(filters) for row in batch]
+        assert sorted(int(row["n"]) for row in found) == [31, 33, 35, 37, 39, 99]
+        # us/east is pruned by partition, and eu's first part by its week statistics
+        assert opened == ["region=eu", "region=eu"]
+        assert [row["region"] for row in found] == ["eu"] * 6
+
+        assert [int(r["n"]) for b in reopened.read([("n", "in", [0, 99])]) for r in b] == [0, 99]
+        try:
+            PartitionedDataset(root, ["week"])
+        except ValueError as e:
+            assert "partitioned by ['region']" in str(e)
+        else:
+            raise AssertionError("a different partitioning was accepted")
+        """,
+    )
+
+
+def test_sql_views_cover_tables_and_partitioned_datasets(project, tmp_path):
+    pytest.importorskip("duckdb")
+    project_dir, module = project
+    write_csv(
+        project_dir / "data" / "processed" / "sql-scores.csv",
+        [{"id": i, "score": i * 10} for i in range(5)],
+    )
+    run_code(
+        project,
+        """
+        from MODULE.config import INTERIM_DATA_DIR
+        from MODULE.partitioned import PartitionedDataset
+        from MODULE.sql import connect, query, query_batches, refresh
+
+        assert 'processed."sql_scores"' in refresh(connect())
+        relation = query("SELECT sum(score) AS total FROM processed.sql_scores WHERE id >= ?", [3])
+        assert relation.fetchall() == [(70,)]
+
+        # views are refreshed on every query, so new datasets show up without reconnecting
+        events = [{"region": r, "n": i} for i, r in enumerate(["eu", "us", "eu"])]
+        PartitionedDataset(INTERIM_DATA_DIR / "sql_events", ["region"]).write([events])
+        sql = "SELECT region, count(*) AS n FROM interim.sql_events GROUP BY region ORDER BY region"
+        assert list(query_batches(sql, batch_size=1)) == [
+            [{"region": "eu", "n": 2}],
+            [{"region": "us", "n": 1}],
+        ]
+        """,
+    )
+    output = tmp_path / "top.csv"
+    sql = "SELECT id FROM processed.sql_scores ORDER BY score DESC LIMIT 2"
+    run(project, "-m", f"{module}.sql", sql, "--output-path", str(output))
+    assert read_csv(output) == [{"id": "4"}, {"id": "3"}]
+
+
+def test_profiles_of_shards_merge_into_the_single_pass_profile(project, tmp_path):
+    _, module = project
+    rows = [
+        {"x": i % 1000, "kind": "common" if i % 4 else f"rare{i}", "gap": "" if i % 10 else i}
+        for i in range(20_000)
+    ]
+    whole, first, second = tmp_path / "whole.csv", tmp_path / "first.csv", tmp_path / "second.csv"
+    write_csv(whole, rows)
+    write_csv(first, rows[:7_000])
+    write_csv(second, rows[7_000:])
+
+    def profile(path, *args):
+        output = tmp_path / f"{path.stem}{len(args)}.json"
+        run(
+            project,
+            "-m",
+            f"{module}.profiling",
+            "profile",
+            "--input-path",
+            str(path),
+            "--output-path",
+            str(output),
+            *args,
+        )
+        return output
+
+    shards = [profile(first), profile(second)]
+    merged = tmp_path / "merged.json"
+    run(
+        project,
+        "-m",
+        f"{module}.profiling",
+        "merge",
+        *map(str, shards),
+        "--output-path",
+        str(merged),
+    )
+
+    expected = json.loads(profile(whole).read_text())["columns"]
+    for report in [merged, profile(whole, "--workers", "3")]:
+        columns = json.loads(report.read_text())["columns"]
+        for column in ["x", "kind", "gap"]:
+            for key in ["count", "nulls", "min", "max"]:
+                assert columns[column][key] == expected[column][key], (column, key)
+        assert abs(columns["x"]["distinct_approx"] - 1000) < 30
+        assert abs(columns["kind"]["distinct_approx"] - 5001) < 150
+        assert columns["kind"]["top"][0] == ["common", 15_000]
+        assert abs(columns["x"]["quantiles"]["0.5"] - 500) < 30
+    assert expected["gap"]["nulls"] == 18_000
+
+
+def test_sparse_features_are_hashed_in_batches_and_reach_train_and_predict(project, tmp_path):
+    pytest.importorskip("scipy")
+    _, module = project
+    dataset = tmp_path / "dataset.csv"
+    rows = [
+        {
+            "id": i,
+            "amount": i % 7,
+            "city": ["paris", "oslo"][i % 2],
+            "note": "red fox" if i % 3 else "",
+        }
+        for i in range(50)
+    ]
+    write_csv(dataset, rows)
+    run_code(
+        project,
+        f"""
+        import csv
+
+        from MODULE.sparse import HashingEncoder, vstack_batches
+
+        rows = list(csv.DictReader(open(r"{dataset}")))
+        encoder = HashingEncoder(2**20, text_columns=["note"], exclude=["id"], alternate_sign=False)
+        matrix = encoder.transform(rows)
+        assert matrix.shape == (50, 2**20)
+        # numeric strings are values, categories indicators and text a count per token
+        assert sorted(matrix[1].data.tolist()) == [1.0, 1.0, 1.0, 1.0]  # amount 1, city, red, fox
+        assert matrix[0].nnz == 1  # amount 0 is not stored and the empty note is skipped
+        assert matrix[6].nnz == 2  # amount 6 and city
+        batched = vstack_batches(encoder.transform_batches([rows[:20], rows[20:]]))
+        assert (batched != matrix).nnz == 0
+        """,
+    )
+
+    features = tmp_path / "features.csv"
+    run(
+        project,
+        "-m",
+        f"{module}.features",
+        "--input-path",
+        str(dataset),
+        "--output-path",
+        str(features),
+        "--sparse",
+        "--text-column",
+        "note",
+        "--exclude-column",
+        "id",
+    )
+    matrix_path = features.with_suffix(".npz")
+    assert matrix_path.exists() and not features.exists()
+    model_path, predictions = tmp_path / "model.pkl", tmp_path / "predictions.csv"
+    paths = ["--features-path", str(matrix_path), "--model-path", str(model_path)]
+    run(project, "-m", f"{module}.modeling.train", *paths)
+    for _ in range(2):  # the second run is answered from the prediction cache
+        run(
+            project,
+            "-m",
+            f"{module}.modeling.predict",
+            *paths,
+            "--predictions-path",
+            str(predictions),
+            "--cache",
+        )
+        assert len(read_csv(predictions)) == 50
+    routed = run(
+        project, "-m", f"{module}.modeling.predict", *paths, "--route-column", "city", check=False
+    )
+    assert routed.returncode == 2
+
+
+@pytest.mark.parametrize("disable_jit", ["0", "1"])
+def test_partitioned_kernels_match_a_serial_run(project, disable_jit):
+    pytest.importorskip("numpy")
+    run_code(
+        project,
+        """
+        import numpy as np
+
+        from MODULE.features import session_numbers
+        from MODULE.jit import is_compiled, map_partitions, partition_bounds
+
+        assert partition_bounds(10, 3) == [(0, 4), (4, 8), (8, 10)]
+        # a run of equal keys is never split across partitions
+        keys = np.repeat(np.arange(40), np.arange(40) % 5 + 1)
+        bounds = partition_bounds(len(keys), 4, keys)
+        assert all(keys[start] != keys[start - 1] for start, _ in bounds[1:])
+        assert bounds[0][0] == 0 and bounds[-1][1] == len(keys)
+
+        timestamps = np.arange(len(keys), dtype=np.float64) * np.tile([1.0, 9.0], len(keys))[: len(keys)]
+        serial = np.empty(len(keys), dtype=np.int64)
+        getattr(session_numbers, "py_func", session_numbers)(keys, timestamps, serial, 5.0)
+        parallel = np.full(len(keys), -1, dtype=np.int64)
+        map_partitions(session_numbers, (keys, timestamps), parallel, 5.0, keys=keys, workers=4)
+        assert (parallel == serial).all() and serial.max() > 0
+        try:
+            import numba  # noqa: F401
+        except ModuleNotFoundError:
+            numba = None
+        assert is_compiled(session_numbers) == (numba is not None and DISABLE == "0")
+        """.replace("DISABLE", repr(disable_jit)),
+        env={"NUMBA_DISABLE_JIT": disable_jit},
+    )
+
+
+def test_prefetch_loader_reads_ahead_in_order_and_decodes_chunks(project, tmp_path):
+    run_code(
+        project,
+        f"""
+        import gzip
+        from pathlib import Path
+        import threading
+        import time
+
+        from MODULE.modeling.loader import PrefetchLoader, read_chunk
+
+        started, consumed, ahead = [], [], []
+        lock = threading.Lock()
+
+        def read(location):
+            with lock:
+                started.append(location)
+                ahead.append(len(started) - len(consumed))
+            time.sleep(0.02 if location % 3 else 0.05)
+            return location
+
+        loader = PrefetchLoader(range(12), read=read, prefetch=2)
+        start = time.perf_counter()
+        for chunk in loader:
+            with lock:
+                consumed.append(chunk)
+            time.sleep(0.03)  # training overlaps with the next reads
+        elapsed = time.perf_counter() - start
+        assert consumed == list(range(12)) and len(loader) == 12
+        # the chunk in use plus `prefetch` chunks loading
+        assert max(ahead) <= 3
+        assert elapsed < 12 * (0.03 + 0.02) and loader.stats["chunks"] == 12
+
+        path = Path(r"{tmp_path}") / "chunk.csv.gz"
+        path.write_bytes(gzip.compress(b"x,label\\n1,2\\n"))
+        assert read_chunk(path) == [{{"x": "1", "label": "2"}}]
+        """,
+    )
+
+
+def test_registry_evicts_least_recently_used_and_shares_first_loads(project, tmp_path):
+    run_code(
+        project,
+        f"""
+        from concurrent.futures import ThreadPoolExecutor
+        from pathlib import Path
+        import pickle
+        import threading
+        import time
+
+        from MODULE.modeling.registry import ModelRegistry, predict_routed
+
+        calls = []
+
+        def slow_loader(path):
+            calls.append(path.stem)
+            time.sleep(0.1)
+            if path.stem == "broken":
+                raise ValueError("cannot load")
+            with open(path, "rb") as f:
+                return pickle.load(f)
+
+        root = Path(r"{tmp_path}") / "models"
+        registry = ModelRegistry(root, memory_budget_mb=2500 / 2**20, loader=slow_loader)
+        for name in ["a", "b", "c"]:
+            registry.register(name * 1000, name, "v9")
+        registry.register("a" * 1000, "a", "v10")
+        assert registry.resolve("a") == ("a", "v10")  # natural order: v10 > v9
+
+        # eight concurrent first requests share a single load
+        with ThreadPoolExecutor(8) as pool:
+            models = list(pool.map(lambda _: registry.get("b", "v9"), range(8)))
+        assert calls == ["v9"] and all(m is models[0] for m in models)
+
+        registry.get("c", "v9")
+        registry.get("b", "v9")  # now c is the least recently used
+        registry.get("a", "v9")
+        assert list(registry.resident) == [("b", "v9"), ("a", "v9")]
+        # waiters on a shared load are not hits, the repeated get of b is
+        assert registry.stats == {{"hits": 1, "loads": 3, "evictions": 1}}
+
+        # a failed load reaches every waiter and is retried by the next request
+        registry.register("x", "broken", "broken")
+        errors = []
+        def get_broken():
+            try:
+                registry.get("broken")
+            except ValueError as e:
+                errors.append(e)
+        threads = [threading.Thread(target=get_broken) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(errors) == 3 and calls.count("broken") == 1
+        assert not registry.loading
+
+        # re-registering a version replaces the resident model
+        registry.register("B" * 1000, "b", "v9")
+        assert registry.get("b", "v9") == "B" * 1000
+
+        rows = [{{"model": m}} for m in "abab"]
+        def predict(model, batch):
+            return [model[0]] * len(batch)
+        assert predict_routed(registry, rows, predict, "model") == ["a", "B", "a", "B"]
+        registry.close()
+        """,
+    )
+
+
+def test_worker_pools_split_the_cpu_budget_between_native_thread_pools(project, monkeypatch):
+    for var in ["OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "THREADS_PER_WORKER"]:
+        monkeypatch.delenv(var, raising=False)
+    run_code(
+        project,
+        """
+        import os
+
+        from MODULE.config import CPU_COUNT, THREADS_PER_WORKER, WORKERS
+        from MODULE.parallel import limited_threads, process_pool, threads_per_worker
+
+        assert (CPU_COUNT, WORKERS, THREADS_PER_WORKER) == (8, 2, 4)
+        # the main process may use the whole budget; an explicit setting wins
+        assert os.environ["OPENBLAS_NUM_THREADS"] == "8"
+        assert os.environ["OMP_NUM_THREADS"] == "3"
+
+        with process_pool() as pool:
+            assert pool.submit(os.getenv, "MKL_NUM_THREADS").result() == "4"
+        assert threads_per_worker(8) == 1
+        with process_pool(8) as pool:
+            assert set(pool.map(os.getenv, ["OMP_NUM_THREADS"] * 16)) == {"1"}
+
+        with limited_threads(2):
+            assert os.environ["OMP_NUM_THREADS"] == os.environ["MKL_NUM_THREADS"] == "2"
+        assert os.environ["OMP_NUM_THREADS"] == "3" and os.environ["MKL_NUM_THREADS"] == "8"
+        """,
+        env={"CPU_COUNT": "8", "WORKERS": "2", "OMP_NUM_THREADS": "3"},
+    )
+
+
+def test_data_cache_counts_references_and_collects_unreferenced_objects(project, tmp_path):
+    run_code(
+        project,
+        f"""
+        import hashlib
+        import os
+        from pathlib import Path
+
+        from MODULE import cas
+        from MODULE.cas import DataCache
+
+        root = Path(r"{tmp_path}")
+        a, b, c = (root / "project" / name for name in ["a.csv", "b.csv", "c.csv"])
+        a.parent.mkdir()
+        a.write_text("x\\n1\\n")
+        b.write_text("x\\n1\\n")
+        c.write_text("x\\n2\\n")
+
+        def refcounts(cache):
+            return sorted(n for _, n in cache.db.execute("SELECT digest, COUNT(*) FROM refs GROUP BY digest"))
+
+        with DataCache(root / "cache", "hardlink") as cache:
+            assert [cache.add(p) for p in (a, b, c)] == [True, True, True]
+            assert not cache.add(a)  # unchanged since it was linked
+            assert os.path.samefile(a, b) and a.stat().st_nlink == 3  # a, b and the object
+            assert a.stat().st_mode & 0o777 == 0o444  # writing through a link would change b too
+            assert refcounts(cache) == [1, 2]
+            assert cache.gc(0)["deleted"] == 0
+
+            a.unlink()
+            assert cache.gc(0) == {{"stale_refs": 1, "objects": 2, "deleted": 0, "freed_bytes": 0}}
+            tmp = c.with_suffix(".tmp")  # linked files are read-only, so replace it
+            tmp.write_text("x\\n3\\n")
+            os.replace(tmp, c)
+            # the new content is not in the cache yet and the old one is only collected after the grace period
+            assert cache.gc(3600)["deleted"] == 0
+            assert cache.gc(0) == {{"stale_refs": 0, "objects": 2, "deleted": 1, "freed_bytes": 4}}
+            assert refcounts(cache) == [1]
+
+            # each remote version is downloaded once per host, then linked from the cache
+            downloads, version = [], "v1"
+            def download(uri, path):
+                downloads.append(version)
+                path.write_bytes(version.encode())
+                return hashlib.sha256(version.encode()).hexdigest()
+            cas._download = download
+            cas.object_version = lambda uri: version
+            first, second = root / "one" / "data.bin", root / "two" / "data.bin"
+            assert cache.checkout("s3://bucket/data.bin", first)
+            assert not cache.checkout("s3://bucket/data.bin", second)
+            assert not cache.checkout("s3://bucket/data.bin", second)
+            assert os.path.samefile(first, second)
+            version = "v2"
+            assert cache.checkout("s3://bucket/data.bin", second)
+            assert downloads == ["v1", "v2"] and second.read_text() == "v2"
+        """,
+    )
+
+
+@pytest.mark.parametrize("codec, package", [("zstd", "zstandard"), ("lz4", "lz4")])
+def test_compressed_files_read_any_range_from_the_frames_covering_it(
+    project, tmp_path, codec, package
+):
+    pytest.importorskip(package)
+    run_code(
+        project,
+        f"""
+        from pathlib import Path
+
+        from MODULE import compression
+        from MODULE.compression import SUFFIXES, convert, data_size, open_file
+
+        compression.FRAME_BYTES = 1000
+        data = bytes(range(256)) * 40 + b"tail"
+        path = Path(r"{tmp_path}") / f"table.bin{{SUFFIXES['{codec}']}}"
+        with open_file(path, "wb") as f:
+            f.write(data[:3000])
+        with open_file(path, "ab") as f:  # appending keeps a single seek table
+            f.write(data[3000:])
+        assert data_size(path) == len(data)
+
+        decompressed = []
+        decompress = compression.decompress
+        compression.decompress = lambda frame, codec: decompressed.append(len(frame)) or decompress(frame, codec)
+        with open_file(path, "rb") as f:
+            f.seek(4500)
+            assert f.read(1000) == data[4500:5500]
+            assert len(decompressed) == 2  # only the frames holding bytes 4000-5999
+            f.seek(-4, 2)
+            assert f.read() == b"tail"
+        with open_file(path, "rb") as f:
+            assert f.read() == data
+
+        plain = convert(path, "none")
+        assert plain.read_bytes() == data and not path.exists()
+        assert convert(plain, "{codec}") == path
+        """,
+    )
+
+
+def test_sampling_is_deterministic_per_seed_and_stratum(project, tmp_path):
+    _, module = project
+    run_code(
+        project,
+        """
+        from collections import Counter
+
+        from MODULE.dataset import sample_rows
+
+        rows = [{"id": i, "kind": "rare" if i % 50 == 0 else "common"} for i in range(5000)]
+        ids = lambda sample: [row["id"] for row in sample]
+
+        first = ids(sample_rows(rows, size=20, seed=1))
+        assert first == ids(sample_rows(rows, size=20, seed=1)) and first == sorted(first)
+        assert first != ids(sample_rows(rows, size=20, seed=2)) and len(first) == 20
+
+        strata = Counter(row["kind"] for row in sample_rows(rows, size=30, stratify_by="kind"))
+        assert strata == {"rare": 30, "common": 30}
+        # a stratum's sample does not depend on the rows of the other strata
+        rare = [row for row in rows if row["kind"] == "rare"]
+        stratified = [r for r in sample_rows(rows, size=30, stratify_by="kind", seed=3) if r["kind"] == "rare"]
+        assert ids(stratified) == ids(sample_rows(rare, size=30, stratify_by="kind", seed=3))
+
+        # the reservoir is uniform: every position is kept about equally often
+        counts = Counter(i // 500 for seed in range(200) for i in ids(sample_rows(rows, size=50, seed=seed)))
+        assert all(800 < counts[decile] < 1200 for decile in range(10)), counts
+        kept = sum(1 for _ in sample_rows(rows, fraction=0.1, seed=4))
+        assert 400 < kept < 600
+        """,
+    )
+
+    raw = tmp_path / "raw.csv"
+    write_csv(raw, [{"id": i, "kind": i % 3} for i in range(1000)])
+    outputs = []
+    for hash_seed in ["1", "2"]:
+        output = tmp_path / f"sample{hash_seed}.csv"
+        args = [
+            "--input-path",
+            str(raw),
+            "--output-path",
+            str(output),
+            "--size",
+            "5",
+            "--stratify-by",
+            "kind",
+        ]
+        run(project, "-m", f"{module}.dataset", "sample", *args, env={"PYTHONHASHSEED": hash_seed})
+        outputs.append(read_csv(output))
+    assert outputs[0] == outputs[1] and len(outputs[0]) == 15